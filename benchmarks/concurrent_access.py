@@ -0,0 +1,134 @@
+"""
+Compare storage profiles under reads and writes from several processes at once.
+
+Runs reader processes (fetching random tasks, as the web UI does) alongside writer
+processes (adding and updating tasks, as the CLI does) against the same store, first
+with settings matching SQLite's defaults (a rollback journal, no retries) and then
+with the default `StorageProfile` (WAL). Reports throughput, p95 latency, and how
+many operations failed because the store was locked. Embeddings are left queued, so
+the embedding model isn't involved.
+
+    python benchmarks/concurrent_access.py --readers 4 --writers 2 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from now_and_here.datastore.sqlite_store import UnstructuredSQLiteStore
+from now_and_here.datastore.sqlite_store.connection_pool import StorageProfile
+from now_and_here.datastore.sqlite_store.create import create_db
+from now_and_here.models import Task
+
+PROFILES = {
+    "rollback": StorageProfile(
+        journal_mode="delete",
+        synchronous="full",
+        mmap_size_mb=0,
+        cache_size_mb=2,
+        busy_retries=0,
+        checkpoint_interval=0,
+    ),
+    "wal": StorageProfile(),
+}
+
+
+def open_store(path: Path, profile: StorageProfile) -> UnstructuredSQLiteStore:
+    return UnstructuredSQLiteStore(
+        path, background_embeddings=True, vector_index="numpy", storage=profile
+    )
+
+
+def worker(
+    path: Path,
+    profile: StorageProfile,
+    kind: str,
+    task_ids: list[str],
+    seconds: float,
+    results: "multiprocessing.Queue[tuple[str, list[float], int]]",
+) -> None:
+    store = open_store(path, profile)
+    rng = random.Random()
+    latencies = []
+    failures = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if kind == "read":
+                store.get_task(rng.choice(task_ids))
+            elif rng.random() < 0.5:
+                store.save_task(Task(name=f"New task {rng.random()}"))
+            else:
+                task = store.get_task(rng.choice(task_ids))
+                task.description = f"Updated {rng.random()}"
+                store.update_task(task.id, task)
+        except sqlite3.OperationalError:
+            failures += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    store.close()
+    results.put((kind, latencies, failures))
+
+
+def run(
+    path: Path, profile: StorageProfile, task_ids: list[str], args: argparse.Namespace
+) -> dict[str, tuple[list[float], int]]:
+    results: multiprocessing.Queue = multiprocessing.Queue()
+    kinds = ["read"] * args.readers + ["write"] * args.writers
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(path, profile, kind, task_ids, args.seconds, results)
+        )
+        for kind in kinds
+    ]
+    for process in processes:
+        process.start()
+    totals: dict[str, tuple[list[float], int]] = {"read": ([], 0), "write": ([], 0)}
+    for _ in processes:
+        kind, latencies, failures = results.get()
+        total_latencies, total_failures = totals[kind]
+        totals[kind] = (total_latencies + latencies, total_failures + failures)
+    for process in processes:
+        process.join()
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=5_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{args.tasks} tasks, {args.readers} readers, {args.writers} writers, "
+        f"{args.seconds:g} s per profile"
+    )
+    for name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "store.sqlite")
+            create_db(path)
+            store = open_store(path, profile)
+            tasks = [Task(name=f"Task {i}") for i in range(args.tasks)]
+            for task in tasks:
+                store.save_task(task)
+            store.close()
+
+            totals = run(path, profile, [task.id for task in tasks], args)
+        for kind, (latencies, failures) in totals.items():
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0
+            print(
+                f"{name:>8} {kind:>5}s: {len(latencies) / args.seconds:8.0f} ops/s, "
+                f"p95 {p95 * 1000:7.2f} ms, {failures} failed"
+            )
+
+
+if __name__ == "__main__":
+    main()
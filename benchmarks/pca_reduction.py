@@ -0,0 +1,95 @@
+"""
+Compare searching the vss vector index with vectors reduced by PCA.
+
+Builds the default index over full vectors, then retrains it with vectors reduced to
+each number of dimensions via `VSSVectorIndex.train`. Reports recall@k against the
+full-dimension search, both for the reduced vectors alone and after re-ranking the
+candidates by their full vectors (which is what the index returns), along with the
+median search latency. Vectors are synthetic, as in `vss_index_factory.py`.
+
+    python benchmarks/pca_reduction.py --tasks 50000 --dimensions 128
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from vss_index_factory import clustered_vectors
+
+from now_and_here.datastore.sqlite_store.connection_pool import ConnectionPool
+from now_and_here.datastore.sqlite_store.sqlite_store import load_extensions
+from now_and_here.datastore.sqlite_store.vss_index import VSSVectorIndex
+
+
+def time_searches(
+    index: VSSVectorIndex, queries: np.ndarray, k: int
+) -> tuple[list[list[int]], float]:
+    results = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        timings.append(time.perf_counter() - start)
+        results.append([row_id for row_id, _ in hits])
+    return results, statistics.median(timings)
+
+
+def recall(actual: list[list[int]], expected: list[list[int]]) -> float:
+    return statistics.mean(
+        len(set(a) & set(e)) / len(e) for a, e in zip(actual, expected)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument(
+        "--dimensions", type=int, action="append", help="May be given more than once."
+    )
+    args = parser.parse_args()
+    reductions = args.dimensions or [64, 128, 192]
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng, args.tasks + args.queries)
+    vectors, queries = vectors[: args.tasks], vectors[args.tasks :]
+    row_ids = list(range(1, args.tasks + 1))
+
+    print(f"{args.tasks} tasks, {args.queries} queries, k={args.k}")
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp, "store.sqlite"), on_connect=load_extensions)
+        index = VSSVectorIndex(pool)
+        with pool.connection():
+            index.add(row_ids, vectors)
+        expected, full_time = time_searches(index, queries, args.k)
+        print(f"{vectors.shape[1]:>4} dims: {full_time * 1000:6.2f} ms/query")
+        for dimensions in reductions:
+            index = VSSVectorIndex(pool, dimensions=dimensions)
+            index.train()
+            projection = index.projection()
+            assert projection is not None
+            actual, latency = time_searches(index, queries, args.k)
+
+            # Recall of the reduced vectors on their own, without re-ranking.
+            projected = projection.project(vectors)
+            reduced = []
+            for query in projection.project(queries):
+                distances = ((projected - query) ** 2).sum(axis=1)
+                nearest = np.argpartition(distances, args.k)[: args.k]
+                reduced.append([row_ids[i] for i in nearest])
+
+            print(
+                f"{dimensions:>4} dims: {latency * 1000:6.2f} ms/query, "
+                f"recall@{args.k} {recall(reduced, expected):.3f} reduced / "
+                f"{recall(actual, expected):.3f} re-ranked, "
+                f"{projection.explained_variance(vectors):.0%} of variance kept"
+            )
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measure how fast each store turns task rows into `Task` objects.
+
+Fills a store with tasks spread over a few projects (with labels, due dates and
+repeats, like real tasks), then reports rows per second for decoding rows that were
+already fetched (`_tasks_from_rows`) and for `get_tasks` as a whole. Embeddings are
+left queued, so the embedding model isn't involved.
+
+    python benchmarks/task_decoding.py --tasks 10000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable
+
+from now_and_here.datastore.sqlite_store import (
+    SQLiteStore,
+    StructuredSQLiteStore,
+    UnstructuredSQLiteStore,
+)
+from now_and_here.datastore.sqlite_store.create import create_db, create_structured_db
+from now_and_here.models import Label, Project, Task
+from now_and_here.models.common import decode_id_from_int
+from now_and_here.models.repeat_interval import try_parse
+
+STORES: dict[str, tuple[type[SQLiteStore], Callable[[Path], None]]] = {
+    "unstructured": (UnstructuredSQLiteStore, create_db),
+    "structured": (StructuredSQLiteStore, create_structured_db),
+}
+
+
+def fill(store: SQLiteStore, size: int) -> None:
+    projects = [Project(name=f"Project {i}") for i in range(10)]
+    for project in projects:
+        store.save_project(project)
+    labels = [Label(name="errand"), Label(name="work")]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    repeat = try_parse("every week")
+    store.save_tasks(
+        [
+            Task(
+                # Random IDs would collide now and then among this many tasks.
+                id=decode_id_from_int(i),
+                name=f"Task {i}",
+                description="Some details" if i % 2 else None,
+                project=projects[i % len(projects)],
+                labels=labels[: i % 3],
+                priority=i % 4,
+                due=start + timedelta(hours=i) if i % 3 else None,
+                repeat=repeat if i % 5 == 0 else None,
+            )
+            for i in range(size)
+        ]
+    )
+
+
+def rows_per_second(run: Callable[[], object], rows: int, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return rows / statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{args.tasks} tasks, median of {args.repeats} runs")
+    for name, (store_class, create) in STORES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "store.sqlite")
+            create(path)
+            store = store_class(path, background_embeddings=True)
+            fill(store, args.tasks)
+            rows = store.conn.execute(
+                f"SELECT {store.TASK_COLUMNS} FROM tasks t"
+            ).fetchall()
+            decode = rows_per_second(
+                lambda: store._tasks_from_rows(rows), len(rows), args.repeats
+            )
+            listing = rows_per_second(
+                lambda: store.get_tasks(include_done=True), len(rows), args.repeats
+            )
+            print(
+                f"{name:>12}: decoding {decode:10,.0f} rows/s, "
+                f"get_tasks {listing:10,.0f} rows/s"
+            )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
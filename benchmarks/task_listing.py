@@ -0,0 +1,96 @@
+"""
+Compare listing a project's tasks all at once, lazily, a page at a time, and as rows.
+
+For projects of growing size, measures how long `get_tasks`, `iter_tasks`,
+`get_tasks_page` and `get_task_rows` take to produce their first task (which is
+roughly when `GET /api/tasks` can start responding), and the peak memory each
+allocates while going through every task. Embeddings are left queued, so the
+embedding model isn't involved.
+
+    python benchmarks/task_listing.py --tasks 1000 --tasks 10000
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable
+
+from now_and_here.datastore.sqlite_store import UnstructuredSQLiteStore
+from now_and_here.datastore.sqlite_store.create import create_db
+from now_and_here.models import Project, Task, TaskRow
+from now_and_here.models.common import decode_id_from_int
+
+
+def paged(store: UnstructuredSQLiteStore, project_id: str) -> Iterable[Task]:
+    page = store.get_tasks_page(project_id=project_id, sort_by="due")
+    while True:
+        yield from page.tasks
+        if page.next_page_token is None:
+            return
+        page = store.get_tasks_page(
+            project_id=project_id, sort_by="due", page_token=page.next_page_token
+        )
+
+
+def measure(
+    list_tasks: Callable[[], Iterable[Task | TaskRow]],
+) -> tuple[float, float, int]:
+    """Seconds to the first task, peak MiB allocated, and the number of tasks."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = iter(list_tasks())
+    next(tasks)
+    first = time.perf_counter() - start
+    count = 1 + sum(1 for _ in tasks)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return first, peak, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--tasks", type=int, action="append", help="May be given more than once."
+    )
+    args = parser.parse_args()
+
+    for size in args.tasks or [1_000, 5_000, 20_000]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, "store.sqlite")
+            create_db(path)
+            store = UnstructuredSQLiteStore(path, background_embeddings=True)
+            project = Project(name="Big project")
+            store.save_project(project)
+            store.save_tasks(
+                [
+                    # Random IDs would collide now and then among this many tasks.
+                    Task(id=decode_id_from_int(i), name=f"Task {i}", project=project)
+                    for i in range(size)
+                ]
+            )
+            methods: dict[str, Callable[[], Iterable[Task | TaskRow]]] = {
+                "get_tasks": lambda: store.get_tasks(
+                    project_id=project.id, sort_by="due"
+                ),
+                "iter_tasks": lambda: store.iter_tasks(
+                    project_id=project.id, sort_by="due"
+                ),
+                "pages": lambda: paged(store, project.id),
+                "task rows": lambda: store.get_task_rows(
+                    project_id=project.id, sort_by="due"
+                ),
+            }
+            for name, list_tasks in methods.items():
+                first, peak, count = measure(list_tasks)
+                assert count == size
+                print(
+                    f"{size:>7} tasks, {name:>10}: first task {first * 1000:8.2f} ms, "
+                    f"peak {peak:7.2f} MiB"
+                )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare searching the numpy vector index with and without int8-quantized vectors.
+
+Builds a float32 `NumpyVectorIndex` and a quantized one over the same vectors, and
+reports the quantized index's recall@k against the exact float32 search, both for the
+int8 codes alone and after re-ranking their best candidates by the float vectors
+(which is what the index returns), along with the median search latency and the size
+of each file. With `--cold`, each search starts with the file dropped from the page
+cache, as for a store too big to stay in memory. Vectors are synthetic, as in
+`vss_index_factory.py`.
+
+    python benchmarks/vector_quantization.py --tasks 100000 --cold
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from vss_index_factory import clustered_vectors
+
+from now_and_here.datastore.vector_index.numpy_index import (
+    NumpyVectorIndex,
+    normalize,
+    quantize,
+)
+
+
+def evict(path: Path) -> None:
+    """Drop a file from the page cache (on Linux), so that the next read is cold."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def time_searches(
+    index: NumpyVectorIndex, queries: np.ndarray, k: int, cold: bool = False
+) -> tuple[list[list[int]], float]:
+    results = []
+    timings = []
+    for query in queries:
+        if cold:
+            # Unmap the file first: mapped pages aren't evicted.
+            index.close()
+            evict(index.path)
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        timings.append(time.perf_counter() - start)
+        results.append([row_id for row_id, _ in hits])
+    return results, statistics.median(timings)
+
+
+def recall(actual: list[list[int]], expected: list[list[int]]) -> float:
+    return statistics.mean(
+        len(set(a) & set(e)) / len(e) for a, e in zip(actual, expected)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument(
+        "--cold", action="store_true", help="Search with the file out of the cache."
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng, args.tasks + args.queries)
+    vectors, queries = vectors[: args.tasks], vectors[args.tasks :]
+    row_ids = list(range(1, args.tasks + 1))
+
+    print(
+        f"{args.tasks} tasks, {args.queries} queries, k={args.k}"
+        + (", cold cache" if args.cold else "")
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp, "store.sqlite")
+        exact = NumpyVectorIndex(path, dimensions=vectors.shape[1])
+        quantized = NumpyVectorIndex(path, dimensions=vectors.shape[1], quantized=True)
+        for index in (exact, quantized):
+            index.add(row_ids, vectors)
+            index.close()
+
+        expected, exact_time = time_searches(exact, queries, args.k, args.cold)
+        actual, quantized_time = time_searches(quantized, queries, args.k, args.cold)
+
+        # Recall of the int8 codes on their own, without re-ranking.
+        codes, scales = quantize(normalize(vectors))
+        approximate = codes.astype(np.float32) * scales[:, None]
+        coded = []
+        for query in normalize(queries):
+            scores = approximate @ query
+            nearest = np.argpartition(-scores, args.k)[: args.k]
+            coded.append([row_ids[i] for i in nearest])
+
+        print(
+            f"float32: {exact_time * 1000:6.2f} ms/query, "
+            f"{exact.path.stat().st_size / 2**20:.1f} MiB"
+        )
+        print(
+            f"   int8: {quantized_time * 1000:6.2f} ms/query, "
+            f"{quantized.path.stat().st_size / 2**20:.1f} MiB, "
+            f"recall@{args.k} {recall(coded, expected):.3f} codes / "
+            f"{recall(actual, expected):.3f} re-ranked"
+        )
+
+
+if __name__ == "__main__":
+    main()
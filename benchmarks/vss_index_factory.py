@@ -0,0 +1,90 @@
+"""
+Compare searching the vss vector index built with different FAISS index factories.
+
+Builds the default (exact, flat) index, then rebuilds it with each factory via
+`VSSVectorIndex.train`, and reports the median search latency and recall@k against
+the exact index. Vectors are synthetic: noisy points around random cluster centers,
+which is roughly how real task embeddings are distributed.
+
+    python benchmarks/vss_index_factory.py --tasks 50000 --factory IVF256,Flat
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from now_and_here.datastore.embeddings import EMBEDDING_DIMENSIONS
+from now_and_here.datastore.sqlite_store.connection_pool import ConnectionPool
+from now_and_here.datastore.sqlite_store.sqlite_store import load_extensions
+from now_and_here.datastore.sqlite_store.vss_index import VSSVectorIndex
+from now_and_here.datastore.vector_index.numpy_index import normalize
+
+
+def clustered_vectors(
+    rng: np.random.Generator, n: int, clusters: int = 200, noise: float = 0.6
+) -> np.ndarray:
+    centers = rng.normal(size=(clusters, EMBEDDING_DIMENSIONS))
+    labels = rng.integers(clusters, size=n)
+    return normalize(
+        centers[labels] + noise * rng.normal(size=(n, EMBEDDING_DIMENSIONS))
+    )
+
+
+def time_searches(
+    index: VSSVectorIndex, queries: np.ndarray, k: int
+) -> tuple[list[list[int]], float]:
+    results = []
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        timings.append(time.perf_counter() - start)
+        results.append([row_id for row_id, _ in hits])
+    return results, statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument(
+        "--factory", action="append", help="May be given more than once."
+    )
+    args = parser.parse_args()
+    factories = args.factory or ["IVF64,Flat", "IVF256,Flat"]
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rng, args.tasks + args.queries)
+    vectors, queries = vectors[: args.tasks], vectors[args.tasks :]
+
+    print(f"{args.tasks} tasks, {args.queries} queries, k={args.k}")
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(Path(tmp, "store.sqlite"), on_connect=load_extensions)
+        index = VSSVectorIndex(pool)
+        with pool.connection():
+            index.add(list(range(1, args.tasks + 1)), vectors)
+        expected, exact_time = time_searches(index, queries, args.k)
+        print(f"{'flat':>12}: {exact_time * 1000:6.2f} ms/query")
+        for factory in factories:
+            index = VSSVectorIndex(pool, factory=factory)
+            start = time.perf_counter()
+            index.train()
+            train_time = time.perf_counter() - start
+            actual, latency = time_searches(index, queries, args.k)
+            recall = statistics.mean(
+                len(set(a) & set(e)) / len(e) for a, e in zip(actual, expected)
+            )
+            print(
+                f"{factory:>12}: {latency * 1000:6.2f} ms/query, "
+                f"recall@{args.k} {recall:.3f}, trained in {train_time:.1f} s"
+            )
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
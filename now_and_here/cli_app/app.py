@@ -1,4 +1,5 @@
 import logging
+import os
 from pathlib import Path
 
 import typer
@@ -6,9 +7,10 @@ import uvicorn
 
 from now_and_here.config import get_config
 from now_and_here.console import console
-from now_and_here.datastore import UnstructuredSQLiteStore
+from now_and_here.datastore.get_store import get_store_class
 
 from .config import config_app
+from .index import index_app
 from .label import label_app
 from .project import project_app
 from .task import task_app
@@ -21,6 +23,7 @@ app.add_typer(task_app, name="task")
 app.add_typer(project_app, name="project")
 app.add_typer(label_app, name="label")
 app.add_typer(config_app, name="config")
+app.add_typer(index_app, name="index")
 # Add "aliases" -- shorter versions of the command names.
 app.add_typer(task_app, name="t")
 app.add_typer(project_app, name="p")
@@ -32,20 +35,15 @@ def init():
     """Check if the store exists and create it if it doesn't."""
     config = get_config()
     store_path = Path(config.store_file_path)
-    match config.store_type:
-        case "unstructured_sqlite_store":
-            if not UnstructuredSQLiteStore.exists(store_path):
-                with console.status("Creating store..."):
-                    UnstructuredSQLiteStore.create_self(store_path)
-                console.print(
-                    f"[green]Success![/] Store created at [magenta]{store_path}[/]"
-                )
-            else:
-                console.print(
-                    f"[yellow]No action taken[/]: Store already exists at [magenta]{store_path}[/]"
-                )
-        case _:
-            raise ValueError(f"Unknown store type: {config.store_type}")
+    store_class = get_store_class(config.store_type)
+    if not store_class.exists(store_path):
+        with console.status("Creating store..."):
+            store_class.create_self(store_path)
+        console.print(f"[green]Success![/] Store created at [magenta]{store_path}[/]")
+    else:
+        console.print(
+            f"[yellow]No action taken[/]: Store already exists at [magenta]{store_path}[/]"
+        )
 
 
 @app.callback()
@@ -64,8 +62,23 @@ def main(verbosity: int = typer.Option(0, "--verbose", "-v", count=True)):
 
 
 @app.command()
-def web(port: int = 8787):
+def web(
+    port: int = 8787,
+    warm_up: bool = typer.Option(
+        False,
+        "--warm-up",
+        help="Load the embedding model at startup instead of on first use.",
+    ),
+    typeahead_settle: float = typer.Option(
+        0.3,
+        "--typeahead-settle",
+        help="Seconds of no typing before typeahead runs a semantic search.",
+    ),
+):
     """Start the web server."""
+    if warm_up:
+        os.environ["NH_WARM_UP_EMBEDDINGS"] = "1"
+    os.environ["NH_TYPEAHEAD_SETTLE_SECONDS"] = str(typeahead_settle)
     from now_and_here.fastapi_app import app
 
     # Serve the app
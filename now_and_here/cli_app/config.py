@@ -1,3 +1,5 @@
+from dataclasses import fields
+
 import typer
 
 from now_and_here.config import get_user_config
@@ -11,13 +13,9 @@ config_app = typer.Typer(
 @config_app.command()
 def get(key: str):
     user_config = get_user_config()
-    match key:
-        case "store_type":
-            typer.echo(user_config.store_type)
-        case "store_file_path":
-            typer.echo(user_config.store_file_path)
-        case _:
-            typer.echo(
-                f"Unknown key: {key}. Must be one of 'store_type' or 'store_file_path'"
-            )
-            raise typer.Exit(1)
+    keys = [field.name for field in fields(user_config)]
+    if key not in keys:
+        valid_keys = "'" + "', '".join(keys) + "'"
+        typer.echo(f"Unknown key: {key}. Must be one of {valid_keys}")
+        raise typer.Exit(1)
+    typer.echo(getattr(user_config, key))
@@ -0,0 +1,37 @@
+import typer
+
+from now_and_here import datastore
+from now_and_here.console import console
+
+index_app = typer.Typer(
+    help="Maintain the search index.",
+    no_args_is_help=True,
+)
+
+
+@index_app.command()
+def train():
+    """
+    Rebuild the vector index from the stored vectors.
+
+    Run this after changing `vector_index_factory` or `vector_dimensions`, and now
+    and then as the store grows, so that clustered (e.g. IVF) indexes and the PCA
+    projection reflect the tasks they hold.
+    """
+    store = datastore.get_store()
+    with console.status("Training the vector index..."):
+        try:
+            store.train_vector_index()
+        except ValueError as e:
+            console.print(f"[red]Error:[/red] {e}")
+            raise typer.Exit(1)
+    console.print("[green]Vector index rebuilt![/green]")
+
+
+@index_app.command()
+def compact():
+    """Remove vectors left behind by deleted tasks and reclaim their space."""
+    store = datastore.get_store()
+    with console.status("Compacting the vector index..."):
+        removed = store.compact_vector_index()
+    console.print(f"[green]Removed {removed} orphaned vectors.[/green]")
@@ -1,12 +1,15 @@
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, get_args
 
 import typer
+from rich.progress import Progress
 from rich.prompt import IntPrompt, Prompt
 
 from now_and_here import datastore
 from now_and_here.console import console
+from now_and_here.datastore import DataStore
 from now_and_here.datastore.errors import RecordNotFoundError
+from now_and_here.datastore.search import SEARCH_MODE
 from now_and_here.models.common import format_id
 from now_and_here.models.repeat_interval import try_parse
 from now_and_here.models.task import Task
@@ -18,6 +21,18 @@ task_app = typer.Typer(
 )
 
 
+def catch_up_embeddings(store: DataStore) -> None:
+    """
+    Embed any queued tasks, before a command that reads task vectors.
+
+    In the background embedding mode, only `nh web` embeds tasks on its own, so
+    without it running, tasks saved from the CLI would be missing or out of date.
+    """
+    if pending := store.pending_embeddings():
+        with console.status(f"Indexing {pending} new or changed tasks..."):
+            store.process_embedding_queue()
+
+
 # We have to name this "list_" to avoid clobbering Python's built-in list function.
 @task_app.command(name="list")
 def list_(
@@ -48,7 +63,7 @@ def list_(
     if project_id is not None:
         project_id = project_id.replace("-", "")
     store = datastore.get_store()
-    tasks = store.get_tasks(
+    tasks = store.get_task_rows(
         sort_by=sort,
         desc=desc,
         project_name=project_name,
@@ -98,6 +113,9 @@ def add(interactive: bool = typer.Option(False, "--interactive", "-i")):
         if task.repeat is None:
             console.print(f"Could not parse repeat interval '{repeat}'")
             raise typer.Exit(1)
+    suggestion = store.suggest_project(task)
+    if suggestion:
+        console.print(f"Suggested project: [cyan]{suggestion.name}[/cyan]")
     in_project = Prompt.ask(
         "Is this task part of a project? \\[y/N]",
         console=console,
@@ -106,11 +124,19 @@ def add(interactive: bool = typer.Option(False, "--interactive", "-i")):
     )
     if in_project.lower().startswith("y"):
         projects = {project.name: project for project in store.get_projects()}
-        project_name = Prompt.ask(
-            "Project:",
-            choices=list(projects.keys()),
-            console=console,
-        )
+        if suggestion is not None:
+            project_name = Prompt.ask(
+                "Project:",
+                choices=list(projects.keys()),
+                console=console,
+                default=suggestion.name,
+            )
+        else:
+            project_name = Prompt.ask(
+                "Project:",
+                choices=list(projects.keys()),
+                console=console,
+            )
         task.project = projects[project_name]
     with console.status("Saving..."):
         store.save_task(task)
@@ -164,11 +190,12 @@ def get(id: str, fields: list[str] = typer.Option(None, "--field", "-f")):
 def delete(ids: list[str]):
     """Delete one or more tasks."""
     store = datastore.get_store()
-    for raw_id in ids:
-        # Since we display IDs with dashes in them but don't actually store dashes,
-        # strip them from input.
-        id = raw_id.replace("-", "")
-        if store.delete_task(id):
+    # Since we display IDs with dashes in them but don't actually store dashes, strip
+    # them from input.
+    raw_ids = {raw_id.replace("-", ""): raw_id for raw_id in ids}
+    deleted = set(store.delete_tasks(list(raw_ids)))
+    for id, raw_id in raw_ids.items():
+        if id in deleted:
             console.print(f"Task [cyan]{raw_id}[/cyan] deleted")
         else:
             console.print(f"[red]Error:[/red] Task [cyan]{raw_id}[/cyan] not found")
@@ -273,11 +300,15 @@ def update(id: str, interactive: bool = typer.Option(False, "--interactive", "-i
 def checkoff(ids: list[str]):
     """Mark a task as done or not done."""
     store = datastore.get_store()
-    for raw_id in ids:
-        # Since we display IDs with dashes in them but don't actually store dashes, strip
-        # them from input.
-        id = raw_id.replace("-", "")
-        was_updated, next_occurrence = store.checkoff_task(id)
+    # Since we display IDs with dashes in them but don't actually store dashes, strip
+    # them from input.
+    raw_ids = {raw_id.replace("-", ""): raw_id for raw_id in ids}
+    results = store.checkoff_tasks(list(raw_ids))
+    for id, raw_id in raw_ids.items():
+        if id not in results:
+            console.print(f"[red]Error:[/red] Task [cyan]{raw_id}[/cyan] not found")
+            continue
+        was_updated, next_occurrence = results[id]
         if was_updated:
             console.print(f"[green]Task [cyan]{raw_id}[/cyan] marked as done![/green]")
             if next_occurrence:
@@ -337,16 +368,166 @@ def due(
 
 
 @task_app.command()
-def search(query: str):
+def search(
+    query: str,
+    project_id: str = typer.Option(
+        None,
+        "--project-id",
+        help="Only search tasks in a specific project, by id.",
+    ),
+    include_child_projects: bool = typer.Option(
+        False, "--include-child-projects", help="Include tasks in child projects."
+    ),
+    hide_done: bool = typer.Option(
+        False, "--hide-done", help="Leave out tasks marked as done."
+    ),
+    due_before: str = typer.Option(
+        None,
+        "--by",
+        help="Only search tasks due at or before this time.",
+    ),
+    limit: int = typer.Option(5, "--limit", "-n", help="How many tasks to show."),
+    mode: str = typer.Option(
+        "hybrid",
+        "--mode",
+        help="Rank by meaning (semantic), keywords (lexical), or both (hybrid).",
+    ),
+):
     """Search for tasks by name or description."""
+    if mode not in get_args(SEARCH_MODE):
+        raise typer.BadParameter(
+            f"Mode must be one of: {', '.join(get_args(SEARCH_MODE))}"
+        )
+    if project_id is not None:
+        project_id = project_id.replace("-", "")
+    store = datastore.get_store()
+    # Lexical searches don't need embeddings (or the model).
+    if mode != "lexical":
+        catch_up_embeddings(store)
+    tasks = store.search_tasks(
+        query,
+        limit=limit,
+        project_id=project_id,
+        include_child_projects=include_child_projects,
+        include_done=not hide_done,
+        due_before=parse_time(due_before) if due_before else None,
+        mode=mode,  # type: ignore [arg-type]
+    )
+    console.print(Task.as_rich_table(tasks))
+
+
+@task_app.command()
+def related(
+    id: str,
+    project_id: str = typer.Option(
+        None,
+        "--project-id",
+        help="Only show tasks in a specific project, by id.",
+    ),
+    include_child_projects: bool = typer.Option(
+        False, "--include-child-projects", help="Include tasks in child projects."
+    ),
+    include_done: bool = typer.Option(
+        False, "--show-done", help="Include tasks marked as done."
+    ),
+    limit: int = typer.Option(5, "--limit", "-n", help="How many tasks to show."),
+):
+    """Show the tasks most similar to a task."""
+    id = id.replace("-", "")
+    if project_id is not None:
+        project_id = project_id.replace("-", "")
     store = datastore.get_store()
-    tasks = store.search_tasks(query)
+    catch_up_embeddings(store)
+    try:
+        tasks = store.related_tasks(
+            id,
+            limit=limit,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+        )
+    except RecordNotFoundError:
+        console.print(f"[red]Error:[/red] Task [cyan]{format_id(id)}[/cyan] not found")
+        raise typer.Exit(1)
     console.print(Task.as_rich_table(tasks))
 
 
+@task_app.command()
+def dedupe(
+    threshold: float = typer.Option(
+        0.92,
+        "--threshold",
+        "-t",
+        help="How similar (0 to 1) tasks must be to count as duplicates.",
+    ),
+    project_id: str = typer.Option(
+        None,
+        "--project-id",
+        help="Only look for duplicates in a specific project, by id.",
+    ),
+    include_child_projects: bool = typer.Option(
+        False, "--include-child-projects", help="Include tasks in child projects."
+    ),
+    merge: bool = typer.Option(
+        False,
+        "--merge",
+        help="Merge each group into its highest-priority task, deleting the rest.",
+    ),
+    yes: bool = typer.Option(
+        False, "--yes", "-y", help="Merge every group without asking first."
+    ),
+):
+    """
+    Find groups of open tasks that look like duplicates.
+
+    Each group is led by the task to keep (highest priority, then soonest due), and
+    the rest are similar to that one.
+    """
+    if project_id is not None:
+        project_id = project_id.replace("-", "")
+    store = datastore.get_store()
+    catch_up_embeddings(store)
+    with console.status("Looking for duplicates..."):
+        groups = store.find_duplicate_tasks(
+            threshold=threshold,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+        )
+    if not groups:
+        console.print("[green]No duplicates found.[/green]")
+        return
+    for keeper, *duplicates in groups:
+        console.print(Task.as_rich_table([keeper, *duplicates]))
+        if not merge:
+            continue
+        if not yes:
+            answer = Prompt.ask(
+                f"Merge into [cyan]{format_id(keeper.id)}[/cyan]? \\[y/N]",
+                console=console,
+                default="N",
+                show_default=True,
+            )
+            if not answer.lower().startswith("y"):
+                continue
+        store.merge_tasks(keeper, duplicates)
+        console.print(
+            f"Merged {len(duplicates)} tasks into [cyan]{format_id(keeper.id)}[/cyan]"
+        )
+
+
 @task_app.command()
 def regen_embeddings():
-    """Regenerate the embeddings for all tasks."""
+    """
+    Regenerate the embeddings for all tasks.
+
+    This is safe to interrupt: running it again picks up where it left off.
+    """
     store = datastore.get_store()
-    store.regen_embeddings()
+    with Progress(console=console) as progress:
+        bar = progress.add_task("Embedding tasks", total=None)
+
+        def update(done: int, total: int) -> None:
+            progress.update(bar, completed=done, total=total)
+
+        store.regen_embeddings(progress=update)
     console.print("[green]Embeddings regenerated![/green]")
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+from dataclasses import fields
 from pathlib import Path
 from typing import Literal
 
 from pydantic.dataclasses import dataclass
 
-STORE_TYPE = Literal["unstructured_sqlite_store"]
+STORE_TYPE = Literal["unstructured_sqlite_store", "structured_sqlite_store"]
+EMBEDDING_MODE = Literal["sync", "background"]
+VECTOR_INDEX_TYPE = Literal["vss", "numpy"]
+JOURNAL_MODE = Literal["wal", "delete", "truncate", "persist"]
+SYNCHRONOUS_MODE = Literal["off", "normal", "full", "extra"]
 
 DEFAULT_STORE_FILE_LOCATION = "~/.now_and_here/store.sqlite3"
 
@@ -14,6 +19,44 @@ DEFAULT_STORE_FILE_LOCATION = "~/.now_and_here/store.sqlite3"
 class PartialAppConfig:
     store_type: STORE_TYPE | None = None
     store_file_path: Path | None = None
+    # Number of threads the embedding model may use (None lets the runtime decide).
+    embedding_threads: int | None = None
+    # Seconds the embedding model may sit unused before it's unloaded (0 to never).
+    embedding_idle_timeout: float | None = None
+    # Whether tasks are embedded as they're written ("sync") or afterwards, by a
+    # background worker ("background").
+    embedding_mode: EMBEDDING_MODE | None = None
+    # Where task embeddings are kept and searched: the sqlite_vss extension ("vss") or
+    # memory-mapped NumPy arrays next to the store ("numpy").
+    vector_index: VECTOR_INDEX_TYPE | None = None
+    # The FAISS index factory string for the vss vector index, e.g. "IVF256,Flat"
+    # (None for exact search). Applied by `nh index train`.
+    vector_index_factory: str | None = None
+    # Dimensions to reduce vectors in the vss vector index to, with PCA (None to keep
+    # them whole). Applied by `nh index train`.
+    vector_dimensions: int | None = None
+    # Whether the numpy vector index also keeps int8 codes for its vectors, which
+    # searches scan before re-ranking the best matches.
+    quantize_vectors: bool | None = None
+    # How similar (0 to 1) a new task must be to a project's tasks for the project to
+    # be suggested for it.
+    project_suggestion_threshold: float | None = None
+    # How the SQLite store is tuned for sharing between processes (see
+    # StorageProfile): its journal mode, how often commits wait for the disk, the
+    # memory it may map and cache (in MB), how long a write waits for another
+    # process's write to finish (in seconds), how many times it's then retried and
+    # the delay the retries back off from (in seconds), how often the WAL is
+    # checkpointed (in seconds of writes; 0 to leave it to SQLite), and the size (in
+    # MB) the WAL is truncated to after checkpoints.
+    journal_mode: JOURNAL_MODE | None = None
+    synchronous: SYNCHRONOUS_MODE | None = None
+    mmap_size_mb: int | None = None
+    cache_size_mb: int | None = None
+    busy_timeout: float | None = None
+    busy_retries: int | None = None
+    retry_delay: float | None = None
+    checkpoint_interval: float | None = None
+    journal_size_limit_mb: int | None = None
 
     def is_complete(self) -> bool:
         if self.store_type is None:
@@ -23,15 +66,36 @@ class PartialAppConfig:
         return True
 
     def merge(self, other: PartialAppConfig) -> PartialAppConfig:
-        store_type = other.store_type or self.store_type
-        store_file_path = other.store_file_path or self.store_file_path
-        return PartialAppConfig(store_type=store_type, store_file_path=store_file_path)
+        values = {}
+        for field in fields(self):
+            value = getattr(other, field.name)
+            if value is None:
+                value = getattr(self, field.name)
+            values[field.name] = value
+        return PartialAppConfig(**values)
 
 
 @dataclass
 class AppConfig:
     store_type: STORE_TYPE
     store_file_path: Path
+    embedding_threads: int | None = None
+    embedding_idle_timeout: float = 600
+    embedding_mode: EMBEDDING_MODE = "background"
+    vector_index: VECTOR_INDEX_TYPE = "vss"
+    vector_index_factory: str | None = None
+    vector_dimensions: int | None = None
+    quantize_vectors: bool = False
+    project_suggestion_threshold: float = 0.7
+    journal_mode: JOURNAL_MODE = "wal"
+    synchronous: SYNCHRONOUS_MODE = "normal"
+    mmap_size_mb: int = 256
+    cache_size_mb: int = 64
+    busy_timeout: float = 5
+    busy_retries: int = 5
+    retry_delay: float = 0.05
+    checkpoint_interval: float = 300
+    journal_size_limit_mb: int = 64
 
     @classmethod
     def from_partial(cls, partial: PartialAppConfig) -> AppConfig:
@@ -43,7 +107,14 @@ class AppConfig:
             raise ValueError(
                 "Cannot create AppConfig from partial config with no store_file_path"
             )
+        optional_values = {
+            field.name: getattr(partial, field.name)
+            for field in fields(partial)
+            if field.name not in ("store_type", "store_file_path")
+            and getattr(partial, field.name) is not None
+        }
         return cls(
             store_type=partial.store_type,
             store_file_path=partial.store_file_path,
+            **optional_values,
         )
@@ -7,4 +7,7 @@ DEFAULT_STORE_PATH = Path("~/.now-and-here/store.sqlite3").expanduser()
 default_config = PartialAppConfig(
     store_type="unstructured_sqlite_store",
     store_file_path=DEFAULT_STORE_PATH,
+    embedding_idle_timeout=600,
+    embedding_mode="background",
+    vector_index="vss",
 )
@@ -1,3 +1,4 @@
+from dataclasses import fields
 from pathlib import Path
 
 import tomllib
@@ -14,11 +15,10 @@ def get_user_config() -> PartialAppConfig:
         return PartialAppConfig()
     with open(USER_CONFIG_PATH, "rb") as f:
         data = tomllib.load(f)
-    store_type = data.get("store_type")
-    store_file_path = None
     if "store_file_path" in data:
-        store_file_path = Path(data["store_file_path"]).expanduser()
-    return PartialAppConfig(store_type=store_type, store_file_path=store_file_path)
+        data["store_file_path"] = Path(data["store_file_path"]).expanduser()
+    known_keys = {field.name for field in fields(PartialAppConfig)}
+    return PartialAppConfig(**{k: v for k, v in data.items() if k in known_keys})
 
 
 def get_config() -> AppConfig:
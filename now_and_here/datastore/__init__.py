@@ -1,5 +1,5 @@
 from .datastore import DataStore
 from .get_store import get_store
-from .sqlite_store import UnstructuredSQLiteStore
+from .sqlite_store import StructuredSQLiteStore, UnstructuredSQLiteStore
 
-__all__ = ["DataStore", "UnstructuredSQLiteStore", "get_store"]
+__all__ = ["DataStore", "StructuredSQLiteStore", "UnstructuredSQLiteStore", "get_store"]
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING, Protocol, runtime_checkable
+from typing import TYPE_CHECKING, Callable, Iterator, Protocol, runtime_checkable
 
 if TYPE_CHECKING:
-    from now_and_here.models import Label, Project, Task
+    from now_and_here.datastore.pagination import TaskPage
+    from now_and_here.datastore.search import SEARCH_MODE
+    from now_and_here.models import Label, Project, Task, TaskRow
 
 
 @runtime_checkable
 class DataStore(Protocol):
     def save_task(self, task: Task) -> str: ...
 
+    def save_tasks(self, tasks: list[Task]) -> list[str]:
+        """Save new tasks in one transaction. Returns their IDs."""
+        ...
+
     def get_task(self, id: str) -> Task: ...
 
+    def get_tasks_by_ids(self, ids: list[str]) -> list[Task]:
+        """Fetch tasks by ID, in the order given. IDs with no task are skipped."""
+        ...
+
     def get_tasks(
         self,
         project_name: str | None = None,
@@ -24,16 +34,140 @@ class DataStore(Protocol):
         due_before: datetime | None = None,
     ) -> list[Task]: ...
 
-    def search_tasks(self, query: str, limit: int = 10) -> list[Task]:
-        """Execute a semantic search against tasks."""
+    def iter_tasks(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> Iterator[Task]:
+        """Like `get_tasks`, but build tasks as they're read."""
         ...
 
-    def regen_embeddings(self) -> None:
-        """Regenerate the embeddings for all tasks."""
+    def get_task_rows(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> list[TaskRow]:
+        """Like `get_tasks`, but read only what task lists show, as lightweight rows."""
+        ...
+
+    def get_tasks_page(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+        limit: int = 50,
+        page_token: str | None = None,
+    ) -> TaskPage:
+        """Get one page of `get_tasks`, continuing from a previous page's token."""
+        ...
+
+    def search_tasks(
+        self,
+        query: str,
+        limit: int = 5,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = True,
+        due_before: datetime | None = None,
+        mode: SEARCH_MODE = "hybrid",
+    ) -> list[Task]:
+        """Search tasks by meaning, by keywords or by both, optionally filtered."""
+        ...
+
+    def typeahead_tasks(
+        self,
+        text: str,
+        limit: int = 10,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+    ) -> list[Task]:
+        """Find tasks whose names match partially typed text, without embeddings."""
+        ...
+
+    def related_tasks(
+        self,
+        id: str,
+        limit: int = 5,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+    ) -> list[Task]:
+        """Find the tasks most similar to an existing task."""
+        ...
+
+    def find_duplicate_tasks(
+        self,
+        threshold: float = 0.92,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+    ) -> list[list[Task]]:
+        """
+        Find groups of open tasks that are near-duplicates of each other.
+
+        Each group starts with the task to keep, and the rest are duplicates of it.
+        """
+        ...
+
+    def suggest_project(self, task: Task) -> Project | None:
+        """Guess which project a task belongs in, if any is similar enough."""
+        ...
+
+    def train_vector_index(self) -> None:
+        """Rebuild the vector index from stored vectors, training it if need be."""
+        ...
+
+    def compact_vector_index(self) -> int:
+        """Remove vectors that no longer belong to a task. Returns how many."""
+        ...
+
+    def regen_embeddings(
+        self, progress: Callable[[int, int], None] | None = None
+    ) -> None:
+        """
+        Regenerate the embeddings for all tasks, resuming an interrupted rebuild.
+
+        `progress` is called with the number of tasks done so far and the total.
+        """
+        ...
+
+    def pending_embeddings(self) -> int:
+        """The number of tasks waiting to be embedded."""
+        ...
+
+    def process_embedding_queue(self) -> int:
+        """Embed all tasks waiting to be embedded. Returns how many were processed."""
+        ...
+
+    def start_embedding_worker(self) -> None:
+        """Start embedding queued tasks in the background."""
         ...
 
     def update_task(self, id: str, task: Task) -> None: ...
 
+    def update_tasks(self, tasks: list[Task]) -> None:
+        """
+        Overwrite existing tasks, matched by ID, in one transaction.
+
+        If any of the tasks doesn't exist, raises RecordNotFoundError without updating
+        any of them.
+        """
+        ...
+
     def checkoff_task(self, id: str) -> tuple[bool, datetime | None]:
         """
         Mark a task as done.
@@ -43,12 +177,28 @@ class DataStore(Protocol):
         """
         ...
 
+    def checkoff_tasks(self, ids: list[str]) -> dict[str, tuple[bool, datetime | None]]:
+        """
+        Mark tasks as done, in one transaction.
+
+        Returns what `checkoff_task` would for each task that exists, by ID.
+        """
+        ...
+
     def uncheckoff_task(self, id: str) -> bool:
         """Mark a task as not done. Returns True if the task was previously done."""
         ...
 
     def delete_task(self, id: str) -> bool: ...
 
+    def delete_tasks(self, ids: list[str]) -> list[str]:
+        """Delete tasks in one transaction, returning the IDs of those that existed."""
+        ...
+
+    def merge_tasks(self, task: Task, duplicates: list[Task]) -> Task:
+        """Fold duplicates into a task and delete them, in one transaction."""
+        ...
+
     def save_project(self, project: Project) -> str: ...
 
     def get_project(self, id: str) -> Project: ...
@@ -68,3 +218,7 @@ class DataStore(Protocol):
     def get_label(self, id: str) -> Label: ...
 
     def update_label(self, id: str, label: Label) -> None: ...
+
+    def close(self) -> None:
+        """Release any resources (e.g. connections) held by the store."""
+        ...
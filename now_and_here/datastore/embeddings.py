@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+from fastembed import TextEmbedding
+
+from now_and_here.models import Task
+
+logger = logging.getLogger(__name__)
+
+# fastembed's default model, and the dimensionality of the vectors it produces.
+DEFAULT_MODEL = "BAAI/bge-small-en-v1.5"
+EMBEDDING_DIMENSIONS = 384
+# How many search queries' embeddings are kept around for reuse.
+QUERY_CACHE_SIZE = 256
+
+
+def doc_from_task(task: Task) -> str:
+    """The text that represents a task in the vector store."""
+    doc = task.name
+    if task.description:
+        doc += f": {task.description}"
+    return doc
+
+
+def content_hash(doc: str) -> str:
+    """A fingerprint of a document, to tell whether its embedding is out of date."""
+    return hashlib.sha256(doc.encode()).hexdigest()
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace, which doesn't affect a query's embedding."""
+    return " ".join(query.split())
+
+
+class QueryCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class EmbeddingService:
+    """
+    A single, lazily loaded embedding model.
+
+    Loading the model is by far the most expensive part of embedding a handful of
+    documents, so the model is kept in memory and reused across calls. If it goes
+    unused for `idle_timeout` seconds, it's unloaded to give the memory back; the next
+    call loads it again.
+
+    Search queries tend to repeat, so their embeddings are cached (see `embed_query`).
+    """
+
+    def __init__(
+        self,
+        threads: int | None = None,
+        idle_timeout: float = 0,
+        model_name: str = DEFAULT_MODEL,
+        query_cache_size: int = QUERY_CACHE_SIZE,
+    ):
+        self.threads = threads
+        self.idle_timeout = idle_timeout
+        self.model_name = model_name
+        self.query_cache_size = query_cache_size
+        self._model: TextEmbedding | None = None
+        self._lock = threading.Lock()
+        self._unload_timer: threading.Timer | None = None
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_cache_hits = 0
+        self._query_cache_misses = 0
+
+    def configure(
+        self,
+        threads: int | None,
+        idle_timeout: float,
+        model_name: str | None = None,
+    ) -> None:
+        """Change the service's settings, reloading the model only if required."""
+        with self._lock:
+            if threads != self.threads:
+                self._model = None
+            if model_name is not None and model_name != self.model_name:
+                self._model = None
+                # Vectors from different models aren't comparable.
+                self._query_cache.clear()
+                self.model_name = model_name
+            self.threads = threads
+            self.idle_timeout = idle_timeout
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def warm_up(self) -> None:
+        """Load the model now so that the first real call doesn't have to."""
+        with self._lock:
+            self._load()
+            self._schedule_unload()
+
+    def embed(self, documents: list[str]) -> list[np.ndarray]:
+        """Embed documents as float32 vectors, loading the model if needed."""
+        with self._lock:
+            model = self._load()
+            self._cancel_unload()
+        try:
+            return [emb.astype(np.float32) for emb in model.embed(documents)]
+        finally:
+            with self._lock:
+                self._schedule_unload()
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a search query, reusing the result for repeats of recent queries.
+
+        The returned vector is shared between callers, so it's read-only.
+        """
+        query = normalize_query(query)
+        with self._lock:
+            if query in self._query_cache:
+                self._query_cache.move_to_end(query)
+                self._query_cache_hits += 1
+                return self._query_cache[query]
+            self._query_cache_misses += 1
+            model_name = self.model_name
+        embedding, *_ = self.embed([query])
+        embedding.flags.writeable = False
+        with self._lock:
+            # Don't cache a vector from a model that's since been swapped out.
+            if model_name == self.model_name and self.query_cache_size > 0:
+                self._query_cache[query] = embedding
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+
+    def query_cache_info(self) -> QueryCacheInfo:
+        with self._lock:
+            return QueryCacheInfo(
+                hits=self._query_cache_hits,
+                misses=self._query_cache_misses,
+                size=len(self._query_cache),
+                max_size=self.query_cache_size,
+            )
+
+    def unload(self) -> None:
+        with self._lock:
+            self._cancel_unload()
+            self._model = None
+
+    def _load(self) -> TextEmbedding:
+        if self._model is None:
+            logger.info("Loading embedding model")
+            self._model = TextEmbedding(
+                model_name=self.model_name, threads=self.threads
+            )
+        return self._model
+
+    def _cancel_unload(self) -> None:
+        if self._unload_timer is not None:
+            self._unload_timer.cancel()
+            self._unload_timer = None
+
+    def _schedule_unload(self) -> None:
+        self._cancel_unload()
+        if self.idle_timeout > 0:
+            self._unload_timer = threading.Timer(self.idle_timeout, self._unload_idle)
+            self._unload_timer.daemon = True
+            self._unload_timer.start()
+
+    def _unload_idle(self) -> None:
+        with self._lock:
+            logger.info("Unloading idle embedding model")
+            self._model = None
+            self._unload_timer = None
+
+
+_service: EmbeddingService | None = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Get the process-wide embedding service."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService()
+        return _service
@@ -8,3 +8,7 @@ class RecordNotFoundError(DataStoreError):
 
 class InvalidSortError(DataStoreError):
     pass
+
+
+class InvalidPageTokenError(DataStoreError):
+    pass
@@ -3,14 +3,58 @@ from pathlib import Path
 import typer
 
 from now_and_here.config import get_config
+from now_and_here.config.app_config import STORE_TYPE
 from now_and_here.datastore.datastore import DataStore
-from now_and_here.datastore.sqlite_store import UnstructuredSQLiteStore
+from now_and_here.datastore.embeddings import get_embedding_service
+from now_and_here.datastore.sqlite_store import (
+    StructuredSQLiteStore,
+    UnstructuredSQLiteStore,
+)
+from now_and_here.datastore.sqlite_store.connection_pool import StorageProfile
+
+
+def get_store_class(
+    store_type: STORE_TYPE,
+) -> type[UnstructuredSQLiteStore] | type[StructuredSQLiteStore]:
+    match store_type:
+        case "unstructured_sqlite_store":
+            return UnstructuredSQLiteStore
+        case "structured_sqlite_store":
+            return StructuredSQLiteStore
+        case _:
+            raise ValueError(f"Unknown store type: {store_type}")
 
 
 def get_store() -> DataStore:
     config = get_config()
     path = Path(config.store_file_path).expanduser()
-    if not UnstructuredSQLiteStore.exists(config.store_file_path):
+    store_class = get_store_class(config.store_type)
+    if not store_class.exists(path):
         typer.echo("No datastore found. Run 'nh init' to create one.")
         raise typer.Exit(1)
-    return UnstructuredSQLiteStore(path)
+    embedding_service = get_embedding_service()
+    embedding_service.configure(
+        threads=config.embedding_threads,
+        idle_timeout=config.embedding_idle_timeout,
+    )
+    return store_class(
+        path,
+        embedding_service=embedding_service,
+        background_embeddings=config.embedding_mode == "background",
+        vector_index=config.vector_index,
+        vector_index_factory=config.vector_index_factory,
+        vector_dimensions=config.vector_dimensions,
+        quantize_vectors=config.quantize_vectors,
+        project_suggestion_threshold=config.project_suggestion_threshold,
+        storage=StorageProfile(
+            journal_mode=config.journal_mode,
+            synchronous=config.synchronous,
+            mmap_size_mb=config.mmap_size_mb,
+            cache_size_mb=config.cache_size_mb,
+            busy_timeout=config.busy_timeout,
+            busy_retries=config.busy_retries,
+            retry_delay=config.retry_delay,
+            checkpoint_interval=config.checkpoint_interval,
+            journal_size_limit_mb=config.journal_size_limit_mb,
+        ),
+    )
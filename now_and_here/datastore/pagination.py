@@ -0,0 +1,66 @@
+import base64
+import binascii
+import json
+from typing import Any, NamedTuple
+
+from now_and_here.datastore.errors import InvalidPageTokenError
+from now_and_here.models import Task
+
+# How many tasks a page holds if the caller doesn't say.
+DEFAULT_PAGE_SIZE = 50
+
+
+class TaskPage(NamedTuple):
+    tasks: list[Task]
+    # Pass this back to get the next page; None on the last page.
+    next_page_token: str | None
+
+
+def encode_page_token(sort_by: str | None, desc: bool, sort_value: Any, id: str) -> str:
+    """
+    Make an opaque token for the page after the task with `id` and `sort_value`.
+
+    The token records the sort order too, so that it can't be used to continue a
+    differently sorted listing.
+    """
+    data = json.dumps([sort_by, desc, sort_value, id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str, sort_by: str | None, desc: bool) -> tuple[Any, str]:
+    """
+    Get the sort value and ID of the last task on the previous page from a token.
+
+    Raises InvalidPageTokenError if the token is malformed or was made for a
+    different sort order.
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        token_sort_by, token_desc, sort_value, id = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidPageTokenError("Malformed page token") from e
+    if (token_sort_by, token_desc) != (sort_by, desc) or not isinstance(id, str):
+        raise InvalidPageTokenError("Page token is for a different listing")
+    return sort_value, id
+
+
+def keyset_condition(
+    sort_key: str | None, desc: bool, sort_value: Any, id: str
+) -> tuple[str, list[Any]]:
+    """
+    An SQL condition (starting with AND) for the tasks t after a given task.
+
+    Tasks are taken to be ordered by the SQL expression `sort_key` (ascending, or
+    descending with `desc`) with nulls last, and then by ID. Without a `sort_key`,
+    they're ordered by ID alone.
+    """
+    if sort_key is None:
+        return " AND t.id > (?)", [id]
+    if sort_value is None:
+        return f" AND {sort_key} IS NULL AND t.id > (?)", [id]
+    comparison = "<" if desc else ">"
+    return (
+        f" AND ({sort_key} IS NULL OR {sort_key} {comparison} (?)"
+        f" OR ({sort_key} = (?) AND t.id > (?)))",
+        [sort_value, sort_value, id],
+    )
@@ -0,0 +1,74 @@
+import re
+from typing import Literal
+
+# How search_tasks ranks tasks: by embedding similarity ("semantic"), by keyword
+# matches alone ("lexical", which never runs the embedding model), or by fusing the two
+# rankings ("hybrid").
+SEARCH_MODE = Literal["semantic", "lexical", "hybrid"]
+
+# The usual constant for reciprocal rank fusion. Larger values flatten the difference
+# between the top few ranks of each list.
+RRF_K = 60
+
+# Typeahead text at least this long is matched anywhere in task names (the trigram
+# index can't match anything shorter).
+TRIGRAM_MIN_LENGTH = 3
+
+
+def fts_query(query: str) -> str | None:
+    """
+    Turn free text into an FTS5 query that matches any of its words.
+
+    Each whitespace-separated term becomes a phrase of the words in it, so that e.g.
+    "ABC-123" matches those two tokens next to each other. Returns None if the query
+    has no words to search for.
+    """
+    phrases = []
+    for term in query.split():
+        words = re.findall(r"\w+", term)
+        if words:
+            phrases.append('"' + " ".join(words) + '"')
+    return " OR ".join(phrases) or None
+
+
+def phrase_query(query: str) -> str | None:
+    """
+    Turn free text into an FTS5 query that matches all of its words, in order.
+
+    Returns None if the query has no words to search for.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return '"' + " ".join(words) + '"'
+
+
+def substring_query(text: str) -> str:
+    """An FTS5 query for a trigram index that matches `text` anywhere."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def name_prefix_query(text: str) -> str | None:
+    """
+    An FTS5 query that matches names with words starting with the words of `text`.
+
+    Returns None if the text has no words to search for.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return 'name : "' + " ".join(words) + '" *'
+
+
+def reciprocal_rank_fusion(*rankings: list[str], k: int = RRF_K) -> list[str]:
+    """
+    Combine rankings of IDs into one, best first.
+
+    Each ID scores 1 / (k + rank) in every ranking it appears in, so items near the
+    top of several rankings beat items at the top of just one.
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            scores[id] = scores.get(id, 0) + 1 / (k + rank)
+    return sorted(scores, key=lambda id: -scores[id])
@@ -1,3 +1,5 @@
+from .sqlite_store import SQLiteStore
+from .structured_sqlite_store import StructuredSQLiteStore
 from .unstructured_sqlite_store import UnstructuredSQLiteStore
 
-__all__ = ["UnstructuredSQLiteStore"]
+__all__ = ["SQLiteStore", "StructuredSQLiteStore", "UnstructuredSQLiteStore"]
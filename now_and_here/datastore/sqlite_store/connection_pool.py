@@ -0,0 +1,156 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """
+    How connections to a store are tuned, mostly for sharing it between processes.
+
+    The defaults suit the usual setup of `nh web` running all day while the CLI
+    writes to the same file: in WAL mode, readers and the writer don't block each
+    other, and with `synchronous="normal"` commits only wait for the disk at
+    checkpoints (a power cut can lose the last few commits, but can't corrupt the
+    store). The journal mode is stored in the database file, so it applies to every
+    process once set.
+
+    Writers still queue up behind each other. A connection waits up to
+    `busy_timeout` seconds for the write lock, and store writes that still find the
+    store locked are retried `busy_retries` more times, backing off exponentially
+    from `retry_delay` seconds.
+
+    The WAL is checkpointed (copied back into the database) every
+    `checkpoint_interval` seconds of writes, without waiting for readers, and
+    truncated to `journal_size_limit_mb` after checkpoints.
+    """
+
+    journal_mode: str = "wal"
+    synchronous: str = "normal"
+    mmap_size_mb: int = 256
+    cache_size_mb: int = 64
+    busy_timeout: float = 5
+    busy_retries: int = 5
+    retry_delay: float = 0.05
+    checkpoint_interval: float = 300
+    journal_size_limit_mb: int = 64
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        """Set up a new connection according to the profile."""
+        (journal_mode,) = conn.execute("PRAGMA journal_mode").fetchone()
+        if journal_mode != self.journal_mode:
+            try:
+                conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+            except sqlite3.OperationalError as e:
+                # Switching modes needs the store to ourselves; try again next time.
+                logger.warning(f"Could not switch to {self.journal_mode} mode: {e}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size_mb * 1024 * 1024}")
+        # Negative sizes are in KiB rather than pages.
+        conn.execute(f"PRAGMA cache_size = {-self.cache_size_mb * 1024}")
+        conn.execute(
+            f"PRAGMA journal_size_limit = {self.journal_size_limit_mb * 1024 * 1024}"
+        )
+
+
+def is_busy(error: sqlite3.Error) -> bool:
+    """Whether an error means another connection had the store locked."""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is None:
+        return False
+    # Extended codes (e.g. SQLITE_BUSY_SNAPSHOT) keep the primary code in the low byte.
+    return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+@contextmanager
+def immediate_transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Like `with conn:`, but take the write lock up front with BEGIN IMMEDIATE.
+
+    What the transaction reads then can't be changed by another writer before it
+    commits, whereas a plain transaction only locks the store at its first write.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    with conn:
+        yield conn
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of SQLite connections, one per thread.
+
+    SQLite connections can't be shared between threads, but opening a new connection
+    (and loading extensions into it) for every operation is expensive. Instead, each
+    thread gets its own connection the first time it asks for one, and reuses it for
+    the life of the pool.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        on_connect: Callable[[sqlite3.Connection], None] | None = None,
+        storage: StorageProfile | None = None,
+    ):
+        self.path = path
+        self._on_connect = on_connect
+        self.storage = storage or StorageProfile()
+        self._last_checkpoint = time.monotonic()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the connection for the current thread, opening it if needed."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is only ever used by the thread that opened it, but we need
+        # to be able to close all of them from whichever thread shuts the pool down.
+        conn = sqlite3.connect(
+            self.path, timeout=self.storage.busy_timeout, check_same_thread=False
+        )
+        self.storage.apply(conn)
+        if self._on_connect is not None:
+            self._on_connect(conn)
+        with self._lock:
+            self._connections.append(conn)
+        logger.debug(
+            f"Opened connection to {self.path} in {threading.current_thread()}"
+        )
+        return conn
+
+    def close(self) -> None:
+        """Close all connections in the pool."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            # Forget the per-thread connections so that any further use of the pool
+            # opens fresh ones rather than handing out closed connections.
+            self._local = threading.local()
+
+    def checkpoint_if_due(self) -> None:
+        """Checkpoint the WAL if `checkpoint_interval` has passed since the last one."""
+        if self.storage.journal_mode != "wal" or self.storage.checkpoint_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_checkpoint < self.storage.checkpoint_interval:
+            return
+        self._last_checkpoint = now
+        # A passive checkpoint copies what it can without waiting for readers, so it
+        # never holds up the write that triggered it.
+        busy, pages, copied = (
+            self.connection().execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        )
+        logger.debug(f"Checkpointed {copied} of {pages} WAL pages (busy: {busy})")
@@ -2,8 +2,6 @@ import logging
 import sqlite3
 from pathlib import Path
 
-import sqlite_vss
-
 TABLES = ["tasks", "projects", "labels"]
 logger = logging.getLogger(__name__)
 
@@ -11,7 +9,23 @@ logger = logging.getLogger(__name__)
 def create_db(path: Path):
     with sqlite3.connect(path) as conn:
         create_core_tables(conn)
-        create_vector_store(conn)
+        create_core_indexes(conn)
+        create_project_closure(conn)
+        create_embedding_metadata(conn)
+        create_project_centroids(conn)
+        create_task_search(conn)
+        create_task_names(conn)
+        conn.commit()
+
+
+def create_structured_db(path: Path):
+    with sqlite3.connect(path) as conn:
+        create_structured_tables(conn)
+        create_project_closure(conn)
+        create_embedding_metadata(conn)
+        create_project_centroids(conn)
+        create_task_search(conn)
+        create_task_names(conn)
         conn.commit()
 
 
@@ -28,12 +42,205 @@ def create_core_tables(conn: sqlite3.Connection):
         logger.info(f"Created table {table}")
 
 
-def create_vector_store(conn: sqlite3.Connection):
-    # Load the sqlite_vss extension.
-    conn.enable_load_extension(True)
-    sqlite_vss.load(conn)
-    conn.enable_load_extension(False)
-    stmt = "CREATE VIRTUAL TABLE IF NOT EXISTS vss_tasks USING vss0(a(384));"
+def create_core_indexes(conn: sqlite3.Connection):
+    # Tasks are joined to projects (and their closure rows) on this expression.
+    stmt = "CREATE INDEX IF NOT EXISTS tasks_project ON tasks (json ->> 'project')"
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created index tasks_project")
+
+
+def create_project_closure(conn: sqlite3.Connection):
+    stmt = (
+        "CREATE TABLE IF NOT EXISTS project_closure ("
+        "ancestor_id VARCHAR(12) NOT NULL,"
+        "descendant_id VARCHAR(12) NOT NULL,"
+        "depth INTEGER NOT NULL,"
+        "PRIMARY KEY (ancestor_id, descendant_id)"
+        ") WITHOUT ROWID"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    stmt = (
+        "CREATE INDEX IF NOT EXISTS project_closure_descendant "
+        "ON project_closure (descendant_id, depth)"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table project_closure")
+
+
+STRUCTURED_TABLES = {
+    "projects": (
+        "id VARCHAR(12) PRIMARY KEY,"
+        "name TEXT NOT NULL,"
+        "description TEXT,"
+        "parent_id VARCHAR(12)"
+    ),
+    "tasks": (
+        "id VARCHAR(12) PRIMARY KEY,"
+        "name TEXT NOT NULL,"
+        "description TEXT,"
+        "done INTEGER NOT NULL DEFAULT 0,"
+        "priority INTEGER NOT NULL DEFAULT 0,"
+        # Microseconds since the Unix epoch, so that due dates compare as integers.
+        "due INTEGER,"
+        # Repeat intervals and labels are small, never filtered on, and vary in shape,
+        # so they're kept as JSON.
+        "repeat TEXT,"
+        "labels TEXT NOT NULL DEFAULT '[]',"
+        "project_id VARCHAR(12),"
+        "parent_id VARCHAR(12)"
+    ),
+    "labels": "id VARCHAR(12) PRIMARY KEY, name TEXT NOT NULL, description TEXT",
+}
+
+# Indexes are laid out to match the filters in StructuredSQLiteStore.get_tasks, which
+# (nearly) always filters on done first.
+STRUCTURED_INDEXES = {
+    "tasks_done_due": "tasks (done, due)",
+    "tasks_done_priority": "tasks (done, priority)",
+    "tasks_project_done_due": "tasks (project_id, done, due)",
+    "tasks_parent_id": "tasks (parent_id)",
+    "projects_lower_name": "projects (lower(name))",
+}
+
+
+def create_structured_tables(conn: sqlite3.Connection):
+    for table, columns in STRUCTURED_TABLES.items():
+        stmt = f"CREATE TABLE IF NOT EXISTS {table} ({columns})"
+        logger.debug(stmt)
+        conn.execute(stmt)
+        logger.info(f"Created table {table}")
+    for index, target in STRUCTURED_INDEXES.items():
+        stmt = f"CREATE INDEX IF NOT EXISTS {index} ON {target}"
+        logger.debug(stmt)
+        conn.execute(stmt)
+        logger.info(f"Created index {index}")
+
+
+def create_vector_store(
+    conn: sqlite3.Connection, factory: str | None = None, dimensions: int = 384
+):
+    # Needs the sqlite_vss extension loaded into the connection. `factory` is a FAISS
+    # index factory string; by default, vss0 uses an exact (flat) index. `dimensions`
+    # is less than the embeddings' 384 when they're stored reduced (see
+    # create_vector_projection).
+    options = f' factory="{factory}"' if factory else ""
+    stmt = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS vss_tasks "
+        f"USING vss0(a({dimensions}){options});"
+    )
     logger.debug(stmt)
     conn.execute(stmt)
     logger.info("Created virtual table vss_tasks")
+
+
+def create_task_vectors(conn: sqlite3.Connection):
+    # A plain copy of each vector in vss_tasks, kept while it's built with a factory
+    # (such as IVF) or holds reduced vectors. Either way it can't give back the
+    # original vectors.
+    stmt = """
+    CREATE TABLE IF NOT EXISTS task_vectors (
+        rowid INTEGER PRIMARY KEY,
+        a BLOB NOT NULL
+    );
+    """
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table task_vectors")
+
+
+def create_vector_projection(conn: sqlite3.Connection):
+    # The PCA projection that vectors in vss_tasks were reduced with, if any: float32
+    # arrays of the mean vector and of the principal components, one per row.
+    stmt = """
+    CREATE TABLE IF NOT EXISTS vector_projection (
+        dimensions INTEGER NOT NULL,
+        mean BLOB NOT NULL,
+        components BLOB NOT NULL
+    );
+    """
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table vector_projection")
+
+
+def create_embedding_metadata(conn: sqlite3.Connection):
+    # Which row of vss_tasks holds each task's embedding, a hash of the text it was
+    # computed from (so that unchanged tasks aren't re-embedded), and which project's
+    # centroid the embedding has been added to.
+    stmt = (
+        "CREATE TABLE IF NOT EXISTS task_embeddings ("
+        "vector_rowid INTEGER PRIMARY KEY,"
+        "task_id VARCHAR(12) NOT NULL UNIQUE,"
+        "content_hash TEXT NOT NULL,"
+        "project_id VARCHAR(12)"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table task_embeddings")
+    # Tasks waiting to be embedded. Entries are written in the same transaction as the
+    # task itself, so pending work survives crashes.
+    stmt = (
+        "CREATE TABLE IF NOT EXISTS embedding_queue ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "task_id VARCHAR(12) NOT NULL UNIQUE"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table embedding_queue")
+    # How far an in-progress rebuild of all embeddings has got, so that an interrupted
+    # rebuild can pick up where it left off. Holds at most one row.
+    stmt = (
+        "CREATE TABLE IF NOT EXISTS embedding_rebuild ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1),"
+        "last_task_id VARCHAR(12) NOT NULL"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table embedding_rebuild")
+
+
+def create_project_centroids(conn: sqlite3.Connection):
+    # The sum and count of the (normalized) embeddings of each project's tasks, kept up
+    # to date as tasks are written, so that a project's centroid is a division away.
+    stmt = (
+        "CREATE TABLE IF NOT EXISTS project_centroids ("
+        "project_id VARCHAR(12) PRIMARY KEY,"
+        "vector_sum BLOB NOT NULL,"
+        "task_count INTEGER NOT NULL"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created table project_centroids")
+
+
+def create_task_search(conn: sqlite3.Connection):
+    # A full-text index over task names and descriptions, keyed by the same integer as
+    # each task's vector (see id_as_int).
+    stmt = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS task_search USING fts5("
+        "task_id UNINDEXED, name, description, tokenize='porter unicode61'"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created virtual table task_search")
+
+
+def create_task_names(conn: sqlite3.Connection):
+    # Trigrams of task names, for matching what's been typed so far anywhere in a name.
+    # Keyed like task_search.
+    stmt = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS task_names USING fts5("
+        "task_id UNINDEXED, name, tokenize='trigram'"
+        ")"
+    )
+    logger.debug(stmt)
+    conn.execute(stmt)
+    logger.info("Created virtual table task_names")
@@ -0,0 +1,67 @@
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingWorker:
+    """
+    A background thread that drains a store's embedding queue.
+
+    The worker wakes up when notified of new work, and also every `poll_interval`
+    seconds so that it picks up work queued by other processes (e.g. the CLI). After
+    waking it waits `batch_delay` seconds before processing, so that writes arriving in
+    quick succession are embedded together in one batch.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[], int],
+        poll_interval: float = 5,
+        batch_delay: float = 0.1,
+    ):
+        self._process = process
+        self.poll_interval = poll_interval
+        self.batch_delay = batch_delay
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-worker", daemon=True
+        )
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Let the worker know there's new work to do."""
+        self._wake.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        # Start by processing whatever is already queued, e.g. work left over from a
+        # previous run that was interrupted.
+        while not self._stop.is_set():
+            try:
+                processed = self._process()
+                if processed:
+                    logger.info(f"Embedded {processed} queued tasks")
+            except Exception:
+                logger.exception("Failed to process embedding queue")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self._stop.wait(self.batch_delay)
@@ -1,38 +1,119 @@
-PROJECTS_HIERARCHY_CTE = """
--- Initial query: Select all projects and their immediate parent ID
-SELECT p.id, p.json, '[]' AS parent_ids
-FROM projects p
-WHERE p.json ->> '$.parent' IS NULL
-UNION ALL
-
--- Recursive query: Get parent projects, linking through the parent_id
-SELECT p2.id, json_set(
-    p2.json,
-    '$.parent',
-    json(ph.json)
-) as json,
-json_insert(ph.parent_ids, '$[#]', ph.id) AS parent_ids
-FROM projects p2
-JOIN project_hierarchy ph ON p2.json ->> '$.parent' = ph.id
-"""
-
-TASKS_QUERY = f"""
-WITH RECURSIVE project_hierarchy(id, json, parent_ids) AS ({PROJECTS_HIERARCHY_CTE})
-SELECT 
-    json_set(
-        t.json,
-        '$.project',
-        json(ph.json)
-    )
-FROM tasks t
-LEFT JOIN project_hierarchy ph
-    ON t.json ->> 'project' = ph.id
-WHERE 1=1
-"""
-
-PROJECTS_QUERY = f"""
-WITH RECURSIVE project_hierarchy(id, json, parent_ids) AS ({PROJECTS_HIERARCHY_CTE})
-SELECT json
-FROM project_hierarchy ph
-WHERE 1 = 1
+"""
+SQL shared between the SQLite stores.
+
+Project hierarchies are materialized in the project_closure table, which holds a row
+for every (ancestor, descendant) pair -- including each project paired with itself at
+depth 0. Both "all ancestors of a project" and "all descendants of a project" are then
+plain indexed lookups rather than recursive queries over the whole project tree.
+"""
+
+# Stay well below SQLite's limit on bind variables in a single statement.
+MAX_BIND_VARS = 500
+
+# Fetch every ancestor of a set of projects (including the projects themselves).
+# `{projects}` is a table or subquery with (id, name, description, parent_id) columns.
+PROJECT_ANCESTORS_QUERY = """
+SELECT DISTINCT p.id, p.name, p.description, p.parent_id
+FROM project_closure c
+JOIN {projects} p ON p.id = c.ancestor_id
+WHERE c.descendant_id IN ({bind_vars})
+"""
+
+# The IDs of a project and all projects beneath it.
+PROJECT_DESCENDANTS_QUERY = """
+SELECT descendant_id FROM project_closure WHERE ancestor_id = (?)
+"""
+
+# Every project is its own ancestor at depth 0.
+INSERT_PROJECT_SELF_PATH = """
+INSERT OR IGNORE INTO project_closure (ancestor_id, descendant_id, depth)
+VALUES (:id, :id, 0)
+"""
+
+# Before moving a project (and its subtree) to a new parent, unlink the subtree from
+# all of the project's current ancestors. Paths within the subtree are kept.
+DELETE_PROJECT_ANCESTOR_PATHS = """
+DELETE FROM project_closure
+WHERE descendant_id IN (
+    SELECT descendant_id FROM project_closure WHERE ancestor_id = :id
+)
+AND ancestor_id NOT IN (
+    SELECT descendant_id FROM project_closure WHERE ancestor_id = :id
+)
+"""
+
+# Link a project's subtree to its new parent and all of that parent's ancestors.
+INSERT_PROJECT_ANCESTOR_PATHS = """
+INSERT INTO project_closure (ancestor_id, descendant_id, depth)
+SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+FROM project_closure above
+CROSS JOIN project_closure below
+WHERE above.descendant_id = :parent_id AND below.ancestor_id = :id
+"""
+
+# Rebuild the whole closure table from scratch, for stores that predate it.
+# `{projects}` is a table or subquery with (id, parent_id) columns.
+REBUILD_PROJECT_CLOSURE = """
+INSERT INTO project_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE closure(ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM {projects}
+    UNION ALL
+    SELECT p.parent_id, c.descendant_id, c.depth + 1
+    FROM closure c
+    JOIN {projects} p ON p.id = c.ancestor_id
+    WHERE p.parent_id IS NOT NULL
+)
+SELECT ancestor_id, descendant_id, depth FROM closure
+"""
+
+# Tasks for a ranked list of vector rowids, in rank order, narrowed down by `{filters}`
+# (conditions on tasks t). Parameters are the rowids as a JSON array, any parameters for
+# the filters, and a limit.
+VECTOR_HITS_QUERY = """
+SELECT {columns}
+FROM json_each(?) hits
+JOIN task_embeddings e ON e.vector_rowid = hits.value
+JOIN tasks t ON t.id = e.task_id
+WHERE 1=1{filters}
+ORDER BY hits.key
+LIMIT ?
+"""
+
+# Tasks whose text matches an FTS5 query, best match first, narrowed down by `{filters}`
+# (conditions on tasks t). Matches in a task's name count for twice as much as matches
+# in its description. Parameters are the query, any parameters for the filters, and a
+# limit.
+LEXICAL_SEARCH_QUERY = """
+SELECT {columns}
+FROM task_search s
+JOIN tasks t ON t.id = s.task_id
+WHERE task_search MATCH (?){filters}
+ORDER BY bm25(task_search, 0.0, 2.0, 1.0)
+LIMIT ?
+"""
+
+# Tasks still waiting to be embedded whose text matches an FTS5 query, best match
+# first, narrowed down by `{filters}` (conditions on tasks t). Parameters are the query,
+# any parameters for the filters, and a limit.
+PENDING_SEARCH_QUERY = """
+SELECT {columns}
+FROM task_search s
+JOIN embedding_queue q ON q.task_id = s.task_id
+JOIN tasks t ON t.id = s.task_id
+WHERE task_search MATCH (?){filters}
+ORDER BY s.rank
+LIMIT ?
+"""
+
+# Tasks whose names match an FTS5 query against `{index}` (task_names or task_search),
+# for typeahead. Names that start with the typed text come first, then the best
+# matches. Parameters are the query, any parameters for the filters, the typed text,
+# and a limit.
+TYPEAHEAD_QUERY = """
+SELECT {columns}
+FROM {index} s
+JOIN tasks t ON t.id = s.task_id
+WHERE {index} MATCH (?){filters}
+ORDER BY instr(lower(s.name), lower(?)) != 1, s.rank
+LIMIT ?
 """
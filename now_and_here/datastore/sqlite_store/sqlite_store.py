@@ -0,0 +1,1647 @@
+import functools
+import json
+import logging
+import math
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Concatenate,
+    Iterable,
+    Iterator,
+    ParamSpec,
+    TypeVar,
+    get_args,
+)
+
+import numpy as np
+import sqlite_vss
+from tzlocal import get_localzone
+from zoneinfo import ZoneInfo
+
+from now_and_here.datastore.embeddings import (
+    EmbeddingService,
+    content_hash,
+    doc_from_task,
+    get_embedding_service,
+)
+from now_and_here.datastore.errors import InvalidSortError, RecordNotFoundError
+from now_and_here.datastore.pagination import (
+    DEFAULT_PAGE_SIZE,
+    TaskPage,
+    decode_page_token,
+    encode_page_token,
+    keyset_condition,
+)
+from now_and_here.datastore.search import (
+    SEARCH_MODE,
+    TRIGRAM_MIN_LENGTH,
+    fts_query,
+    name_prefix_query,
+    phrase_query,
+    reciprocal_rank_fusion,
+    substring_query,
+)
+from now_and_here.datastore.vector_index import (
+    AppendOnlyVectorIndex,
+    DeferredRemovals,
+    NumpyVectorIndex,
+    VectorIndex,
+)
+from now_and_here.datastore.vector_index.clustering import (
+    leader_groups,
+    similarity_clusters,
+)
+from now_and_here.datastore.vector_index.numpy_index import normalize
+from now_and_here.models import Label, Project, ProjectRef, Task, TaskRow
+from now_and_here.models.common import decode_id_from_int, id_as_int
+from now_and_here.models.label import LabelListModel
+from now_and_here.models.repeat_interval import RepeatIntervalModel
+
+from .connection_pool import (
+    ConnectionPool,
+    StorageProfile,
+    immediate_transaction,
+    is_busy,
+)
+from .create import (
+    create_embedding_metadata,
+    create_project_centroids,
+    create_project_closure,
+    create_task_names,
+    create_task_search,
+)
+from .embedding_worker import EmbeddingWorker
+from .queries import (
+    DELETE_PROJECT_ANCESTOR_PATHS,
+    INSERT_PROJECT_ANCESTOR_PATHS,
+    INSERT_PROJECT_SELF_PATH,
+    LEXICAL_SEARCH_QUERY,
+    MAX_BIND_VARS,
+    PENDING_SEARCH_QUERY,
+    PROJECT_ANCESTORS_QUERY,
+    PROJECT_DESCENDANTS_QUERY,
+    REBUILD_PROJECT_CLOSURE,
+    TYPEAHEAD_QUERY,
+    VECTOR_HITS_QUERY,
+)
+from .vss_index import VSSVectorIndex
+
+# How many queued tasks are embedded together.
+EMBEDDING_BATCH_SIZE = 64
+# Filtered searches matching at most this many tasks compare the query against each of
+# their vectors directly, rather than searching the whole index.
+PREFILTER_MAX_CANDIDATES = 2000
+# Hybrid searches fuse this many results per requested result from each ranking, so
+# that tasks ranked well by both, but first by neither, still make the cut.
+HYBRID_SEARCH_DEPTH = 4
+# How many rows `iter_tasks` reads (and builds tasks from) at a time.
+ITER_BATCH_SIZE = 256
+# How similar (cosine) a task must be to a project's centroid for the project to be
+# suggested for it.
+PROJECT_SUGGESTION_THRESHOLD = 0.7
+
+logger = logging.getLogger(__name__)
+
+S = TypeVar("S", bound="SQLiteStore")
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def retry_when_busy(
+    method: Callable[Concatenate[S, P], R],
+) -> Callable[Concatenate[S, P], R]:
+    """
+    Retry a store write, with backoff, if another process has the store locked.
+
+    Only methods that commit their own transaction before anything else can fail are
+    safe to retry. Methods called inside another transaction aren't retried on their
+    own, since the failure rolls back the whole transaction.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self: S, *args: P.args, **kwargs: P.kwargs) -> R:
+        if self.conn.in_transaction:
+            return method(self, *args, **kwargs)
+        storage = self._pool.storage
+        attempt = 0
+        while True:
+            try:
+                result = method(self, *args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not is_busy(e) or attempt >= storage.busy_retries:
+                    raise
+                if self.conn.in_transaction:
+                    # The commit itself failed.
+                    self.conn.rollback()
+                # Jitter keeps writers that collided from retrying in lockstep.
+                delay = storage.retry_delay * 2**attempt * random.uniform(0.5, 1.5)
+                logger.info(f"Store is busy, retrying in {delay:.2f}s: {e}")
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self._pool.checkpoint_if_due()
+                return result
+
+    return wrapper
+
+
+def load_extensions(conn: sqlite3.Connection) -> None:
+    conn.enable_load_extension(True)
+    sqlite_vss.load(conn)
+    conn.enable_load_extension(False)
+
+
+class SQLiteStore:
+    """
+    Behavior shared by all SQLite-backed stores.
+
+    Subclasses decide how tasks and projects are laid out in tables; everything that
+    can be expressed in terms of reading and writing whole tasks (embeddings, search,
+    checking tasks off) lives here, as does reading projects.
+    """
+
+    # A table or subquery exposing projects as (id, name, description, parent_id).
+    PROJECTS_TABLE = "projects"
+    # The columns of tasks t that _tasks_from_rows builds tasks from.
+    TASK_COLUMNS = "t.*"
+    # The columns of tasks t that get_task_rows reads: id, name, description, done,
+    # priority, due, repeat (as JSON), project ID, labels (as JSON) and parent ID.
+    TASK_ROW_COLUMNS = (
+        "t.id, t.name, t.description, t.done, t.priority, t.due, t.repeat, t.project_id,"
+        " t.labels, t.parent_id"
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        embedding_service: EmbeddingService | None = None,
+        background_embeddings: bool = False,
+        vector_index: str = "vss",
+        vector_index_factory: str | None = None,
+        vector_dimensions: int | None = None,
+        quantize_vectors: bool = False,
+        storage: StorageProfile | None = None,
+        project_suggestion_threshold: float = PROJECT_SUGGESTION_THRESHOLD,
+    ):
+        """
+        Open the store at `path`.
+
+        Writes queue their tasks for embedding in the same transaction as the write
+        itself. By default, the queue is then processed right away, before the write
+        returns. With `background_embeddings`, writes return immediately and the queue
+        is left for the embedding worker (see `start_embedding_worker`).
+
+        Embeddings are kept in a `vector_index`: "vss" (the sqlite_vss extension, in
+        the database itself) or "numpy" (a memory-mapped file next to the database).
+        The vss index can be built with a FAISS `vector_index_factory`, such as an
+        IVF index that only searches the clusters nearest the query, and can hold
+        vectors reduced to `vector_dimensions` (see `VSSVectorIndex`). The numpy index
+        can scan int8 codes for its vectors first, with `quantize_vectors` (see
+        `NumpyVectorIndex`).
+
+        Connections are tuned according to the `storage` profile, which by default
+        lets the store be shared between processes (see `StorageProfile`).
+
+        Projects are only suggested for tasks at least `project_suggestion_threshold`
+        similar to them (see `suggest_project`).
+        """
+        self.path = path
+        self._pool = ConnectionPool(
+            path,
+            on_connect=load_extensions if vector_index == "vss" else None,
+            storage=storage,
+        )
+        self.vector_index = self._open_vector_index(
+            vector_index, vector_index_factory, vector_dimensions, quantize_vectors
+        )
+        self.embedding_service = embedding_service or get_embedding_service()
+        self.background_embeddings = background_embeddings
+        self.project_suggestion_threshold = project_suggestion_threshold
+        self._embedding_worker = EmbeddingWorker(self.process_embedding_queue)
+        self._upgrade()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """The connection for the current thread."""
+        return self._pool.connection()
+
+    @contextmanager
+    def _vector_transaction(
+        self, immediate: bool = False
+    ) -> Iterator[tuple[sqlite3.Connection, VectorIndex | DeferredRemovals]]:
+        """
+        A write transaction, like `with self.conn`, that also changes vectors.
+
+        Yields the connection and what to add or remove vectors through. The vss
+        index writes through the connection, so its changes are part of the
+        transaction. The numpy index's files can't be rolled back, so vectors are
+        added to it straight away, before the rows referring to them commit, while
+        removals (including of the vectors being replaced) are held until the
+        transaction has committed. If it rolls back, the added vectors are dropped
+        (see `DeferredRemovals`).
+
+        With `immediate`, the write lock is taken up front (see
+        `immediate_transaction`).
+        """
+        conn = self.conn
+        vectors: VectorIndex | DeferredRemovals = self.vector_index
+        if isinstance(self.vector_index, AppendOnlyVectorIndex):
+            vectors = DeferredRemovals(self.vector_index)
+        with immediate_transaction(conn) if immediate else conn:
+            try:
+                yield conn, vectors
+            except BaseException:
+                if isinstance(vectors, DeferredRemovals):
+                    # Before the rollback, so while still holding the write lock.
+                    vectors.discard()
+                raise
+        if isinstance(vectors, DeferredRemovals) and vectors:
+            try:
+                with immediate_transaction(conn):
+                    vectors.apply()
+            except sqlite3.OperationalError as e:
+                if not is_busy(e):
+                    raise
+                # The transaction has been committed, so it mustn't be retried. The
+                # vectors are left behind, unused, until the index is compacted.
+                logger.warning(f"Store is busy, leaving removed vectors behind: {e}")
+
+    def _open_vector_index(
+        self,
+        vector_index: str,
+        factory: str | None,
+        dimensions: int | None,
+        quantized: bool,
+    ) -> VectorIndex:
+        match vector_index:
+            case "vss":
+                if quantized:
+                    raise ValueError("Quantized vectors need the numpy vector index")
+                return VSSVectorIndex(
+                    self._pool, factory=factory, dimensions=dimensions
+                )
+            case "numpy":
+                if factory:
+                    raise ValueError("Index factories need the vss vector index")
+                if dimensions:
+                    raise ValueError("Reduced vectors need the vss vector index")
+                return NumpyVectorIndex(self.path, quantized=quantized)
+            case _:
+                raise ValueError(f"Unknown vector index: {vector_index}")
+
+    def close(self) -> None:
+        """Stop background work and close all open connections to the store."""
+        self._embedding_worker.stop()
+        self.vector_index.close()
+        self._pool.close()
+
+    def start_embedding_worker(self) -> None:
+        """Start embedding queued tasks in a background thread."""
+        self._embedding_worker.start()
+
+    @classmethod
+    def exists(cls, path: Path) -> bool:
+        return path.exists()
+
+    def _upgrade(self) -> None:
+        """Add any tables that stores created by older versions are missing."""
+        with self.conn as conn:
+            cursor = conn.execute(
+                "SELECT name FROM sqlite_master WHERE name='project_closure'"
+            )
+            if cursor.fetchone() is None:
+                create_project_closure(conn)
+                conn.execute(
+                    REBUILD_PROJECT_CLOSURE.format(projects=self.PROJECTS_TABLE)
+                )
+            cursor = conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE name IN ('task_embeddings', 'vss_tasks', 'project_centroids')"
+            )
+            existing = {name for (name,) in cursor.fetchall()}
+            create_embedding_metadata(conn)
+            cursor = conn.execute("PRAGMA table_info(task_embeddings)")
+            if "project_id" not in {column for _, column, *_ in cursor.fetchall()}:
+                conn.execute(
+                    "ALTER TABLE task_embeddings ADD COLUMN project_id VARCHAR(12)"
+                )
+            if (
+                isinstance(self.vector_index, VSSVectorIndex)
+                and "vss_tasks" in existing
+                and "task_embeddings" not in existing
+            ):
+                self._backfill_embedding_metadata(conn)
+            cursor = conn.execute("SELECT 1 FROM task_embeddings LIMIT 1")
+            if cursor.fetchone() is not None and self.vector_index.is_empty():
+                # The vectors have gone missing, e.g. because the store was switched to
+                # a different kind of vector index. Queue everything to be embedded.
+                conn.execute(
+                    "INSERT OR IGNORE INTO embedding_queue (task_id) "
+                    "SELECT task_id FROM task_embeddings"
+                )
+                conn.execute("DELETE FROM task_embeddings")
+                conn.execute("DROP TABLE IF EXISTS project_centroids")
+            cursor = conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE name IN ('project_centroids', 'task_search', 'task_names')"
+            )
+            existing = {name for (name,) in cursor.fetchall()}
+        if "project_centroids" not in existing:
+            self._rebuild_project_centroids()
+        if not {"task_search", "task_names"} <= existing:
+            self._rebuild_task_search()
+
+    @staticmethod
+    def _backfill_embedding_metadata(conn: sqlite3.Connection) -> None:
+        """
+        Map existing vectors to their tasks, for stores that predate task_embeddings.
+
+        Vectors were stored under `id_as_int(task.id)`. Their content hashes aren't
+        known, so each task is re-embedded the next time it's written.
+        """
+        cursor = conn.execute("SELECT rowid FROM vss_tasks")
+        conn.executemany(
+            "INSERT OR IGNORE INTO task_embeddings (vector_rowid, task_id, content_hash) "
+            "SELECT (?), id, '' FROM tasks WHERE id = (?)",
+            [(row_id, decode_id_from_int(row_id)) for (row_id,) in cursor.fetchall()],
+        )
+
+    def _rebuild_project_centroids(self) -> None:
+        """Compute every project's centroid from scratch, for stores without them."""
+        with self.conn as conn:
+            cursor = conn.execute("SELECT task_id FROM task_embeddings")
+            task_ids = [id for (id,) in cursor.fetchall()]
+        projects = {
+            task.id: task.project.id if task.project else None
+            for task in self.get_tasks_by_ids(task_ids)
+        }
+        # The table is only created along with its contents, so that if this is
+        # interrupted, it starts over the next time the store is opened.
+        with self.conn as conn:
+            create_project_centroids(conn)
+            conn.execute("UPDATE task_embeddings SET project_id = NULL")
+            for start in range(0, len(task_ids), MAX_BIND_VARS):
+                chunk = task_ids[start : start + MAX_BIND_VARS]
+                self._move_centroid_members(
+                    conn, {id: projects[id] for id in chunk if id in projects}
+                )
+
+    def _rebuild_task_search(self) -> None:
+        """Index the text of every task, for stores without the full-text indexes."""
+        with self.conn as conn:
+            cursor = conn.execute("SELECT id FROM tasks")
+            tasks = self.get_tasks_by_ids([id for (id,) in cursor.fetchall()])
+        # As with the centroids, the tables only appear once they're complete.
+        with self.conn as conn:
+            conn.execute("DROP TABLE IF EXISTS task_search")
+            conn.execute("DROP TABLE IF EXISTS task_names")
+            create_task_search(conn)
+            create_task_names(conn)
+            self._index_task_text(conn, tasks)
+
+    def get_task(self, id: str) -> Task:
+        raise NotImplementedError
+
+    def get_tasks(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> list[Task]:
+        """Pull items from the tasks table."""
+        return list(
+            self.iter_tasks(
+                project_name=project_name,
+                project_id=project_id,
+                include_child_projects=include_child_projects,
+                sort_by=sort_by,
+                desc=desc,
+                include_done=include_done,
+                due_before=due_before,
+            )
+        )
+
+    def iter_tasks(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> Iterator[Task]:
+        """
+        Like `get_tasks`, but build tasks as they're read, ITER_BATCH_SIZE rows at a
+        time, so only one batch is held in memory however many tasks match.
+
+        Bad filters or sorts raise here rather than once iteration starts.
+        """
+        filters, params = self._task_filters(
+            project_name=project_name,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+            due_before=due_before,
+        )
+        query = f"SELECT {self.TASK_COLUMNS} FROM tasks t WHERE 1=1{filters}"
+        if sort_by:
+            direction = "DESC" if desc else "ASC"
+            query += f" ORDER BY {self._sort_key(sort_by)} {direction} NULLS LAST"
+        return self._iter_tasks_from_query(query, params)
+
+    def get_task_rows(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> list[TaskRow]:
+        """
+        Like `get_tasks`, but read only what task lists show, as lightweight rows.
+        """
+        filters, params = self._task_filters(
+            project_name=project_name,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+            due_before=due_before,
+        )
+        query = f"SELECT {self.TASK_ROW_COLUMNS} FROM tasks t WHERE 1=1{filters}"
+        if sort_by:
+            direction = "DESC" if desc else "ASC"
+            query += f" ORDER BY {self._sort_key(sort_by)} {direction} NULLS LAST"
+        with self.conn as conn:
+            cursor = conn.execute(query, params)
+            rows = cursor.fetchall()
+            project_ids = list({row[7] for row in rows if row[7] is not None})
+            projects: dict[str, ProjectRef] = {}
+            for start in range(0, len(project_ids), MAX_BIND_VARS):
+                chunk = project_ids[start : start + MAX_BIND_VARS]
+                cursor = conn.execute(
+                    f"SELECT id, name FROM {self.PROJECTS_TABLE} "
+                    f"WHERE id IN ({','.join('?' for _ in chunk)})",
+                    chunk,
+                )
+                projects.update((id, ProjectRef(id, name)) for id, name in cursor)
+        # Labels and repeats are shared by many tasks, so decode each only once.
+        labels = {
+            text: tuple(LabelListModel.validate_json(text))
+            for text in {row[8] for row in rows if row[8]}
+        }
+        repeats = {
+            text: RepeatIntervalModel.validate_json(text)
+            for text in {row[6] for row in rows if row[6]}
+        }
+        return [
+            TaskRow(
+                id=id,
+                name=name,
+                description=description,
+                done=bool(done),
+                priority=priority,
+                due=self._due_from_column(due) if due is not None else None,
+                repeat=repeats[repeat] if repeat else None,
+                project=projects.get(project_id) if project_id else None,
+                labels=labels[task_labels] if task_labels else (),
+                parent_id=parent_id,
+            )
+            for (
+                id,
+                name,
+                description,
+                done,
+                priority,
+                due,
+                repeat,
+                project_id,
+                task_labels,
+                parent_id,
+            ) in rows
+        ]
+
+    def _due_from_column(self, value: Any) -> datetime:
+        """Convert a due date as TASK_ROW_COLUMNS selects it to a datetime."""
+        raise NotImplementedError
+
+    def _iter_tasks_from_query(self, query: str, params: list[Any]) -> Iterator[Task]:
+        cursor = self.conn.execute(query, params)
+        # Shared across batches, so each project is fetched (and built) only once.
+        projects: dict[str, Project] = {}
+        try:
+            while rows := cursor.fetchmany(ITER_BATCH_SIZE):
+                yield from self._tasks_from_rows(rows, projects)
+        finally:
+            cursor.close()
+
+    def get_tasks_page(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        sort_by: str | None = None,
+        desc: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        page_token: str | None = None,
+    ) -> TaskPage:
+        """
+        Get one page of the tasks `get_tasks` would return.
+
+        Pass the page's `next_page_token` back (with the same sort) to get the page
+        after it. Pages pick up after the last task seen rather than skipping a
+        number of rows, so each costs the same however deep into the list it is, and
+        tasks added or removed between pages don't shift the rest. Tasks with the
+        same sort value are ordered by ID.
+        """
+        if limit < 1:
+            raise ValueError("Pages must hold at least one task")
+        filters, params = self._task_filters(
+            project_name=project_name,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+            due_before=due_before,
+        )
+        sort_key = self._sort_key(sort_by) if sort_by else None
+        if page_token:
+            sort_value, after_id = decode_page_token(page_token, sort_by, desc)
+            condition, condition_params = keyset_condition(
+                sort_key, desc, sort_value, after_id
+            )
+            filters += condition
+            params += condition_params
+        order = "t.id"
+        if sort_key:
+            direction = "DESC" if desc else "ASC"
+            order = f"{sort_key} {direction} NULLS LAST, t.id"
+        with self.conn as conn:
+            cursor = conn.execute(
+                f"SELECT {self.TASK_COLUMNS}, {sort_key or 'NULL'}, t.id "
+                f"FROM tasks t WHERE 1=1{filters} ORDER BY {order} LIMIT (?)",
+                [*params, limit + 1],
+            )
+            rows = cursor.fetchall()
+        # The extra row only says whether there's another page.
+        next_page_token = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_page_token = encode_page_token(sort_by, desc, *rows[-1][-2:])
+        return TaskPage(
+            self._tasks_from_rows([row[:-2] for row in rows]), next_page_token
+        )
+
+    def get_tasks_by_ids(self, ids: list[str]) -> list[Task]:
+        """Fetch tasks by ID, in the order given. IDs with no task are skipped."""
+        rows = []
+        with self.conn as conn:
+            for start in range(0, len(ids), MAX_BIND_VARS):
+                chunk = ids[start : start + MAX_BIND_VARS]
+                cursor = conn.execute(
+                    f"SELECT {self.TASK_COLUMNS} FROM tasks t "
+                    f"WHERE t.id IN ({','.join('?' for _ in chunk)})",
+                    chunk,
+                )
+                rows.extend(cursor.fetchall())
+        tasks = {task.id: task for task in self._tasks_from_rows(rows)}
+        return [tasks[id] for id in ids if id in tasks]
+
+    def _tasks_from_rows(
+        self, rows: list[Any], projects: dict[str, Project] | None = None
+    ) -> list[Task]:
+        """
+        Build tasks from rows of TASK_COLUMNS.
+
+        The whole batch is decoded and validated in one call (see TaskListModel),
+        rather than task by task. Tasks in the same project share one Project object,
+        which is taken from `projects` if it's there (and added to it if not).
+        """
+        raise NotImplementedError
+
+    def _referenced_records(
+        self,
+        project_ids: set[str],
+        parent_ids: set[str],
+        projects: dict[str, Project] | None = None,
+    ) -> tuple[dict[str, Project], dict[str, Task]]:
+        """The projects and parent tasks referred to by rows, by ID."""
+        if projects is None:
+            projects = {}
+        missing = project_ids - projects.keys()
+        if missing:
+            projects.update(self._get_projects_by_id(missing))
+        parents = {}
+        if parent_ids:
+            parents = {
+                task.id: task for task in self.get_tasks_by_ids(list(parent_ids))
+            }
+        return projects, parents
+
+    def _sort_key(self, sort_by: str) -> str:
+        """The SQL expression on tasks t to sort by, after checking it's sortable."""
+        # Some very limited validation to avoid extremely easy sql injection.
+        if sort_by not in Task.sortable_columns():
+            raise InvalidSortError(f"Cannot sort on column {sort_by}")
+        return self._sort_column(sort_by)
+
+    def _sort_column(self, sort_by: str) -> str:
+        """The SQL expression for a sortable task field on tasks t."""
+        raise NotImplementedError
+
+    def _task_filters(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> tuple[str, list[Any]]:
+        """SQL conditions on tasks t (each starting with AND), and their parameters."""
+        raise NotImplementedError
+
+    def _insert_tasks(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        """Write new tasks to the tasks table."""
+        raise NotImplementedError
+
+    def _update_task_rows(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        """Overwrite existing tasks in the tasks table, matching them by ID."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _existing_task_ids(conn: sqlite3.Connection, ids: list[str]) -> set[str]:
+        existing: set[str] = set()
+        for start in range(0, len(ids), MAX_BIND_VARS):
+            chunk = ids[start : start + MAX_BIND_VARS]
+            cursor = conn.execute(
+                f"SELECT id FROM tasks WHERE id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            existing.update(id for (id,) in cursor.fetchall())
+        return existing
+
+    def save_task(self, task: Task) -> str:
+        return self.save_tasks([task])[0]
+
+    @retry_when_busy
+    def save_tasks(self, tasks: list[Task]) -> list[str]:
+        """Save new tasks in one transaction. Returns their IDs."""
+        with self.conn as conn:
+            self._insert_tasks(conn, tasks)
+            self._tasks_written(conn, tasks)
+        self._embeddings_enqueued()
+        return [task.id for task in tasks]
+
+    def update_task(self, id: str, task: Task) -> None:
+        if task.id != id:
+            raise ValueError(f"Task {task.id} can't be saved as task {id}")
+        self.update_tasks([task])
+
+    @retry_when_busy
+    def update_tasks(self, tasks: list[Task]) -> None:
+        """
+        Overwrite existing tasks, matched by ID, in one transaction.
+
+        If any of the tasks doesn't exist, raises RecordNotFoundError without updating
+        any of them.
+        """
+        with self.conn as conn:
+            ids = [task.id for task in tasks]
+            missing = set(ids) - self._existing_task_ids(conn, ids)
+            if missing:
+                raise RecordNotFoundError(f"No task with id {', '.join(missing)}")
+            self._update_task_rows(conn, tasks)
+            self._tasks_written(conn, tasks)
+        self._embeddings_enqueued()
+
+    def delete_task(self, id: str) -> bool:
+        return bool(self.delete_tasks([id]))
+
+    @retry_when_busy
+    def delete_tasks(self, ids: list[str]) -> list[str]:
+        """Delete tasks in one transaction, returning the IDs of those that existed."""
+        with self._vector_transaction() as (conn, vectors):
+            return self._delete_task_rows(conn, vectors, ids)
+
+    @retry_when_busy
+    def merge_tasks(self, task: Task, duplicates: list[Task]) -> Task:
+        """
+        Fold duplicates into a task and delete them, in one transaction.
+
+        The merged task (see `Task.merge`) is saved over `task` and returned. If `task`
+        doesn't exist, raises RecordNotFoundError without changing anything.
+        """
+        merged = task.merge(duplicates)
+        with self._vector_transaction() as (conn, vectors):
+            if not self._existing_task_ids(conn, [task.id]):
+                raise RecordNotFoundError(f"No task with id {task.id}")
+            self._update_task_rows(conn, [merged])
+            self._tasks_written(conn, [merged])
+            self._delete_task_rows(
+                conn, vectors, [t.id for t in duplicates if t.id != task.id]
+            )
+        self._embeddings_enqueued()
+        return merged
+
+    def _delete_task_rows(
+        self,
+        conn: sqlite3.Connection,
+        vectors: VectorIndex | DeferredRemovals,
+        ids: list[str],
+    ) -> list[str]:
+        """Delete the tasks that exist, in the current transaction. Returns the IDs."""
+        existing = self._existing_task_ids(conn, ids)
+        deleted = [id for id in dict.fromkeys(ids) if id in existing]
+        self._tasks_deleted(conn, vectors, deleted)
+        conn.executemany("DELETE FROM tasks WHERE id = (?)", [(id,) for id in deleted])
+        return deleted
+
+    def save_project(self, project: Project) -> str:
+        raise NotImplementedError
+
+    def update_project(self, id: str, project: Project) -> None:
+        raise NotImplementedError
+
+    def _tasks_written(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        """
+        Bring indexes up to date with newly saved or updated tasks.
+
+        This should be called in the same transaction that writes the tasks.
+        """
+        self._index_task_text(conn, tasks)
+        self._enqueue_embeddings(conn, tasks)
+
+    def _tasks_deleted(
+        self,
+        conn: sqlite3.Connection,
+        vectors: VectorIndex | DeferredRemovals,
+        ids: list[str],
+    ) -> None:
+        """
+        Remove tasks from indexes, in the same transaction that deletes them.
+
+        Their vectors are removed through `vectors` (see `_vector_transaction`).
+        """
+        row_ids = [(id_as_int(id),) for id in ids]
+        conn.executemany("DELETE FROM task_search WHERE rowid = (?)", row_ids)
+        conn.executemany("DELETE FROM task_names WHERE rowid = (?)", row_ids)
+        self._move_centroid_members(conn, {id: None for id in ids})
+        for start in range(0, len(ids), MAX_BIND_VARS):
+            chunk = ids[start : start + MAX_BIND_VARS]
+            cursor = conn.execute(
+                "SELECT vector_rowid FROM task_embeddings "
+                f"WHERE task_id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            vectors.remove([row_id for (row_id,) in cursor.fetchall()])
+        conn.executemany(
+            "DELETE FROM task_embeddings WHERE task_id = (?)", [(id,) for id in ids]
+        )
+        conn.executemany(
+            "DELETE FROM embedding_queue WHERE task_id = (?)", [(id,) for id in ids]
+        )
+
+    @staticmethod
+    def _index_task_text(conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO task_search (rowid, task_id, name, description) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (id_as_int(task.id), task.id, task.name, task.description)
+                for task in tasks
+            ],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO task_names (rowid, task_id, name) VALUES (?, ?, ?)",
+            [(id_as_int(task.id), task.id, task.name) for task in tasks],
+        )
+
+    def _enqueue_embeddings(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        """
+        Queue tasks whose text has changed to be embedded.
+
+        This should be called in the same transaction that writes the tasks, so that
+        the queue survives a crash whenever the write does.
+        """
+        hashes = {task.id: content_hash(doc_from_task(task)) for task in tasks}
+        ids = list(hashes)
+        current: dict[str, str] = {}
+        for start in range(0, len(ids), MAX_BIND_VARS):
+            chunk = ids[start : start + MAX_BIND_VARS]
+            cursor = conn.execute(
+                "SELECT task_id, content_hash FROM task_embeddings "
+                f"WHERE task_id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            current.update(cursor.fetchall())
+        stale_ids = [id for id, hash in hashes.items() if current.get(id) != hash]
+        # Tasks that keep their text take their existing embedding with them if they
+        # move to another project. (Stale tasks move when they're re-embedded.)
+        self._move_centroid_members(
+            conn,
+            {
+                task.id: task.project.id if task.project else None
+                for task in tasks
+                if task.id in current and task.id not in stale_ids
+            },
+        )
+        # Replacing a task's existing entry gives it a new sequence number, which
+        # tells a worker that's currently embedding the old text not to dequeue it.
+        conn.executemany(
+            "INSERT OR REPLACE INTO embedding_queue (task_id) VALUES (?)",
+            [(id,) for id in stale_ids],
+        )
+
+    def _embeddings_enqueued(self) -> None:
+        """Process newly queued embeddings, or hand them to the worker."""
+        if self.background_embeddings:
+            self._embedding_worker.notify()
+            return
+        try:
+            self.process_embedding_queue()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+            # The write itself has been committed, so it mustn't be retried. The
+            # tasks stay queued, and are embedded the next time the queue is processed.
+            logger.warning(f"Store is busy, leaving tasks queued for embedding: {e}")
+
+    def pending_embeddings(self) -> int:
+        """The number of tasks waiting to be embedded."""
+        with self.conn as conn:
+            cursor = conn.execute("SELECT count(*) FROM embedding_queue")
+            (count,) = cursor.fetchone()
+        return count
+
+    def process_embedding_queue(self, batch_size: int = EMBEDDING_BATCH_SIZE) -> int:
+        """
+        Embed queued tasks, a batch at a time, until the queue is empty.
+
+        Returns the number of queue entries processed.
+        """
+        processed = 0
+        while True:
+            with self.conn as conn:
+                cursor = conn.execute(
+                    "SELECT seq, task_id FROM embedding_queue ORDER BY seq LIMIT (?)",
+                    (batch_size,),
+                )
+                entries = cursor.fetchall()
+            if not entries:
+                return processed
+            # Tasks deleted since they were queued simply won't be found.
+            tasks = self.get_tasks_by_ids([task_id for _, task_id in entries])
+            if tasks:
+                self._update_embeddings(tasks)
+            # If we crash before this, the batch is processed again on the next run;
+            # the content hashes make that cheap.
+            with self.conn as conn:
+                conn.executemany(
+                    "DELETE FROM embedding_queue WHERE seq = (?)",
+                    [(seq,) for seq, _ in entries],
+                )
+            processed += len(entries)
+
+    def _update_embeddings(self, tasks: list[Task], force: bool = False) -> None:
+        """
+        Embed tasks and store the results in the vector table.
+
+        Tasks whose text hasn't changed since they were last embedded are skipped
+        (unless `force` is set), so that e.g. checking a task off doesn't need the
+        model.
+        """
+        hashes = {task.id: content_hash(doc_from_task(task)) for task in tasks}
+        if not force:
+            bind_vars = ",".join("?" for _ in hashes)
+            with self.conn as conn:
+                cursor = conn.execute(
+                    "SELECT task_id, content_hash FROM task_embeddings "
+                    f"WHERE task_id IN ({bind_vars})",
+                    list(hashes),
+                )
+                current = dict(cursor.fetchall())
+            tasks = [task for task in tasks if current.get(task.id) != hashes[task.id]]
+        if not tasks:
+            return
+
+        documents = [doc_from_task(task) for task in tasks]
+        # Vectors are keyed by integers, so we need to convert the task IDs.
+        row_ids = [id_as_int(task.id) for task in tasks]
+        embeddings = self.embedding_service.embed(documents)
+
+        project_ids = [task.project.id if task.project else None for task in tasks]
+        with self._vector_transaction() as (conn, vectors):
+            # Take the old embeddings out of their centroids before replacing them.
+            self._move_centroid_members(conn, {task.id: None for task in tasks})
+            conn.executemany(
+                "INSERT OR REPLACE INTO task_embeddings "
+                "(vector_rowid, task_id, content_hash, project_id) VALUES (?, ?, ?, ?)",
+                [
+                    (row_id, task.id, hashes[task.id], project_id)
+                    for row_id, task, project_id in zip(row_ids, tasks, project_ids)
+                ],
+            )
+            vectors.add(row_ids, np.stack(embeddings))
+            self._shift_centroids(
+                conn,
+                [
+                    (project_id, embedding, 1)
+                    for project_id, embedding in zip(project_ids, embeddings)
+                ],
+            )
+
+    def _copy_embeddings(
+        self,
+        conn: sqlite3.Connection,
+        vectors: VectorIndex | DeferredRemovals,
+        copies: list[tuple[str, Task]],
+    ) -> None:
+        """
+        Give new tasks copies of other tasks' stored embeddings.
+
+        This is for tasks with the same text (e.g. the next occurrence of a repeating
+        task), so that they don't need to be run through the model. `copies` pairs the
+        ID of each source task with the new task. The source tasks' embeddings are left
+        as-is; sources without an embedding are skipped. The copies are added through
+        `vectors` (see `_vector_transaction`).
+        """
+        sources: dict[str, tuple[int, str]] = {}
+        from_ids = [from_id for from_id, _ in copies]
+        for start in range(0, len(from_ids), MAX_BIND_VARS):
+            chunk = from_ids[start : start + MAX_BIND_VARS]
+            cursor = conn.execute(
+                "SELECT task_id, vector_rowid, content_hash FROM task_embeddings "
+                f"WHERE task_id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            sources.update((id, (row_id, hash)) for id, row_id, hash in cursor)
+        stored = self.vector_index.get([row_id for row_id, _ in sources.values()])
+        rows = []
+        copied = []
+        for from_id, to_task in copies:
+            if from_id not in sources or sources[from_id][0] not in stored:
+                continue
+            from_row_id, hash = sources[from_id]
+            project_id = to_task.project.id if to_task.project else None
+            rows.append((id_as_int(to_task.id), to_task.id, hash, project_id))
+            copied.append(stored[from_row_id])
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT OR REPLACE INTO task_embeddings "
+            "(vector_rowid, task_id, content_hash, project_id) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        vectors.add([row_id for row_id, *_ in rows], np.stack(copied))
+        self._shift_centroids(
+            conn,
+            [(project_id, vector, 1) for (*_, project_id), vector in zip(rows, copied)],
+        )
+
+    def _move_centroid_members(
+        self, conn: sqlite3.Connection, projects: dict[str, str | None]
+    ) -> None:
+        """
+        Move tasks' stored embeddings into the centroids of the given projects.
+
+        `projects` maps task IDs to project IDs, or to None to take a task out of the
+        centroids altogether. Tasks without an embedding are ignored.
+        """
+        ids = list(projects)
+        moves: list[tuple[str, int, str | None]] = []
+        for start in range(0, len(ids), MAX_BIND_VARS):
+            chunk = ids[start : start + MAX_BIND_VARS]
+            cursor = conn.execute(
+                "SELECT task_id, vector_rowid, project_id FROM task_embeddings "
+                f"WHERE task_id IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            moves.extend(row for row in cursor if row[2] != projects[row[0]])
+        if not moves:
+            return
+        vectors = self.vector_index.get([row_id for _, row_id, _ in moves])
+        changes = []
+        for id, row_id, project_id in moves:
+            if row_id in vectors:
+                changes.append((project_id, vectors[row_id], -1))
+                changes.append((projects[id], vectors[row_id], 1))
+        self._shift_centroids(conn, changes)
+        conn.executemany(
+            "UPDATE task_embeddings SET project_id = (?) WHERE task_id = (?)",
+            [(projects[id], id) for id, _, _ in moves],
+        )
+
+    @staticmethod
+    def _shift_centroids(
+        conn: sqlite3.Connection, changes: list[tuple[str | None, np.ndarray, int]]
+    ) -> None:
+        """
+        Add (1) or remove (-1) embeddings in project centroids.
+
+        Each change is a (project ID, embedding, sign) tuple. Changes for no project
+        are ignored.
+        """
+        sums: dict[str, np.ndarray] = {}
+        counts: dict[str, int] = {}
+        for project_id, embedding, sign in changes:
+            if project_id is None:
+                continue
+            vector = sign * normalize(embedding)
+            sums[project_id] = (
+                sums[project_id] + vector if project_id in sums else vector
+            )
+            counts[project_id] = counts.get(project_id, 0) + sign
+        for project_id, delta in sums.items():
+            cursor = conn.execute(
+                "SELECT vector_sum, task_count FROM project_centroids "
+                "WHERE project_id = (?)",
+                (project_id,),
+            )
+            row = cursor.fetchone()
+            count = counts[project_id]
+            if row is not None:
+                delta = delta + np.frombuffer(row[0], dtype=np.float32)
+                count += row[1]
+            if count <= 0:
+                conn.execute(
+                    "DELETE FROM project_centroids WHERE project_id = (?)",
+                    (project_id,),
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO project_centroids "
+                    "(project_id, vector_sum, task_count) VALUES (?, ?, ?)",
+                    (project_id, delta.astype(np.float32).tobytes(), count),
+                )
+
+    def suggest_project(self, task: Task) -> Project | None:
+        """
+        Guess which project a task belongs in, from its name and description.
+
+        Each project's centroid (the mean of its tasks' embeddings) is kept up to date
+        as tasks are written, so this is a single comparison against every centroid,
+        however many tasks there are. The task's embedding goes through the query
+        cache, so it's cheap to call repeatedly as the task is being typed. Returns
+        None if no project has any embedded tasks, or none is at least
+        `project_suggestion_threshold` similar to the task.
+        """
+        with self.conn as conn:
+            cursor = conn.execute(
+                "SELECT project_id, vector_sum FROM project_centroids"
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return None
+        centroids = np.stack(
+            [np.frombuffer(total, dtype=np.float32) for _, total in rows]
+        )
+        embedding = self.embedding_service.embed_query(doc_from_task(task))
+        scores = normalize(centroids) @ normalize(embedding)
+        best = int(np.argmax(scores))
+        if scores[best] < self.project_suggestion_threshold:
+            return None
+        project_id = rows[best][0]
+        return self._get_projects_by_id([project_id]).get(project_id)
+
+    def train_vector_index(self) -> None:
+        """
+        Rebuild the vector index from the stored vectors, training it if need be.
+
+        Leftover vectors are cleared out first (see `compact_vector_index`), so that
+        they don't skew the training.
+        """
+        self.compact_vector_index()
+        self.vector_index.train()
+
+    def compact_vector_index(self) -> int:
+        """
+        Remove vectors that no longer belong to a task, and reclaim their space.
+
+        Returns the number of vectors removed.
+        """
+        # Holding the write lock from the start, so that vectors other processes write
+        # meanwhile aren't mistaken for leftovers.
+        with self._vector_transaction(immediate=True) as (conn, vectors):
+            before = len(self.vector_index.row_ids())
+            # Tasks deleted by versions that left their embeddings behind.
+            cursor = conn.execute(
+                "SELECT e.task_id FROM task_embeddings e "
+                "LEFT JOIN tasks t ON t.id = e.task_id WHERE t.id IS NULL"
+            )
+            self._tasks_deleted(conn, vectors, [id for (id,) in cursor.fetchall()])
+            cursor = conn.execute("SELECT vector_rowid FROM task_embeddings")
+            known = {row_id for (row_id,) in cursor.fetchall()}
+            vectors.remove(
+                [
+                    row_id
+                    for row_id in self.vector_index.row_ids()
+                    if row_id not in known
+                ]
+            )
+        with immediate_transaction(self.conn):
+            self.vector_index.compact()
+            return before - len(self.vector_index.row_ids())
+
+    def regen_embeddings(
+        self,
+        progress: Callable[[int, int], None] | None = None,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ) -> None:
+        """
+        Re-embed every task, including done tasks.
+
+        Tasks are read and embedded a batch at a time, in ID order, and each batch is
+        committed along with a checkpoint. If a rebuild is interrupted, the next call
+        resumes after the last committed batch. `progress` is called after each batch
+        with the number of tasks done so far and the total.
+        """
+        with self.conn as conn:
+            cursor = conn.execute("SELECT last_task_id FROM embedding_rebuild")
+            row = cursor.fetchone()
+            last_id = row[0] if row else ""
+            (total,) = conn.execute("SELECT count(*) FROM tasks").fetchone()
+            (done,) = conn.execute(
+                "SELECT count(*) FROM tasks WHERE id <= (?)", (last_id,)
+            ).fetchone()
+        if progress:
+            progress(done, total)
+
+        while True:
+            with self.conn as conn:
+                cursor = conn.execute(
+                    "SELECT id FROM tasks WHERE id > (?) ORDER BY id LIMIT (?)",
+                    (last_id, batch_size),
+                )
+                ids = [id for (id,) in cursor.fetchall()]
+            if not ids:
+                break
+            self._update_embeddings(self.get_tasks_by_ids(ids), force=True)
+            last_id = ids[-1]
+            with self.conn as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO embedding_rebuild (id, last_task_id) "
+                    "VALUES (1, ?)",
+                    (last_id,),
+                )
+            done += len(ids)
+            if progress:
+                progress(done, max(done, total))
+
+        with self.conn as conn:
+            conn.execute("DELETE FROM embedding_rebuild")
+
+    def search_tasks(
+        self,
+        query: str,
+        limit: int = 5,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = True,
+        due_before: datetime | None = None,
+        mode: SEARCH_MODE = "hybrid",
+    ) -> list[Task]:
+        """
+        Find the tasks that best match `query` and the given filters.
+
+        The filters work as in `get_tasks`, except that done tasks are included unless
+        `include_done` is turned off. `mode` picks how tasks are ranked: by embedding
+        similarity, by keyword matches, or both (see SEARCH_MODE).
+        """
+        if mode not in get_args(SEARCH_MODE):
+            raise ValueError(f"Unknown search mode: {mode}")
+        filters, params = self._task_filters(
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+            due_before=due_before,
+        )
+        if mode == "lexical":
+            return self._lexical_tasks(query, limit, filters, params)
+        embedding = self.embedding_service.embed_query(query)
+        if mode == "hybrid":
+            depth = limit * HYBRID_SEARCH_DEPTH
+            semantic = self._nearest_tasks(embedding, depth, filters, params)
+            lexical = self._lexical_tasks(query, depth, filters, params)
+            found = {task.id: task for task in [*semantic, *lexical]}
+            ids = reciprocal_rank_fusion(
+                [task.id for task in semantic], [task.id for task in lexical]
+            )
+            return [found[id] for id in ids[:limit]]
+        tasks = self._nearest_tasks(embedding, limit, filters, params)
+        # Tasks that are still waiting to be embedded can't be found by the vector
+        # search, so include any whose text contains the query's words outright. They
+        # are fused with the vector hits by rank, as in hybrid searches, so that they
+        # don't all outrank the best semantic matches. Ties go to the vector hits.
+        pending = self._pending_tasks(query, limit, filters, params)
+        if not pending:
+            return tasks
+        found = {task.id: task for task in [*tasks, *pending]}
+        ids = reciprocal_rank_fusion(
+            [task.id for task in tasks], [task.id for task in pending]
+        )
+        return [found[id] for id in ids[:limit]]
+
+    def _lexical_tasks(
+        self, query: str, limit: int, filters: str, params: list[Any]
+    ) -> list[Task]:
+        """The tasks that best match the words in `query`, by BM25."""
+        match = fts_query(query)
+        if match is None:
+            return []
+        with self.conn as conn:
+            cursor = conn.execute(
+                LEXICAL_SEARCH_QUERY.format(columns=self.TASK_COLUMNS, filters=filters),
+                [match, *params, limit],
+            )
+            rows = cursor.fetchall()
+        return self._tasks_from_rows(rows)
+
+    def typeahead_tasks(
+        self,
+        text: str,
+        limit: int = 10,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+    ) -> list[Task]:
+        """
+        Find tasks whose names match `text`, for suggesting tasks as it's typed.
+
+        Text of at least TRIGRAM_MIN_LENGTH characters is matched anywhere in a name;
+        shorter text is matched against the starts of words. Names that start with
+        the text come first. This only reads the full-text indexes, never the
+        embedding model, so it stays fast while the model is loading or busy.
+        """
+        filters, params = self._task_filters(
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+        )
+        text = " ".join(text.split())
+        match: str | None
+        if len(text) >= TRIGRAM_MIN_LENGTH:
+            index, match = "task_names", substring_query(text)
+        else:
+            index, match = "task_search", name_prefix_query(text)
+        if match is None:
+            return []
+        with self.conn as conn:
+            cursor = conn.execute(
+                TYPEAHEAD_QUERY.format(
+                    columns=self.TASK_COLUMNS, index=index, filters=filters
+                ),
+                [match, *params, text, limit],
+            )
+            rows = cursor.fetchall()
+        return self._tasks_from_rows(rows)
+
+    def related_tasks(
+        self,
+        id: str,
+        limit: int = 5,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+    ) -> list[Task]:
+        """
+        Find the tasks nearest to an existing task, using its stored embedding.
+
+        This never runs the embedding model, so a task that hasn't been embedded yet
+        has no related tasks.
+        """
+        filters, params = self._task_filters(
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+        )
+        filters += " AND t.id != (?)"
+        params.append(id)
+        with self.conn as conn:
+            cursor = conn.execute(
+                "SELECT vector_rowid FROM task_embeddings WHERE task_id = (?)", (id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                cursor = conn.execute("SELECT 1 FROM tasks WHERE id = (?)", (id,))
+                if cursor.fetchone() is None:
+                    raise RecordNotFoundError(f"No task with id {id}")
+                return []
+        (row_id,) = row
+        vectors = self.vector_index.get([row_id])
+        if row_id not in vectors:
+            return []
+        return self._nearest_tasks(vectors[row_id], limit, filters, params)
+
+    def find_duplicate_tasks(
+        self,
+        threshold: float = 0.92,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+    ) -> list[list[Task]]:
+        """
+        Find groups of open tasks whose embeddings are at least `threshold` similar.
+
+        Each group starts with the task to keep: the one with the highest priority,
+        then the soonest due date. Every other task in the group is similar enough to
+        that one; tasks aren't grouped just for being similar to a task that is. Like
+        `related_tasks`, this only uses stored embeddings.
+        """
+        filters, params = self._task_filters(
+            project_id=project_id, include_child_projects=include_child_projects
+        )
+        with self.conn as conn:
+            cursor = conn.execute(
+                "SELECT e.vector_rowid, t.id FROM task_embeddings e "
+                f"JOIN tasks t ON t.id = e.task_id WHERE 1=1{filters} "
+                "ORDER BY t.id",
+                params,
+            )
+            task_ids = dict(cursor.fetchall())
+        vectors = self.vector_index.get(list(task_ids))
+        row_ids = [row_id for row_id in task_ids if row_id in vectors]
+        if not row_ids:
+            return []
+        # Clusters of transitively similar tasks are cheap to find, and narrow down
+        # where the groups can be.
+        clusters = similarity_clusters(
+            np.stack([vectors[row_id] for row_id in row_ids]), threshold
+        )
+        tasks = {
+            task.id: task
+            for task in self.get_tasks_by_ids(
+                [task_ids[row_ids[i]] for cluster in clusters for i in cluster]
+            )
+        }
+        groups = []
+        for cluster in clusters:
+            members = [
+                (tasks[task_ids[row_ids[i]]], vectors[row_ids[i]])
+                for i in cluster
+                if task_ids[row_ids[i]] in tasks
+            ]
+            members.sort(key=lambda m: (-m[0].priority, m[0].due is None, m[0].due))
+            for group in leader_groups(
+                np.stack([vector for _, vector in members]), threshold
+            ):
+                groups.append([members[i][0] for i in group])
+        return groups
+
+    def _nearest_tasks(
+        self, embedding: np.ndarray, limit: int, filters: str, params: list[Any]
+    ) -> list[Task]:
+        with self.conn as conn:
+            cursor = conn.execute("SELECT 1 FROM task_embeddings LIMIT 1")
+            if cursor.fetchone() is None:
+                return []
+            if not filters:
+                hits = self.vector_index.search(embedding, limit)
+                return self._tasks_from_hits(conn, hits, limit)
+            cursor = conn.execute(
+                "SELECT e.vector_rowid FROM task_embeddings e "
+                f"JOIN tasks t ON t.id = e.task_id WHERE 1=1{filters} LIMIT (?)",
+                [*params, PREFILTER_MAX_CANDIDATES + 1],
+            )
+            candidates = [row_id for (row_id,) in cursor.fetchall()]
+            if len(candidates) <= PREFILTER_MAX_CANDIDATES:
+                hits = self.vector_index.search(embedding, limit, row_ids=candidates)
+                return self._tasks_from_hits(conn, hits, limit)
+            # Otherwise, fetch enough nearest neighbours from the whole index that we
+            # can expect `limit` of them to match, and fetch more if they don't.
+            (total,) = conn.execute("SELECT count(*) FROM task_embeddings").fetchone()
+            (matching,) = conn.execute(
+                "SELECT count(*) FROM task_embeddings e "
+                f"JOIN tasks t ON t.id = e.task_id WHERE 1=1{filters}",
+                params,
+            ).fetchone()
+            k = min(total, math.ceil(limit * total / matching * 2))
+            while True:
+                hits = self.vector_index.search(embedding, k)
+                tasks = self._tasks_from_hits(conn, hits, limit, filters, params)
+                if len(tasks) >= limit or k >= total:
+                    return tasks
+                k = min(total, k * 4)
+
+    def _tasks_from_hits(
+        self,
+        conn: sqlite3.Connection,
+        hits: list[tuple[int, float]],
+        limit: int,
+        filters: str = "",
+        params: list[Any] | None = None,
+    ) -> list[Task]:
+        """Look up the tasks for vector search hits, in order, with optional filters."""
+        cursor = conn.execute(
+            VECTOR_HITS_QUERY.format(columns=self.TASK_COLUMNS, filters=filters),
+            [json.dumps([row_id for row_id, _ in hits]), *(params or []), limit],
+        )
+        return self._tasks_from_rows(cursor.fetchall())
+
+    def _pending_tasks(
+        self, query: str, limit: int, filters: str, params: list[Any]
+    ) -> list[Task]:
+        """Queued tasks whose text contains the words of `query`, in order."""
+        match = phrase_query(query)
+        if match is None:
+            return []
+        with self.conn as conn:
+            cursor = conn.execute(
+                PENDING_SEARCH_QUERY.format(columns=self.TASK_COLUMNS, filters=filters),
+                [match, *params, limit],
+            )
+            rows = cursor.fetchall()
+        return self._tasks_from_rows(rows)
+
+    def checkoff_task(self, id: str) -> tuple[bool, datetime | None]:
+        """
+        Mark a task as done.
+
+        Returns True if the task was previously not done (False if not) along with the
+        next occurrence if this is a repeating task.
+        """
+        results = self.checkoff_tasks([id])
+        if id not in results:
+            raise RecordNotFoundError(f"No task with id {id}")
+        return results[id]
+
+    @retry_when_busy
+    def checkoff_tasks(self, ids: list[str]) -> dict[str, tuple[bool, datetime | None]]:
+        """
+        Mark tasks as done, in one transaction.
+
+        Returns what `checkoff_task` would for each task that exists, by ID.
+        """
+        results: dict[str, tuple[bool, datetime | None]] = {}
+        updated = []
+        # (ID of the task checked off, next occurrence) for repeating tasks.
+        next_tasks: list[tuple[str, Task]] = []
+        for task in self.get_tasks_by_ids(list(dict.fromkeys(ids))):
+            if task.done:
+                results[task.id] = (False, None)
+                continue
+            if not task.repeat:
+                # If the task doesn't repeat, just mark it as done.
+                task.done = True
+                updated.append(task)
+                results[task.id] = (True, None)
+                continue
+            # If the task repeats, we need to do a few things:
+            #    1. Mark the current task as done.
+            #    2. Create an identical task, due on the next occurrence.
+            #    3. Remove the repeat from the now-done task (the repeat lives on in the
+            #       new task.)
+            current_occurrence = task.due
+            if current_occurrence is None:
+                raise ValueError("Repeating task has no current due date")
+            # We need to convert to local time before calculating the next occurrence
+            # since things like "every Tuesday" won't make sense if the current date is
+            # actually a Monday due to timezone offsets.
+            current_occurrence = current_occurrence.astimezone(get_localzone())
+            next_occurrence = task.repeat.next(current_occurrence).astimezone(
+                ZoneInfo("UTC")
+            )
+            new_task = task.clone()
+            new_task.due = next_occurrence
+            next_tasks.append((task.id, new_task))
+
+            task.repeat = None
+            task.done = True
+            updated.append(task)
+            results[task.id] = (True, new_task.due)
+        if not updated:
+            return results
+
+        new_tasks = [new_task for _, new_task in next_tasks]
+        with self._vector_transaction() as (conn, vectors):
+            self._update_task_rows(conn, updated)
+            # The new tasks have the same text as the current ones, so they can reuse
+            # their embeddings; saving will then see that there's nothing to embed.
+            self._copy_embeddings(conn, vectors, next_tasks)
+            self._insert_tasks(conn, new_tasks)
+            self._tasks_written(conn, updated + new_tasks)
+        self._embeddings_enqueued()
+        return results
+
+    def uncheckoff_task(self, id: str) -> bool:
+        """Mark a task as not done. Returns True if the task was previously done."""
+        task = self.get_task(id)
+        if not task.done:
+            return False
+        task.done = False
+        self.update_task(id, task)
+        return True
+
+    def get_project(self, id: str) -> Project:
+        projects = self._get_projects_by_id([id])
+        if id not in projects:
+            raise RecordNotFoundError(f"No project with id {id}")
+        return projects[id]
+
+    def get_project_by_name(self, name: str) -> Project:
+        with self.conn as conn:
+            cursor = conn.execute(
+                f"SELECT id FROM {self.PROJECTS_TABLE} WHERE name = (?)", (name,)
+            )
+            row = cursor.fetchone()
+        if not row:
+            raise RecordNotFoundError(f"No project with name {name}")
+        return self.get_project(row[0])
+
+    def get_projects(
+        self,
+        sort_by: str | None = "name",
+        desc: bool = False,
+    ) -> list[Project]:
+        query = f"SELECT id, name, description, parent_id FROM {self.PROJECTS_TABLE}"
+        if sort_by:
+            # Some very limited validation to avoid extremely easy sql injection.
+            if sort_by not in Project.sortable_columns():
+                raise InvalidSortError(f"Cannot sort on column {sort_by}")
+            asc = "DESC" if desc else "ASC"
+            query += f" ORDER BY {sort_by} {asc} NULLS LAST"
+        with self.conn as conn:
+            cursor = conn.execute(query)
+            rows = cursor.fetchall()
+        projects = self._projects_from_rows(rows)
+        return [projects[id] for (id, *_) in rows]
+
+    def _get_projects_by_id(self, ids: Iterable[str]) -> dict[str, Project]:
+        """Fetch projects, along with all of their ancestors."""
+        ids = list(ids)
+        rows = []
+        with self.conn as conn:
+            for start in range(0, len(ids), MAX_BIND_VARS):
+                chunk = ids[start : start + MAX_BIND_VARS]
+                query = PROJECT_ANCESTORS_QUERY.format(
+                    projects=self.PROJECTS_TABLE,
+                    bind_vars=",".join("?" for _ in chunk),
+                )
+                rows.extend(conn.execute(query, chunk).fetchall())
+        # Chunks can share ancestors, which are built only once.
+        return self._projects_from_rows(rows)
+
+    @staticmethod
+    def _projects_from_rows(rows: list[tuple[Any, ...]]) -> dict[str, Project]:
+        """
+        Build projects from (id, name, description, parent_id) rows.
+
+        Every parent referenced by a row should also be in the rows. Projects that
+        share a parent share the same parent object.
+        """
+        rows_by_id = {row[0]: row for row in rows}
+        projects: dict[str, Project] = {}
+
+        def build(id: str) -> Project:
+            if id not in projects:
+                _id, name, description, parent_id = rows_by_id[id]
+                parent = build(parent_id) if parent_id else None
+                projects[id] = Project(
+                    id=id, name=name, description=description, parent=parent
+                )
+            return projects[id]
+
+        for id in rows_by_id:
+            build(id)
+        return projects
+
+    def _set_project_parent(
+        self, conn: sqlite3.Connection, id: str, parent_id: str | None
+    ) -> None:
+        """
+        Record a project's position in the hierarchy in the closure table.
+
+        This works for both new projects and existing ones; when an existing project
+        moves, its whole subtree moves with it. It should be called in the same
+        transaction that writes the project itself.
+        """
+        conn.execute(INSERT_PROJECT_SELF_PATH, {"id": id})
+        if parent_id is not None:
+            cursor = conn.execute(PROJECT_DESCENDANTS_QUERY, (id,))
+            if parent_id in {descendant_id for (descendant_id,) in cursor}:
+                raise ValueError(f"Project {parent_id} is a descendant of {id}")
+        conn.execute(DELETE_PROJECT_ANCESTOR_PATHS, {"id": id})
+        if parent_id is not None:
+            conn.execute(
+                INSERT_PROJECT_ANCESTOR_PATHS, {"id": id, "parent_id": parent_id}
+            )
+
+    def save_label(self, label: Label) -> str:
+        raise NotImplementedError
+
+    def get_label(self, id: str) -> Label:
+        raise NotImplementedError
+
+    def update_label(self, id: str, label: Label) -> None:
+        raise NotImplementedError
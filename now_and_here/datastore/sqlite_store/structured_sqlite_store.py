@@ -0,0 +1,217 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from zoneinfo import ZoneInfo
+
+from now_and_here.datastore.errors import RecordNotFoundError
+from now_and_here.models import Project, Task
+from now_and_here.models.label import LabelListModel
+from now_and_here.models.repeat_interval import RepeatIntervalModel
+from now_and_here.models.task import TaskListModel
+
+from .create import create_structured_db
+from .queries import PROJECT_DESCENDANTS_QUERY
+from .sqlite_store import SQLiteStore, retry_when_busy
+
+EPOCH = datetime(1970, 1, 1, tzinfo=ZoneInfo("UTC"))
+
+TASK_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "done",
+    "priority",
+    "due",
+    "repeat",
+    "labels",
+    "project_id",
+    "parent_id",
+)
+TASK_COLUMNS = ", ".join(f"t.{field}" for field in TASK_FIELDS)
+
+
+def datetime_to_epoch_us(dt: datetime) -> int:
+    """Convert a datetime to microseconds since the epoch, treating naive times as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo("UTC"))
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def epoch_us_to_datetime(value: int) -> datetime:
+    """Convert microseconds since the epoch to a UTC datetime."""
+    return EPOCH + timedelta(microseconds=value)
+
+
+class StructuredSQLiteStore(SQLiteStore):
+    """
+    A store that keeps each field of a record in its own column.
+
+    Compared to the unstructured store, filters and sorts on tasks hit real (indexed)
+    columns instead of parsing JSON for every row.
+    """
+
+    TASK_COLUMNS = TASK_COLUMNS
+
+    @classmethod
+    def create_self(cls, path: Path):
+        if not path.parent.exists():
+            path.parent.mkdir(parents=True)
+        create_structured_db(path)
+
+    def _insert_tasks(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        conn.executemany(
+            f"INSERT INTO tasks ({', '.join(TASK_FIELDS)}) "
+            f"VALUES ({', '.join('?' for _ in TASK_FIELDS)})",
+            [self._task_to_row(task) for task in tasks],
+        )
+
+    def get_task(self, id: str) -> Task:
+        with self.conn as conn:
+            cursor = conn.execute(
+                f"SELECT {TASK_COLUMNS} FROM tasks t WHERE t.id = (?)", (id,)
+            )
+            row = cursor.fetchone()
+        if not row:
+            raise RecordNotFoundError(f"No task with id {id}")
+        return self._tasks_from_rows([row])[0]
+
+    def _sort_column(self, sort_by: str) -> str:
+        return f"t.{sort_by}"
+
+    def _due_from_column(self, value: int) -> datetime:
+        return epoch_us_to_datetime(value)
+
+    def _task_filters(
+        self,
+        project_name: str | None = None,
+        project_id: str | None = None,
+        include_child_projects: bool = False,
+        include_done: bool = False,
+        due_before: datetime | None = None,
+    ) -> tuple[str, list[Any]]:
+        # Sanity validations:
+        if project_name and project_id:
+            raise ValueError("Cannot filter by both project name and project ID")
+        if not project_id and include_child_projects:
+            raise ValueError(
+                "Cannot include child projects without a project ID filter"
+            )
+        filters = ""
+        params: list[Any] = []
+        if not include_done:
+            filters += " AND t.done = FALSE"
+        if due_before:
+            filters += " AND t.due <= (?)"
+            params.append(datetime_to_epoch_us(due_before))
+        if project_name:
+            # Case-insensitive search
+            filters += (
+                " AND t.project_id IN (SELECT id FROM projects WHERE lower(name) = (?))"
+            )
+            params.append(project_name.lower())
+        if project_id:
+            if not include_child_projects:
+                filters += " AND t.project_id = (?)"
+            else:
+                filters += f" AND t.project_id IN ({PROJECT_DESCENDANTS_QUERY})"
+            params.append(project_id)
+        return filters, params
+
+    def _update_task_rows(self, conn: sqlite3.Connection, tasks: list[Task]) -> None:
+        assignments = ", ".join(f"{field} = (?)" for field in TASK_FIELDS[1:])
+        rows = []
+        for task in tasks:
+            id, *values = self._task_to_row(task)
+            rows.append((*values, id))
+        conn.executemany(f"UPDATE tasks SET {assignments} WHERE id = (?)", rows)
+
+    @retry_when_busy
+    def save_project(self, project: Project) -> str:
+        parent_id = project.parent.id if project.parent else None
+        with self.conn as conn:
+            conn.execute(
+                "INSERT INTO projects (id, name, description, parent_id) "
+                "VALUES (?, ?, ?, ?)",
+                (project.id, project.name, project.description, parent_id),
+            )
+            self._set_project_parent(conn, project.id, parent_id)
+        return project.id
+
+    @retry_when_busy
+    def update_project(self, id: str, project: Project) -> None:
+        parent_id = project.parent.id if project.parent else None
+        with self.conn as conn:
+            conn.execute(
+                "UPDATE projects SET name = (?), description = (?), parent_id = (?) "
+                "WHERE id = (?)",
+                (project.name, project.description, parent_id, id),
+            )
+            self._set_project_parent(conn, id, parent_id)
+
+    @staticmethod
+    def _task_to_row(task: Task) -> tuple[Any, ...]:
+        data = task.model_dump(mode="json")
+        return (
+            task.id,
+            task.name,
+            task.description,
+            task.done,
+            task.priority,
+            datetime_to_epoch_us(task.due) if task.due else None,
+            json.dumps(data["repeat"]) if task.repeat else None,
+            json.dumps(data["labels"]),
+            task.project.id if task.project else None,
+            task.parent.id if task.parent else None,
+        )
+
+    def _tasks_from_rows(
+        self, rows: list[tuple[Any, ...]], projects: dict[str, Project] | None = None
+    ) -> list[Task]:
+        projects, parents = self._referenced_records(
+            {row[8] for row in rows if row[8] is not None},
+            {row[9] for row in rows if row[9] is not None},
+            projects,
+        )
+        # Tasks tend to share labels and repeats, so each distinct value is decoded
+        # once per batch. Labels and repeats are never changed in place, so tasks can
+        # share them like they share projects.
+        labels = {
+            text: LabelListModel.validate_json(text)
+            for text in {row[7] for row in rows}
+        }
+        repeats = {
+            text: RepeatIntervalModel.validate_json(text)
+            for text in {row[6] for row in rows if row[6]}
+        }
+        values = []
+        for row in rows:
+            (
+                id,
+                name,
+                description,
+                done,
+                priority,
+                due,
+                repeat,
+                task_labels,
+                project_id,
+                parent_id,
+            ) = row
+            values.append(
+                {
+                    "id": id,
+                    "name": name,
+                    "description": description,
+                    "done": bool(done),
+                    "priority": priority,
+                    "due": epoch_us_to_datetime(due) if due is not None else None,
+                    "repeat": repeats[repeat] if repeat else None,
+                    "labels": labels[task_labels],
+                    "project": projects.get(project_id) if project_id else None,
+                    "parent": parents.get(parent_id) if parent_id else None,
+                }
+            )
+        return TaskListModel.validate_python(values)
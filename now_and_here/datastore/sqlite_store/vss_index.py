@@ -0,0 +1,380 @@
+import logging
+import re
+import sqlite3
+
+import numpy as np
+import sqlite_vss
+
+from now_and_here.datastore.embeddings import EMBEDDING_DIMENSIONS
+from now_and_here.datastore.vector_index.pca import PCAProjection
+from now_and_here.datastore.vector_index.vector_index import rank_by_distance
+
+from .connection_pool import ConnectionPool, immediate_transaction
+from .create import (
+    create_task_vectors,
+    create_vector_projection,
+    create_vector_store,
+)
+from .queries import MAX_BIND_VARS
+
+logger = logging.getLogger(__name__)
+
+# With reduced vectors, this many candidates per requested result are re-ranked using
+# the full vectors.
+RERANK_FACTOR = 4
+
+
+class VSSVectorIndex:
+    """
+    A vector index in the store's own database, using the sqlite_vss vss0 table.
+
+    Writes go through the current thread's connection without committing, so they're
+    part of whatever transaction the store has open.
+
+    `factory` is the FAISS index factory string to build the index with, e.g.
+    "IVF256,Flat" to search only the nearest of 256 clusters of vectors instead of
+    every vector (None for vss0's default, exact index).
+
+    With `dimensions`, vss0 holds vectors reduced to that many dimensions by a PCA
+    projection fitted to the stored vectors, which makes it smaller and quicker to
+    scan. Queries are projected the same way, and the best few candidates are then
+    re-ranked using the full vectors.
+
+    Both have to be fitted to existing vectors, so they only take effect when `train`
+    rebuilds the table. Neither can give the original vectors back, so while either
+    is in use each vector is also copied into the task_vectors table, which is where
+    `get` reads them from. The default index reads them from vss0 itself.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        factory: str | None = None,
+        dimensions: int | None = None,
+    ):
+        self._pool = pool
+        self.factory = factory
+        self.dimensions = dimensions
+        with self.conn as conn:
+            create_vector_store(conn)
+            create_vector_projection(conn)
+        # The projection, whether there are copies of the vectors, and the schema
+        # version of the database they were read at.
+        self._schema_at: tuple[int, PCAProjection | None, bool] | None = None
+        built = self.describe(self.current_factory(), self.current_dimensions())
+        wanted = self.describe(factory, dimensions)
+        if built != wanted:
+            logger.warning(
+                f"The vector index was built with {built}; "
+                f"run `nh index train` to rebuild it with {wanted}"
+            )
+
+    @staticmethod
+    def describe(factory: str | None, dimensions: int | None) -> str:
+        description = factory or "the default index"
+        if dimensions:
+            description += f", reduced to {dimensions} dimensions"
+        return description
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        return self._pool.connection()
+
+    def current_factory(self) -> str | None:
+        """The factory string the vss0 table was built with, if any."""
+        cursor = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'vss_tasks'"
+        )
+        (sql,) = cursor.fetchone()
+        match = re.search(r'factory="([^"]*)"', sql)
+        return match.group(1) if match else None
+
+    def current_dimensions(self) -> int | None:
+        """The dimensions vectors in the vss0 table were reduced to, if they were."""
+        projection = self.projection()
+        return projection.dimensions if projection else None
+
+    def projection(self) -> PCAProjection | None:
+        """The projection that vectors in the vss0 table were reduced with, if any."""
+        return self._schema()[1]
+
+    def has_copies(self) -> bool:
+        """Whether the vectors are copied into task_vectors."""
+        return self._schema()[2]
+
+    def _vectors_table(self) -> str:
+        """The table the original vectors can be read from."""
+        return "task_vectors" if self.has_copies() else "vss_tasks"
+
+    @staticmethod
+    def _copied(conn: sqlite3.Connection) -> bool:
+        return (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'task_vectors'"
+            ).fetchone()
+            is not None
+        )
+
+    def _schema(self) -> tuple[int, PCAProjection | None, bool]:
+        # Another process may have retrained the index since it was last read.
+        (version,) = self.conn.execute("PRAGMA schema_version").fetchone()
+        if self._schema_at is None or self._schema_at[0] != version:
+            row = self.conn.execute(
+                "SELECT dimensions, mean, components FROM vector_projection"
+            ).fetchone()
+            projection = None
+            if row:
+                dimensions, mean, components = row
+                projection = PCAProjection(
+                    mean=np.frombuffer(mean, dtype=np.float32),
+                    components=np.frombuffer(components, dtype=np.float32).reshape(
+                        dimensions, -1
+                    ),
+                )
+            self._schema_at = (version, projection, self._copied(self.conn))
+        return self._schema_at
+
+    @staticmethod
+    def _rows(
+        row_ids: list[int],
+        vectors: np.ndarray,
+        projection: PCAProjection | None = None,
+    ) -> list[tuple[int, bytes]]:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if projection and len(vectors):
+            vectors = projection.project(vectors)
+        return [(row_id, vector.tobytes()) for row_id, vector in zip(row_ids, vectors)]
+
+    def add(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        # Update and upsert operations don't seem to be supported in vss0, so we
+        # delete existing rows ourselves.
+        self.remove(row_ids)
+        self.conn.executemany(
+            "INSERT INTO vss_tasks (rowid, a) VALUES (?, ?)",
+            self._rows(row_ids, vectors, self.projection()),
+        )
+        if self.has_copies():
+            self.conn.executemany(
+                "INSERT INTO task_vectors (rowid, a) VALUES (?, ?)",
+                self._rows(row_ids, vectors),
+            )
+
+    def get(self, row_ids: list[int]) -> dict[int, np.ndarray]:
+        vectors = {}
+        table = self._vectors_table()
+        for start in range(0, len(row_ids), MAX_BIND_VARS):
+            chunk = row_ids[start : start + MAX_BIND_VARS]
+            cursor = self.conn.execute(
+                f"SELECT rowid, a FROM {table} "
+                f"WHERE rowid IN ({','.join('?' for _ in chunk)})",
+                chunk,
+            )
+            for row_id, data in cursor.fetchall():
+                vectors[row_id] = np.frombuffer(data, dtype=np.float32)
+        return vectors
+
+    def remove(self, row_ids: list[int]) -> None:
+        params = [(id,) for id in row_ids]
+        self.conn.executemany("DELETE FROM vss_tasks WHERE rowid = (?)", params)
+        if self.has_copies():
+            self.conn.executemany("DELETE FROM task_vectors WHERE rowid = (?)", params)
+
+    def search(
+        self, vector: np.ndarray, k: int, row_ids: list[int] | None = None
+    ) -> list[tuple[int, float]]:
+        if row_ids is not None:
+            # vss0 can't restrict a search to given rows, but a few vectors are quick
+            # to compare directly.
+            return rank_by_distance(self.get(row_ids), vector, k)
+        # Searching an empty index aborts the whole process, rather than raising.
+        cursor = self.conn.execute("SELECT rowid FROM vss_tasks LIMIT 1")
+        if cursor.fetchone() is None:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        projection = self.projection()
+        # vss_search_params works on all SQLite versions; LIMIT needs 3.41+.
+        cursor = self.conn.execute(
+            "SELECT rowid, distance FROM vss_tasks "
+            "WHERE vss_search(a, vss_search_params(?, ?))",
+            (
+                (projection.project(query) if projection else query).tobytes(),
+                k * RERANK_FACTOR if projection else k,
+            ),
+        )
+        hits = cursor.fetchall()
+        if projection is None:
+            return hits
+        # Distances between reduced vectors are approximate, so rank the candidates
+        # by their full vectors.
+        return rank_by_distance(self.get([row_id for row_id, _ in hits]), query, k)
+
+    def is_empty(self) -> bool:
+        """
+        Whether there are no stored vectors.
+
+        This goes by task_vectors when there are copies, so an index that's partway
+        through `train` (with an empty vss0 table) doesn't count as empty.
+        """
+        cursor = self.conn.execute(f"SELECT rowid FROM {self._vectors_table()} LIMIT 1")
+        return cursor.fetchone() is None
+
+    def row_ids(self) -> list[int]:
+        cursor = self.conn.execute("SELECT rowid FROM vss_tasks")
+        return [row_id for (row_id,) in cursor.fetchall()]
+
+    def compact(self) -> None:
+        """Nothing to do: vss0 drops removed vectors from its index right away."""
+
+    def train(self) -> None:
+        """
+        Rebuild the vss0 table with `factory` and `dimensions`, fitting them to the
+        stored vectors.
+
+        The rebuild is tried out on a scratch, in-memory table first; if that fails
+        (e.g. there are fewer vectors than clusters to train), a ValueError is raised
+        and the index is left as it was.
+
+        The table is then rebuilt under the write lock, and filled with the stored
+        vectors as they are at that point, so vectors written since they were read for
+        training aren't lost. They're copied into task_vectors for the rebuild, and
+        the copies are dropped again if the new index can give its vectors back.
+
+        vss0 only trains an index when the transaction holding the training data
+        commits, though, so with a `factory` it takes two transactions. Vectors written
+        in between go straight into the new table, but searches in between may come
+        back empty. If the second transaction never happens, training again fills in
+        the missing vectors.
+        """
+        # vss0 keeps each connection's copy of the index in memory, and only reads it
+        # afresh when the schema changes. A connection that read it before another
+        # connection's write can't give back the vectors written since, so each step
+        # uses a new connection.
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT rowid, a FROM {self._vectors_table()}"
+            ).fetchall()
+        finally:
+            conn.close()
+        if (self.factory or self.dimensions) and not rows:
+            raise ValueError("There are no stored vectors to train the index on")
+        projection = None
+        if self.dimensions:
+            vectors = np.stack(
+                [np.frombuffer(data, dtype=np.float32) for _, data in rows]
+            )
+            projection = PCAProjection.fit(vectors, self.dimensions)
+            rows = self._rows([row_id for row_id, _ in rows], vectors, projection)
+        scratch = sqlite3.connect(":memory:")
+        try:
+            scratch.enable_load_extension(True)
+            sqlite_vss.load(scratch)
+            self._rebuild(scratch, projection, rows)
+            scratch.commit()
+            scratch.executemany(
+                "INSERT INTO vss_tasks (rowid, a) VALUES (?, ?)", rows[:1]
+            )
+            scratch.commit()
+        except sqlite3.Error as e:
+            description = self.describe(self.factory, self.dimensions)
+            raise ValueError(
+                f"Could not build the vector index with {description}: {e}"
+            ) from e
+        finally:
+            scratch.close()
+        # Taking the write lock before touching vss_tasks means it's read as it is
+        # under the lock.
+        conn = self._connect()
+        try:
+            with immediate_transaction(conn):
+                if not self._copied(conn):
+                    # Copy the vectors out before the table they're in is dropped.
+                    create_task_vectors(conn)
+                    conn.execute(
+                        "INSERT INTO task_vectors SELECT rowid, a FROM vss_tasks"
+                    )
+                self._rebuild(conn, projection, rows)
+                if not self.factory:
+                    self._fill(conn, projection)
+                    if not projection:
+                        conn.execute("DROP TABLE task_vectors")
+        finally:
+            conn.close()
+        if not self.factory:
+            return
+        # That connection's copy of the index is the one that was trained, without
+        # vectors other connections have added since, so fill a fresh one.
+        conn = self._connect()
+        try:
+            with immediate_transaction(conn):
+                self._fill(conn, projection)
+                # Changing the schema makes other connections read the index afresh.
+                self._save_projection(conn, projection)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """A new connection to the store's database, outside the pool."""
+        conn = sqlite3.connect(self._pool.path, timeout=self._pool.storage.busy_timeout)
+        conn.enable_load_extension(True)
+        sqlite_vss.load(conn)
+        return conn
+
+    def _rebuild(
+        self,
+        conn: sqlite3.Connection,
+        projection: PCAProjection | None,
+        training_rows: list[tuple[int, bytes]],
+    ) -> None:
+        """Replace the vss0 table with an empty one, given training data if need be."""
+        conn.execute("DROP TABLE IF EXISTS vss_tasks")
+        create_vector_store(
+            conn,
+            self.factory,
+            projection.dimensions if projection else EMBEDDING_DIMENSIONS,
+        )
+        self._save_projection(conn, projection)
+        if self.factory:
+            conn.executemany(
+                "INSERT INTO vss_tasks (operation, a) VALUES ('training', ?)",
+                [(data,) for _, data in training_rows],
+            )
+
+    @staticmethod
+    def _save_projection(
+        conn: sqlite3.Connection, projection: PCAProjection | None
+    ) -> None:
+        conn.execute("DROP TABLE IF EXISTS vector_projection")
+        create_vector_projection(conn)
+        if projection:
+            conn.execute(
+                "INSERT INTO vector_projection (dimensions, mean, components) "
+                "VALUES (?, ?, ?)",
+                (
+                    projection.dimensions,
+                    projection.mean.tobytes(),
+                    projection.components.tobytes(),
+                ),
+            )
+
+    def _fill(self, conn: sqlite3.Connection, projection: PCAProjection | None) -> None:
+        """Copy the stored vectors that the vss0 table doesn't have yet into it."""
+        indexed = {row_id for (row_id,) in conn.execute("SELECT rowid FROM vss_tasks")}
+        rows = [
+            (row_id, np.frombuffer(data, dtype=np.float32))
+            for row_id, data in conn.execute("SELECT rowid, a FROM task_vectors")
+            if row_id not in indexed
+        ]
+        if not rows:
+            return
+        conn.executemany(
+            "INSERT INTO vss_tasks (rowid, a) VALUES (?, ?)",
+            self._rows(
+                [row_id for row_id, _ in rows],
+                np.stack([vector for _, vector in rows]),
+                projection,
+            ),
+        )
+
+    def close(self) -> None:
+        """Nothing to do: the store closes the connections."""
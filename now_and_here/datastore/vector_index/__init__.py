@@ -0,0 +1,9 @@
+from .numpy_index import NumpyVectorIndex
+from .vector_index import AppendOnlyVectorIndex, DeferredRemovals, VectorIndex
+
+__all__ = [
+    "AppendOnlyVectorIndex",
+    "DeferredRemovals",
+    "NumpyVectorIndex",
+    "VectorIndex",
+]
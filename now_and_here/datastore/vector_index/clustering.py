@@ -0,0 +1,67 @@
+import numpy as np
+
+from .numpy_index import normalize
+
+# Rows of the similarity matrix computed at once. Memory use is about
+# block_size * len(vectors) * 4 bytes.
+CLUSTER_BLOCK_SIZE = 256
+
+
+def similarity_clusters(
+    vectors: np.ndarray, threshold: float, block_size: int = CLUSTER_BLOCK_SIZE
+) -> list[list[int]]:
+    """
+    Group vectors whose cosine similarity is at least `threshold`, transitively.
+
+    Returns the positions of the vectors in each group of two or more, in order. The
+    similarity matrix is computed a block of rows at a time (and only above the
+    diagonal), so memory stays bounded no matter how many vectors there are.
+    """
+    vectors = normalize(vectors)
+    parents = np.arange(len(vectors))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for start in range(0, len(vectors), block_size):
+        block = vectors[start : start + block_size]
+        similarities = block @ vectors[start:].T
+        rows, columns = np.nonzero(similarities >= threshold)
+        for row, column in zip(rows, columns):
+            i, j = start + int(row), start + int(column)
+            if j > i:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(len(vectors)):
+        clusters.setdefault(find(i), []).append(i)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def leader_groups(vectors: np.ndarray, threshold: float) -> list[list[int]]:
+    """
+    Group vectors with an earlier vector they're at least `threshold` similar to.
+
+    Vectors are taken in order, and each one not grouped yet leads a group of the later
+    ungrouped vectors that are similar enough to it. Unlike `similarity_clusters`, this
+    doesn't chain: every vector in a group is similar to the group's first, though not
+    necessarily to the others. Returns the positions of the vectors in each group of
+    two or more, leader first.
+    """
+    vectors = normalize(vectors)
+    grouped = np.zeros(len(vectors), dtype=bool)
+    groups = []
+    for i in range(len(vectors)):
+        if grouped[i]:
+            continue
+        similar = np.flatnonzero(vectors[i + 1 :] @ vectors[i] >= threshold) + i + 1
+        members = similar[~grouped[similar]]
+        if len(members):
+            grouped[members] = True
+            groups.append([i, *(int(j) for j in members)])
+    return groups
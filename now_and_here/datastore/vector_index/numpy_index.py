@@ -0,0 +1,390 @@
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import BinaryIO, Sequence
+
+import numpy as np
+
+from now_and_here.datastore.embeddings import EMBEDDING_DIMENSIONS
+
+# Rowids marking slots that have never been used, and slots whose vector was removed.
+EMPTY = -1
+TOMBSTONE = -2
+
+INITIAL_CAPACITY = 1024
+
+# The start of the index file: a marker for the format, then how many slots the file
+# has room for and how many dimensions each vector has. Padded so that the arrays after
+# it are aligned.
+HEADER = np.dtype(
+    {
+        "names": ["magic", "capacity", "dimensions"],
+        "formats": ["S8", "<i8", "<i8"],
+        "itemsize": 64,
+    }
+)
+MAGIC = b"NHVECS01"
+# The marker for files that also hold int8 codes for the vectors.
+QUANTIZED_MAGIC = b"NHVECQ01"
+
+# With int8 codes, how many candidates per result are re-ranked with the float vectors.
+RERANK_FACTOR = 4
+# How many codes are widened to floats at a time when scanning them.
+SCAN_BLOCK_SIZE = 1024
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Encode vectors as int8 codes, each scaled to fill the int8 range.
+
+    Returns the codes and each vector's scale; a vector is approximately its codes
+    times its scale.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=-1, initial=0) / 127
+    scales = np.where(scales == 0, 1, scales).astype(np.float32)
+    codes = np.round(vectors / scales[..., None]).astype(np.int8)
+    return codes, scales
+
+
+class NumpyVectorIndex:
+    """
+    A vector index in plain NumPy arrays, memory-mapped from a file next to the store.
+
+    `<store>.vectors` holds a header, then a rowid per slot, then each slot's
+    normalized vector, in the same order. Slots are filled in order; the unused tail
+    is room to grow. Replacing or removing a vector leaves a tombstone in its old slot,
+    which `compact` (or running out of room) cleans up.
+
+    A vector can also be replaced in two steps, by appending the new one (`append`)
+    and later tombstoning the old one (`supersede`) or the new one (`drop_latest`).
+    In between, both are stored, and the newer one is returned by `get`.
+
+    Search is an exact, brute-force dot product over every slot. Since the file is
+    memory-mapped, opening the index is nearly free and the OS page cache keeps it
+    warm between processes.
+
+    A `quantized` index (`<store>.qvectors`) also keeps each vector as int8 codes with
+    a scale, after the float vectors. Unfiltered searches scan the codes, which are a
+    quarter of the size, and re-rank the best `RERANK_FACTOR` candidates per result
+    with the float vectors. The file is a quarter bigger; a scan reads a quarter as
+    much, but widening the codes costs about as much as the float product, and
+    re-ranking reads scattered rows. See `benchmarks/vector_quantization.py` for the
+    recall and speed trade-off.
+
+    Writes should happen while holding the store's write lock (i.e. inside a write
+    transaction), so that processes sharing the store don't write over each other.
+    Compaction replaces the file outright, with a single rename, so other processes
+    see either the old rowids and vectors or the new ones, never a mix; they notice
+    and reopen it.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        dimensions: int = EMBEDDING_DIMENSIONS,
+        quantized: bool = False,
+    ):
+        self.path = path.with_suffix(".qvectors" if quantized else ".vectors")
+        self.dimensions = dimensions
+        self.quantized = quantized
+        self._magic = QUANTIZED_MAGIC if quantized else MAGIC
+        self._lock = threading.RLock()
+        self._arrays: tuple[np.memmap, np.memmap] | None = None
+        # The int8 codes and their scales, for a quantized index.
+        self._codes: tuple[np.memmap, np.memmap] | None = None
+        self._inode: int | None = None
+
+    def _open(self) -> tuple[np.memmap, np.memmap]:
+        """Map the file, creating it if needed and reopening it if it was replaced."""
+        if not self.path.exists():
+            self._write_file(
+                np.empty((0, self.dimensions), dtype=np.float32),
+                np.empty(0, dtype=np.int64),
+            )
+        if self._arrays is None or os.stat(self.path).st_ino != self._inode:
+            with open(self.path, "r+b") as file:
+                # The inode of the file actually opened, in case it was replaced again.
+                self._inode = os.fstat(file.fileno()).st_ino
+                (header,) = np.fromfile(file, dtype=HEADER, count=1)
+                if (
+                    header["magic"] != self._magic
+                    or header["dimensions"] != self.dimensions
+                ):
+                    raise ValueError(
+                        f"{self.path} doesn't hold {self.dimensions}-dimensional "
+                        "vectors"
+                    )
+                self._arrays = self._map(file, int(header["capacity"]))
+                if self.quantized:
+                    self._codes = self._map_codes(file, int(header["capacity"]))
+        return self._arrays
+
+    def _map(self, file: BinaryIO, capacity: int) -> tuple[np.memmap, np.memmap]:
+        """Map the vectors and rowids in an open index file with room for `capacity`."""
+        row_ids = np.memmap(
+            file, dtype=np.int64, mode="r+", offset=HEADER.itemsize, shape=(capacity,)
+        )
+        vectors = np.memmap(
+            file,
+            dtype=np.float32,
+            mode="r+",
+            offset=HEADER.itemsize + row_ids.nbytes,
+            shape=(capacity, self.dimensions),
+        )
+        return vectors, row_ids
+
+    def _map_codes(self, file: BinaryIO, capacity: int) -> tuple[np.memmap, np.memmap]:
+        """Map the int8 codes and scales in an open quantized index file."""
+        offset = HEADER.itemsize + capacity * (8 + 4 * self.dimensions)
+        scales = np.memmap(
+            file, dtype=np.float32, mode="r+", offset=offset, shape=(capacity,)
+        )
+        codes = np.memmap(
+            file,
+            dtype=np.int8,
+            mode="r+",
+            offset=offset + scales.nbytes,
+            shape=(capacity, self.dimensions),
+        )
+        return codes, scales
+
+    def _write_file(
+        self,
+        vectors: np.ndarray,
+        row_ids: np.ndarray,
+        capacity: int = INITIAL_CAPACITY,
+    ) -> None:
+        """Write out a new file holding `vectors`, with room for `capacity` in all."""
+        capacity = max(capacity, len(row_ids))
+        header = np.zeros(1, dtype=HEADER)
+        header["magic"] = self._magic
+        header["capacity"] = capacity
+        header["dimensions"] = self.dimensions
+        slot_size = 8 + 4 * self.dimensions
+        if self.quantized:
+            slot_size += 4 + self.dimensions
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w+b") as file:
+            header.tofile(file)
+            file.truncate(HEADER.itemsize + capacity * slot_size)
+            stored_vectors, stored_ids = self._map(file, capacity)
+            stored_vectors[: len(row_ids)] = vectors
+            if self.quantized:
+                codes, scales = self._map_codes(file, capacity)
+                codes[: len(row_ids)], scales[: len(row_ids)] = quantize(vectors)
+                codes.flush()
+                scales.flush()
+                del codes, scales
+            stored_ids[: len(row_ids)] = row_ids
+            stored_ids[len(row_ids) :] = EMPTY
+            stored_vectors.flush()
+            stored_ids.flush()
+            del stored_vectors, stored_ids
+        os.replace(tmp_path, self.path)
+        self._arrays = None
+        self._codes = None
+
+    @staticmethod
+    def _size(row_ids: np.ndarray) -> int:
+        """The number of slots in use (including tombstones)."""
+        empty = np.flatnonzero(row_ids == EMPTY)
+        return int(empty[0]) if len(empty) else len(row_ids)
+
+    def add(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        with self._lock:
+            self.append(row_ids, vectors)
+            self.supersede(row_ids)
+
+    def append(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        """Store vectors, leaving any already stored under the same rowids in place."""
+        if not row_ids:
+            return
+        vectors = normalize(vectors)
+        with self._lock:
+            stored_vectors, stored_ids = self._open()
+            size = self._size(stored_ids)
+            if size + len(row_ids) > len(stored_ids):
+                live = int((stored_ids[:size] >= 0).sum())
+                self._compact(capacity=2 * (live + len(row_ids)))
+                stored_vectors, stored_ids = self._open()
+                size = self._size(stored_ids)
+            end = size + len(row_ids)
+            # Write the vectors before their rowids, so that a concurrent search never
+            # sees a rowid without its vector.
+            stored_vectors[size:end] = vectors
+            stored_vectors.flush()
+            if self._codes is not None:
+                codes, scales = self._codes
+                codes[size:end], scales[size:end] = quantize(vectors)
+                codes.flush()
+                scales.flush()
+            stored_ids[size:end] = row_ids
+            stored_ids.flush()
+
+    def get(self, row_ids: list[int]) -> dict[int, np.ndarray]:
+        with self._lock:
+            stored_vectors, stored_ids = self._open()
+            size = self._size(stored_ids)
+            slots = np.flatnonzero(np.isin(stored_ids[:size], row_ids))
+            return {
+                int(stored_ids[slot]): np.array(stored_vectors[slot]) for slot in slots
+            }
+
+    def remove(self, row_ids: list[int]) -> None:
+        with self._lock:
+            _, stored_ids = self._open()
+            size = self._size(stored_ids)
+            slots = np.flatnonzero(np.isin(stored_ids[:size], row_ids))
+            self._tombstone(stored_ids, slots)
+
+    def supersede(self, row_ids: list[int]) -> None:
+        """Remove all but the most recently stored vector for each rowid."""
+        with self._lock:
+            _, stored_ids = self._open()
+            slots = self._slots_by_row_id(stored_ids, row_ids)
+            self._tombstone(
+                stored_ids,
+                [slot for row_slots in slots.values() for slot in row_slots[:-1]],
+            )
+
+    def drop_latest(self, row_ids: list[int]) -> None:
+        """
+        Remove the most recently stored vector for each rowid.
+
+        A rowid given n times has its n most recent vectors removed, which undoes n
+        calls to `append`.
+        """
+        with self._lock:
+            _, stored_ids = self._open()
+            slots = self._slots_by_row_id(stored_ids, row_ids)
+            counts = Counter(row_ids)
+            self._tombstone(
+                stored_ids,
+                [
+                    slot
+                    for row_id, row_slots in slots.items()
+                    for slot in row_slots[-counts[row_id] :]
+                ],
+            )
+
+    def _slots_by_row_id(
+        self, stored_ids: np.ndarray, row_ids: list[int]
+    ) -> dict[int, list[int]]:
+        """The slots holding each rowid's vectors, oldest first."""
+        size = self._size(stored_ids)
+        slots: dict[int, list[int]] = {}
+        for slot in np.flatnonzero(np.isin(stored_ids[:size], row_ids)):
+            slots.setdefault(int(stored_ids[slot]), []).append(int(slot))
+        return slots
+
+    @staticmethod
+    def _tombstone(stored_ids: np.memmap, slots: Sequence[int] | np.ndarray) -> None:
+        if len(slots):
+            stored_ids[slots] = TOMBSTONE
+            stored_ids.flush()
+
+    def search(
+        self, vector: np.ndarray, k: int, row_ids: list[int] | None = None
+    ) -> list[tuple[int, float]]:
+        query = normalize(vector)
+        with self._lock:
+            stored_vectors, stored_ids = self._open()
+            size = self._size(stored_ids)
+            ids = np.array(stored_ids[:size])
+            slots: np.ndarray | None = None
+            if row_ids is not None:
+                slots = np.flatnonzero(np.isin(ids, row_ids))
+            elif self._codes is not None:
+                slots = self._candidates(query, ids, 2 * k * RERANK_FACTOR)
+            if slots is None:
+                scores = np.asarray(stored_vectors[:size] @ query)
+                scores[ids < 0] = -np.inf
+                count = int((ids >= 0).sum())
+            else:
+                ids = ids[slots]
+                scores = np.asarray(stored_vectors[slots] @ query)
+                count = len(slots)
+        # While a replacement is being written, a rowid can have two vectors, so take
+        # twice as many candidates and keep each rowid's best.
+        candidates = min(2 * k, count)
+        if k <= 0 or candidates <= 0:
+            return []
+        nearest = np.argpartition(-scores, candidates - 1)[:candidates]
+        nearest = nearest[np.argsort(-scores[nearest])]
+        hits: dict[int, float] = {}
+        for i in nearest:
+            # For unit vectors, the squared L2 distance is 2 - 2 * cosine similarity.
+            hits.setdefault(int(ids[i]), float(2 - 2 * scores[i]))
+        return list(hits.items())[:k]
+
+    def _candidates(self, query: np.ndarray, ids: np.ndarray, n: int) -> np.ndarray:
+        """The slots of the `n` live vectors whose int8 codes score best, in slot order."""
+        assert self._codes is not None
+        codes, scales = self._codes
+        scores = np.empty(len(ids), dtype=np.float32)
+        # numpy has no fast int8 matrix product, so the codes are widened block by
+        # block, keeping the floats small enough to stay in the CPU cache.
+        for start in range(0, len(ids), SCAN_BLOCK_SIZE):
+            end = min(start + SCAN_BLOCK_SIZE, len(ids))
+            block = codes[start:end].astype(np.float32)
+            scores[start:end] = (block @ query) * scales[start:end]
+        live = ids >= 0
+        n = min(n, int(live.sum()))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64)
+        scores[~live] = -np.inf
+        return np.sort(np.argpartition(-scores, n - 1)[:n])
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            _, stored_ids = self._open()
+            return not (stored_ids >= 0).any()
+
+    def row_ids(self) -> list[int]:
+        with self._lock:
+            _, stored_ids = self._open()
+            return [int(id) for id in stored_ids[stored_ids >= 0]]
+
+    def compact(self) -> None:
+        """
+        Reclaim tombstoned slots, and keep only the latest vector for each rowid.
+
+        Older vectors are ones whose `supersede` never happened, e.g. because the store
+        was busy. Vectors mustn't be being replaced meanwhile.
+        """
+        with self._lock:
+            _, stored_ids = self._open()
+            live = int((stored_ids >= 0).sum())
+            self._compact(capacity=max(INITIAL_CAPACITY, 2 * live), latest_only=True)
+
+    def _compact(self, capacity: int, latest_only: bool = False) -> None:
+        stored_vectors, stored_ids = self._open()
+        size = self._size(stored_ids)
+        live = np.flatnonzero(stored_ids[:size] >= 0)
+        if latest_only:
+            # np.unique finds first occurrences, so look for them back to front.
+            _, last = np.unique(stored_ids[live][::-1], return_index=True)
+            live = live[np.sort(len(live) - 1 - last)]
+        self._write_file(
+            np.array(stored_vectors[live]), np.array(stored_ids[live]), capacity
+        )
+
+    def train(self) -> None:
+        """Nothing to train: searches are exact. Rebuilding just compacts the file."""
+        self.compact()
+
+    def close(self) -> None:
+        with self._lock:
+            for array in (*(self._arrays or ()), *(self._codes or ())):
+                array.flush()
+            self._arrays = None
+            self._codes = None
+            self._inode = None
@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class PCAProjection:
+    """
+    A linear projection of vectors onto their first few principal components.
+
+    Distances between projected vectors approximate (and never exceed) the distances
+    between the original vectors, as closely as any projection to that many
+    dimensions can for the vectors it was fitted to.
+    """
+
+    mean: np.ndarray
+    # One principal component per row, most significant first.
+    components: np.ndarray
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dimensions: int) -> "PCAProjection":
+        """Fit a projection to `dimensions` dimensions from a sample of vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not 0 < dimensions <= vectors.shape[1]:
+            raise ValueError(
+                f"Can't reduce {vectors.shape[1]}-dimensional vectors to {dimensions}"
+            )
+        if len(vectors) < dimensions:
+            raise ValueError(
+                f"Need at least {dimensions} vectors to fit {dimensions} dimensions, "
+                f"but there are only {len(vectors)}"
+            )
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean=mean, components=vt[:dimensions].astype(np.float32))
+
+    @property
+    def dimensions(self) -> int:
+        return len(self.components)
+
+    def project(self, vectors: np.ndarray) -> np.ndarray:
+        """Project one vector, or a matrix of vectors (one per row)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return ((vectors - self.mean) @ self.components.T).astype(np.float32)
+
+    def explained_variance(self, vectors: np.ndarray) -> float:
+        """The fraction of the variance of `vectors` that the projection keeps."""
+        centered = np.asarray(vectors, dtype=np.float32) - self.mean
+        total = float((centered**2).sum())
+        return float((self.project(vectors) ** 2).sum()) / total if total else 1.0
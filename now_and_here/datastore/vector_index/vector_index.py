@@ -0,0 +1,127 @@
+from typing import Protocol, runtime_checkable
+
+import numpy as np
+
+
+@runtime_checkable
+class VectorIndex(Protocol):
+    """
+    Storage and nearest-neighbour search for task embeddings, keyed by integer rowid.
+
+    Distances are squared L2 distances between (normalized) vectors, so smaller is
+    nearer.
+    """
+
+    def add(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        """Store vectors, replacing any already stored under the same rowids."""
+        ...
+
+    def get(self, row_ids: list[int]) -> dict[int, np.ndarray]:
+        """Fetch stored vectors. Rowids with no vector are left out."""
+        ...
+
+    def remove(self, row_ids: list[int]) -> None:
+        """Remove vectors. Rowids with no vector are ignored."""
+        ...
+
+    def search(
+        self, vector: np.ndarray, k: int, row_ids: list[int] | None = None
+    ) -> list[tuple[int, float]]:
+        """
+        Find the `k` stored vectors nearest to `vector`, as (rowid, distance) pairs.
+
+        With `row_ids`, only those vectors are considered.
+        """
+        ...
+
+    def is_empty(self) -> bool: ...
+
+    def row_ids(self) -> list[int]:
+        """The rowids of all stored vectors."""
+        ...
+
+    def compact(self) -> None:
+        """Reclaim space left behind by removed or replaced vectors."""
+        ...
+
+    def train(self) -> None:
+        """
+        Rebuild the index from its stored vectors.
+
+        Index types that cluster vectors are trained on the stored vectors first.
+        """
+        ...
+
+    def close(self) -> None: ...
+
+
+@runtime_checkable
+class AppendOnlyVectorIndex(VectorIndex, Protocol):
+    """A vector index that can replace vectors in two steps (see `NumpyVectorIndex`)."""
+
+    def append(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        """Store vectors, leaving any already stored under the same rowids in place."""
+        ...
+
+    def supersede(self, row_ids: list[int]) -> None:
+        """Remove all but the most recently stored vector for each rowid."""
+        ...
+
+    def drop_latest(self, row_ids: list[int]) -> None:
+        """Remove the most recently stored vector for each rowid (once per mention)."""
+        ...
+
+
+class DeferredRemovals:
+    """
+    A vector index that adds vectors straight away but holds back removals.
+
+    For indexes kept outside the database, which can't be rolled back with it. The
+    store adds vectors during its transaction, so they're in place before the rows
+    that refer to them commit. Removals, including of the vectors that added ones
+    replace, wait until the transaction has committed (see `apply`), so that a
+    rollback can't leave a task without its vector. If it rolls back instead, the
+    added vectors are dropped again (see `discard`).
+    """
+
+    def __init__(self, index: AppendOnlyVectorIndex) -> None:
+        self.index = index
+        self._removed: set[int] = set()
+        self._appended: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._removed) + len(self._appended)
+
+    def add(self, row_ids: list[int], vectors: np.ndarray) -> None:
+        self._removed.difference_update(row_ids)
+        self.index.append(row_ids, vectors)
+        self._appended.extend(row_ids)
+
+    def remove(self, row_ids: list[int]) -> None:
+        self._removed.update(row_ids)
+
+    def apply(self) -> None:
+        """Make the removals held back so far."""
+        self.index.supersede(sorted(set(self._appended) - self._removed))
+        self.index.remove(sorted(self._removed))
+        self._removed.clear()
+        self._appended.clear()
+
+    def discard(self) -> None:
+        """Drop the vectors added so far, and forget the removals."""
+        self.index.drop_latest(self._appended)
+        self._removed.clear()
+        self._appended.clear()
+
+
+def rank_by_distance(
+    vectors: dict[int, np.ndarray], vector: np.ndarray, k: int
+) -> list[tuple[int, float]]:
+    """Brute-force nearest neighbours among a handful of vectors."""
+    if not vectors:
+        return []
+    row_ids = list(vectors)
+    matrix = np.stack([vectors[row_id] for row_id in row_ids])
+    distances = ((matrix - vector) ** 2).sum(axis=1)
+    nearest = np.argsort(distances)[:k]
+    return [(row_ids[i], float(distances[i])) for i in nearest]
@@ -1,38 +1,122 @@
-from fastapi import APIRouter, Body
+import asyncio
+import functools
+import json
+import os
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Body, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import HTTPException
+from fastapi.responses import StreamingResponse
 
-from now_and_here import datastore
-from now_and_here.datastore.errors import RecordNotFoundError
-from now_and_here.models import FEProject
-from now_and_here.models.task import FENewTaskIn, FETaskOut
+from now_and_here.datastore.errors import (
+    InvalidPageTokenError,
+    InvalidSortError,
+    RecordNotFoundError,
+)
+from now_and_here.datastore.pagination import DEFAULT_PAGE_SIZE
+from now_and_here.datastore.search import SEARCH_MODE
+from now_and_here.models import FEProject, Task
+from now_and_here.models.task import FENewTaskIn, FETaskOut, FETaskPage
+from now_and_here.models.task_row import FETaskRowOut
 from now_and_here.models.user_context import UserContextFE
 from now_and_here.views.task_views import TaskView, task_views
 
+from .dependencies import StoreDep
+
 api_router = APIRouter(prefix="/api")
 
+# How long a typeahead request waits for the user to stop typing before it runs a
+# semantic search.
+TYPEAHEAD_SETTLE_SECONDS = float(os.getenv("NH_TYPEAHEAD_SETTLE_SECONDS", "0.3"))
+# How many tasks GET /api/tasks reads from the store for each chunk it streams.
+TASK_STREAM_PAGE_SIZE = 200
 
-@api_router.get("/tasks")
+
+@api_router.get("/tasks", response_model=list[FETaskOut])
 def get_tasks(
+    store: StoreDep,
     project_id: str,
     include_child_projects: bool = False,
     sort_by: str = "due",
     desc: bool = False,
     include_done: bool = False,
-) -> list[FETaskOut]:
-    store = datastore.get_store()
-    tasks = store.get_tasks(
+) -> StreamingResponse:
+    """
+    Get all of a project's tasks, as a JSON array streamed a page at a time.
+
+    Each page is read from the store as the previous one is sent, so the response
+    starts straight away and the server never holds more than one page, however
+    many tasks the project has.
+    """
+    get_page = functools.partial(
+        store.get_tasks_page,
         project_id=project_id,
         include_child_projects=include_child_projects,
         include_done=include_done,
         sort_by=sort_by,
         desc=desc,
+        limit=TASK_STREAM_PAGE_SIZE,
+    )
+    try:
+        first_page = get_page()
+    except InvalidSortError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def chunks():
+        page = first_page
+        yield "["
+        separator = ""
+        while True:
+            for task in page.tasks:
+                yield separator + FETaskOut.from_task(task).model_dump_json()
+                separator = ","
+            if page.next_page_token is None:
+                break
+            page = get_page(page_token=page.next_page_token)
+        yield "]"
+
+    return StreamingResponse(chunks(), media_type="application/json")
+
+
+@api_router.get("/tasks/page")
+def get_tasks_page(
+    store: StoreDep,
+    project_id: str,
+    include_child_projects: bool = False,
+    sort_by: str = "due",
+    desc: bool = False,
+    include_done: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1),
+    page_token: str | None = None,
+) -> FETaskPage:
+    """
+    Get one page of a project's tasks.
+
+    Pass `next_page_token` back as `page_token`, with the same filters and sort, to
+    get the next page. It's null on the last page.
+    """
+    try:
+        page = store.get_tasks_page(
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+            sort_by=sort_by,
+            desc=desc,
+            limit=limit,
+            page_token=page_token,
+        )
+    except (InvalidSortError, InvalidPageTokenError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FETaskPage(
+        tasks=[FETaskOut.from_task(t) for t in page.tasks],
+        next_page_token=page.next_page_token,
     )
-    return [FETaskOut.from_task(t) for t in tasks]
 
 
 @api_router.post("/checkoff_task/{id}")
-def checkoff_task(id: str) -> FETaskOut:
-    store = datastore.get_store()
+def checkoff_task(store: StoreDep, id: str) -> FETaskOut:
     try:
         task = store.get_task(id)
     except RecordNotFoundError:
@@ -43,8 +127,7 @@ def checkoff_task(id: str) -> FETaskOut:
 
 
 @api_router.post("/uncheckoff_task/{id}")
-def uncheckoff_task(id: str) -> FETaskOut:
-    store = datastore.get_store()
+def uncheckoff_task(store: StoreDep, id: str) -> FETaskOut:
     try:
         task = store.get_task(id)
     except RecordNotFoundError:
@@ -55,8 +138,7 @@ def uncheckoff_task(id: str) -> FETaskOut:
 
 
 @api_router.get("/projects/{id}")
-def get_project_by_id(id: str) -> FEProject:
-    store = datastore.get_store()
+def get_project_by_id(store: StoreDep, id: str) -> FEProject:
     try:
         project = store.get_project(id)
     except RecordNotFoundError:
@@ -65,16 +147,55 @@ def get_project_by_id(id: str) -> FEProject:
 
 
 @api_router.post("/tasks")
-def create_task(task: FENewTaskIn) -> FETaskOut:
-    store = datastore.get_store()
+def create_task(store: StoreDep, task: FENewTaskIn) -> FETaskOut:
     backend_task = task.to_task(store=store)
     store.save_task(backend_task)
     return FETaskOut.from_task(backend_task)
 
 
+@api_router.post("/tasks/bulk")
+def create_tasks(store: StoreDep, tasks: list[FENewTaskIn]) -> list[FETaskOut]:
+    """Create many tasks in one transaction."""
+    backend_tasks = [task.to_task(store=store) for task in tasks]
+    store.save_tasks(backend_tasks)
+    return [FETaskOut.from_task(t) for t in backend_tasks]
+
+
+@api_router.put("/tasks/bulk")
+def update_tasks(store: StoreDep, tasks: list[FENewTaskIn]) -> list[FETaskOut]:
+    """Update many tasks, identified by their IDs, in one transaction."""
+    if any(task.id is None for task in tasks):
+        raise HTTPException(status_code=422, detail="Every task needs an id")
+    backend_tasks = [task.to_task(store=store) for task in tasks]
+    try:
+        store.update_tasks(backend_tasks)
+    except RecordNotFoundError:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return [FETaskOut.from_task(t) for t in backend_tasks]
+
+
+@api_router.post("/tasks/bulk_checkoff")
+def checkoff_tasks(store: StoreDep, ids: list[str] = Body(...)) -> list[FETaskOut]:
+    """Check off many tasks in one transaction. Returns the tasks that were found."""
+    results = store.checkoff_tasks(ids)
+    return [FETaskOut.from_task(t) for t in store.get_tasks_by_ids(list(results))]
+
+
+@api_router.post("/tasks/bulk_delete")
+def delete_tasks(store: StoreDep, ids: list[str] = Body(...)) -> list[str]:
+    """Delete many tasks in one transaction. Returns the IDs of the deleted tasks."""
+    return store.delete_tasks(ids)
+
+
+@api_router.post("/projects/suggest")
+def suggest_project(store: StoreDep, task: FENewTaskIn) -> FEProject | None:
+    """Suggest a project for a task that's being written."""
+    project = store.suggest_project(task.to_task(store=store))
+    return FEProject.from_project(project) if project else None
+
+
 @api_router.get("/projects")
-def get_projects() -> list[FEProject]:
-    store = datastore.get_store()
+def get_projects(store: StoreDep) -> list[FEProject]:
     projects = store.get_projects()
     projects_with_parents = [FEProject.from_project(p) for p in projects]
     return projects_with_parents
@@ -95,32 +216,140 @@ def get_task_view(name: str) -> TaskView:
         raise HTTPException(status_code=404, detail=f"View '{name}' not found")
 
 
-@api_router.post("/task_views/build")
+@api_router.post("/task_views/build", response_model=list[FETaskRowOut])
 def build_task_view(
-    view_name: str = Body(), context: UserContextFE = Body()
-) -> list[FETaskOut]:
-    """Get a specific view of tasks."""
+    store: StoreDep, view_name: str = Body(), context: UserContextFE = Body()
+) -> list[dict[str, Any]]:
+    """
+    Get a specific view of tasks.
+
+    The view is built from lightweight task rows rather than full tasks, so each task's
+    parent is just {"id": ...} and its project just {"id": ..., "name": ...}.
+    """
     try:
         view = task_views[view_name]
     except KeyError:
         raise HTTPException(status_code=404, detail=f"View '{view_name}' not found")
-    user_context = context.to_user_context()
-    store = datastore.get_store()
-    tasks = view.build(store, user_context)
-    return [FETaskOut.from_task(t) for t in tasks]
+    rows = view.build_rows(store, context.to_user_context())
+    return [row.as_dict() for row in rows]
 
 
 @api_router.post("/tasks/search")
-def search_tasks(query: str = Body(..., embed=True)) -> list[FETaskOut]:
-    """Search for tasks."""
-    store = datastore.get_store()
-    tasks = store.search_tasks(query)
+def search_tasks(
+    store: StoreDep,
+    query: str = Body(..., embed=True),
+    limit: int = Body(5, embed=True),
+    project_id: str | None = Body(None, embed=True),
+    include_child_projects: bool = Body(False, embed=True),
+    include_done: bool = Body(True, embed=True),
+    due_before: datetime | None = Body(None, embed=True),
+    mode: SEARCH_MODE = Body("hybrid", embed=True),
+) -> list[FETaskOut]:
+    """Search for tasks, optionally within a project or due window."""
+    tasks = store.search_tasks(
+        query,
+        limit=limit,
+        project_id=project_id,
+        include_child_projects=include_child_projects,
+        include_done=include_done,
+        due_before=due_before,
+        mode=mode,
+    )
+    return [FETaskOut.from_task(t) for t in tasks]
+
+
+@api_router.post("/tasks/typeahead")
+async def typeahead_tasks(
+    store: StoreDep,
+    query: str = Body(..., embed=True),
+    limit: int = Body(10, embed=True),
+    project_id: str | None = Body(None, embed=True),
+    include_child_projects: bool = Body(False, embed=True),
+    include_done: bool = Body(False, embed=True),
+) -> StreamingResponse:
+    """
+    Suggest tasks as a search query is typed, as a stream of JSON lines.
+
+    Tasks whose names match the text so far are sent straight away. If the request is
+    still open TYPEAHEAD_SETTLE_SECONDS later, semantic matches follow. The client
+    should drop its previous request on each keystroke, so that only the query the
+    user settles on is embedded. Each line is {"source": ..., "tasks": [...]}, with
+    "lexical" or "semantic" as the source.
+    """
+    lexical = await run_in_threadpool(
+        functools.partial(
+            store.typeahead_tasks,
+            query,
+            limit=limit,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+        )
+    )
+
+    async def results():
+        yield typeahead_line("lexical", lexical)
+        # A request dropped while waiting is cancelled here, before touching the model.
+        # Once the search starts it runs to completion, so it has to come after this.
+        await asyncio.sleep(TYPEAHEAD_SETTLE_SECONDS)
+        semantic = await run_in_threadpool(
+            functools.partial(
+                store.search_tasks,
+                query,
+                limit=limit,
+                project_id=project_id,
+                include_child_projects=include_child_projects,
+                include_done=include_done,
+                mode="semantic",
+            )
+        )
+        seen = {task.id for task in lexical}
+        yield typeahead_line(
+            "semantic", [task for task in semantic if task.id not in seen]
+        )
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def typeahead_line(source: str, tasks: list[Task]) -> str:
+    return (
+        json.dumps(
+            {
+                "source": source,
+                "tasks": [
+                    FETaskOut.from_task(t).model_dump(mode="json") for t in tasks
+                ],
+            }
+        )
+        + "\n"
+    )
+
+
+@api_router.get("/tasks/{id}/related")
+def get_related_tasks(
+    store: StoreDep,
+    id: str,
+    limit: int = 5,
+    project_id: str | None = None,
+    include_child_projects: bool = False,
+    include_done: bool = False,
+) -> list[FETaskOut]:
+    """Get the tasks most similar to a task."""
+    try:
+        tasks = store.related_tasks(
+            id,
+            limit=limit,
+            project_id=project_id,
+            include_child_projects=include_child_projects,
+            include_done=include_done,
+        )
+    except RecordNotFoundError:
+        raise HTTPException(status_code=404, detail="Task not found")
     return [FETaskOut.from_task(t) for t in tasks]
 
 
 @api_router.put("/tasks/{id}")
-def update_task(id: str, task: FENewTaskIn) -> FETaskOut:
-    store = datastore.get_store()
+def update_task(store: StoreDep, id: str, task: FENewTaskIn) -> FETaskOut:
     as_backend_task = task.to_task(store=store)
     as_backend_task.id = id
     try:
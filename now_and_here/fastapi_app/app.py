@@ -1,4 +1,6 @@
 import os
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -6,12 +8,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from now_and_here import datastore
+from now_and_here.datastore.embeddings import get_embedding_service
+
 from .api import api_router
 
 UI_DIR = Path(__file__).parent / "ui"
 ASSETS_DIR = UI_DIR / "assets"
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the store once for the whole process; handlers get it via a dependency.
+    app.state.store = datastore.get_store()
+    # Tasks saved through the API (or the CLI, in the background embedding mode) are
+    # embedded by this worker.
+    app.state.store.start_embedding_worker()
+    if os.getenv("NH_WARM_UP_EMBEDDINGS"):
+        # Load the embedding model in the background so startup isn't held up.
+        service = get_embedding_service()
+        threading.Thread(target=service.warm_up, daemon=True).start()
+    yield
+    app.state.store.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 if cors_origin := os.getenv("NH_CORS_ORIGIN"):
     app.add_middleware(
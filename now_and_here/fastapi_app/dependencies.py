@@ -0,0 +1,19 @@
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from now_and_here.datastore import DataStore
+
+
+def get_store(request: Request) -> DataStore:
+    """
+    Get the process-wide datastore.
+
+    The store is opened once at startup (see the app's lifespan) and hands out a pooled
+    connection per worker thread, so handlers don't pay for config loading, connecting,
+    or loading extensions on every request.
+    """
+    return request.app.state.store
+
+
+StoreDep = Annotated[DataStore, Depends(get_store)]
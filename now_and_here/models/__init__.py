@@ -1,6 +1,15 @@
 from .label import Label
 from .project import FEProject, Project
 from .task import Task
+from .task_row import ProjectRef, TaskRow
 from .user_context import UserContext
 
-__all__ = ["Label", "Project", "FEProject", "Task", "UserContext"]
+__all__ = [
+    "Label",
+    "Project",
+    "FEProject",
+    "ProjectRef",
+    "Task",
+    "TaskRow",
+    "UserContext",
+]
@@ -41,10 +41,11 @@ def id_as_int(id: str) -> int:
     return num
 
 
-def decode_id_from_int(num: int) -> str:
-    """Convert an encoded integer back to an ID."""
+def decode_id_from_int(num: int, length: int = ID_LENGTH) -> str:
+    """Convert an encoded integer back to an ID of the given length."""
     s = ""
     while num:
         num, remainder = divmod(num, 26)
         s = chr(remainder + ord("a")) + s
-    return s
+    # Leading "a"s encode as zeros, so they have to be added back.
+    return s.rjust(length, "a")
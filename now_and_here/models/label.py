@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 from .common import random_id
 
@@ -7,3 +7,6 @@ class Label(BaseModel):
     id: str = Field(default_factory=random_id)
     name: str = Field(..., min_length=1, max_length=100)
     description: str | None = Field(None)
+
+
+LabelListModel: TypeAdapter[list[Label]] = TypeAdapter(list[Label])
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 from typing import Iterable, Self
 
 from pydantic import BaseModel, Field, field_serializer
@@ -55,8 +54,7 @@ class Project(BaseModel):
 
     @classmethod
     def from_json(cls, data: str) -> Self:
-        values = json.loads(data)
-        return cls(**values)
+        return cls.model_validate_json(data)
 
     def __rich_console__(
         self, console: Console, options: ConsoleOptions
@@ -2,7 +2,14 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Iterable, Self
 
-from pydantic import AwareDatetime, BaseModel, Field, RootModel, field_serializer
+from pydantic import (
+    AwareDatetime,
+    BaseModel,
+    Field,
+    RootModel,
+    TypeAdapter,
+    field_serializer,
+)
 from rich.console import Console, ConsoleOptions, RenderResult
 from rich.layout import Layout
 from rich.padding import Padding
@@ -13,6 +20,7 @@ from rich.text import Text
 
 if TYPE_CHECKING:
     from now_and_here.datastore import DataStore
+    from now_and_here.models.task_row import TaskRow
 from now_and_here.models.repeat_interval import RepeatIntervalType
 from now_and_here.time import format_time, relative_time
 
@@ -34,7 +42,8 @@ class Task(BaseModel):
     repeat: RepeatIntervalType | None = Field(None)
 
     @classmethod
-    def as_rich_table(cls, tasks: Iterable[Self]) -> Table:
+    def as_rich_table(cls, tasks: Iterable[Task | TaskRow]) -> Table:
+        """Tabulate tasks, or the lighter task rows."""
         table = Table(title="Tasks", leading=1)
         table.add_column("ID", justify="left", style="cyan", width=ID_LENGTH + 1)
         table.add_column("Done", justify="center", width=4)
@@ -44,34 +53,9 @@ class Task(BaseModel):
         table.add_column("Repeat", justify="right", max_width=30)
         table.add_column("Project", justify="right", max_width=30)
         for task in tasks:
-            table.add_row(*task._as_rich_table_row())
+            table.add_row(*_rich_table_row(task))
         return table
 
-    def _as_rich_table_row(self) -> tuple[str, str, Text, Text, Text, str, Text | None]:
-        desc = Text(self.name)
-        if self.description:
-            desc += Text(f"\n{self.description}", style="italic dim")
-        priority = format_priority(self.priority)
-        done = ":white_heavy_check_mark:" if self.done else ""
-        if self.due is not None:
-            # Display dates as "in 3 days" or "in 17 hours", with the precise time
-            # listed below in italic.
-            due = Text(f"{relative_time(self.due)}") + Text(
-                "\n" + format_time(self.due), style="italic dim"
-            )
-        else:
-            due = Text("None", style="dim")
-        repeat = str(self.repeat) if self.repeat is not None else ""
-        if self.project:
-            project_text = (
-                Text(self.project.name)
-                + "\n"
-                + Text(format_id(self.project.id), style="cyan italic")
-            )
-        else:
-            project_text = Text("")
-        return format_id(self.id), done, desc, priority, due, repeat, project_text
-
     def as_card(self) -> Panel:
         if self.due:
             due_layout = Layout(name="due")
@@ -184,11 +168,67 @@ class Task(BaseModel):
             repeat=self.repeat,
         )
 
+    def merge(self, duplicates: list[Task]) -> Self:
+        """
+        Fold duplicates of this task into a copy of it, keeping this task's ID.
+
+        Descriptions and labels are combined, the highest priority and earliest due
+        date win, and a project or repeat is filled in from a duplicate if this task
+        doesn't have one.
+        """
+        tasks: list[Task] = [self, *duplicates]
+        descriptions = [t.description for t in tasks if t.description]
+        labels = {label.id: label for t in tasks for label in t.labels}
+        due_dates = [t.due for t in tasks if t.due is not None]
+        return self.model_copy(
+            update={
+                "description": "\n".join(dict.fromkeys(descriptions)) or None,
+                "labels": list(labels.values()),
+                "priority": max(t.priority for t in tasks),
+                "due": min(due_dates) if due_dates else None,
+                "project": next((t.project for t in tasks if t.project), None),
+                "repeat": next((t.repeat for t in tasks if t.repeat), None),
+            }
+        )
+
     @property
     def relative_due_date(self) -> str | None:
         return relative_time(self.due) if self.due else None
 
 
+def _rich_table_row(
+    task: Task | TaskRow,
+) -> tuple[str, str, Text, Text, Text, str, Text | None]:
+    desc = Text(task.name)
+    if task.description:
+        desc += Text(f"\n{task.description}", style="italic dim")
+    priority = format_priority(task.priority)
+    done = ":white_heavy_check_mark:" if task.done else ""
+    if task.due is not None:
+        # Display dates as "in 3 days" or "in 17 hours", with the precise time
+        # listed below in italic.
+        due = Text(f"{relative_time(task.due)}") + Text(
+            "\n" + format_time(task.due), style="italic dim"
+        )
+    else:
+        due = Text("None", style="dim")
+    repeat = str(task.repeat) if task.repeat is not None else ""
+    if task.project:
+        project_text = (
+            Text(task.project.name)
+            + "\n"
+            + Text(format_id(task.project.id), style="cyan italic")
+        )
+    else:
+        project_text = Text("")
+    return format_id(task.id), done, desc, priority, due, repeat, project_text
+
+
+# Validates a whole list of tasks in one call, which is much faster than validating
+# them one at a time.
+TaskListModel: TypeAdapter[list[Task]] = TypeAdapter(list[Task])
+
+
 class FETaskOut(Task):
     """A task that serializes appropriately for the front end."""
 
@@ -218,6 +258,13 @@ class FETaskOut(Task):
         )
 
 
+class FETaskPage(BaseModel):
+    """A page of tasks for the front end, and the token for the page after it."""
+
+    tasks: list[FETaskOut]
+    next_page_token: str | None = None
+
+
 class FENewTaskIn(Task):
     """A task received from the front end."""
 
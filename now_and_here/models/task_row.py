@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from pydantic import AwareDatetime, BaseModel
+
+from now_and_here.models.label import Label
+from now_and_here.models.repeat_interval import RepeatIntervalType
+
+
+class ProjectRef(NamedTuple):
+    """A project's ID and name, which is all that task lists show of it."""
+
+    id: str
+    name: str
+
+
+class TaskRow(NamedTuple):
+    """
+    A read-only summary of a task, with just the fields that task lists show or edit.
+
+    Rows are far smaller and cheaper to build than full `Task`s (no validation, the
+    parent by ID alone, and a bare reference to the project), so long lists should use
+    them. Rows in the same project share one `ProjectRef`, and rows with the same labels
+    share one (immutable) tuple of them.
+    """
+
+    id: str
+    name: str
+    description: str | None
+    done: bool
+    priority: int
+    due: datetime | None
+    repeat: RepeatIntervalType | None
+    project: ProjectRef | None
+    labels: tuple[Label, ...]
+    parent_id: str | None
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        The row as JSON-compatible values, shaped like a serialized `FETaskOut`.
+
+        The parent is just {"id": ...} and the project just {"id": ..., "name": ...},
+        which is all the web UI reads of them in task lists (see `FETaskRowOut`).
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "done": self.done,
+            "priority": self.priority,
+            "due": self.due.isoformat() if self.due else None,
+            "repeat": self.repeat.model_dump(mode="json") if self.repeat else None,
+            "project": self.project._asdict() if self.project else None,
+            "labels": [label.model_dump(mode="json") for label in self.labels],
+            "parent": {"id": self.parent_id} if self.parent_id else None,
+        }
+
+
+class FETaskRef(BaseModel):
+    """A reference to a task by its ID, for the front end."""
+
+    id: str
+
+
+class FEProjectRef(BaseModel):
+    """A project's ID and name, for the front end."""
+
+    id: str
+    name: str
+
+
+class FETaskRowOut(BaseModel):
+    """A task row as the front end receives it (see `TaskRow.as_dict`)."""
+
+    id: str
+    name: str
+    description: str | None
+    done: bool
+    priority: int
+    due: AwareDatetime | None
+    repeat: RepeatIntervalType | None
+    project: FEProjectRef | None
+    labels: list[Label]
+    parent: FETaskRef | None
@@ -1,22 +1,35 @@
 from datetime import datetime
-from typing import Callable
+from typing import Callable, TypeVar
 
 from pydantic import BaseModel, PrivateAttr
 from zoneinfo import ZoneInfo
 
 from now_and_here.datastore.datastore import DataStore
-from now_and_here.models import Task, UserContext
+from now_and_here.models import Task, TaskRow, UserContext
+
+T = TypeVar("T", Task, TaskRow)
+# Lists tasks, taking the same filters as `DataStore.get_tasks`: that method itself,
+# or `DataStore.get_task_rows` when rows are enough.
+TaskLister = Callable[..., list[T]]
 
 
 class TaskView(BaseModel):
-    """A container for a function that takes in a datastore and returns a list of tasks."""
+    """
+    A container for a function that lists tasks for a user.
+
+    The function is given a way of listing tasks, so a view can be built as full tasks
+    or as lighter task rows.
+    """
 
     name: str
     description: str
-    _builder: Callable[[DataStore, UserContext], list[Task]] = PrivateAttr()
+    _builder: Callable[[TaskLister, UserContext], list] = PrivateAttr()
 
     def build(self, store: DataStore, context: UserContext) -> list[Task]:
-        return self._builder(store, context)
+        return self._builder(store.get_tasks, context)
+
+    def build_rows(self, store: DataStore, context: UserContext) -> list[TaskRow]:
+        return self._builder(store.get_task_rows, context)
 
 
 task_views: dict[str, TaskView] = {}
@@ -24,10 +37,10 @@ task_views: dict[str, TaskView] = {}
 
 def register_task_view(
     name: str, description: str
-) -> Callable[[Callable[[DataStore, UserContext], list[Task]]], TaskView]:
+) -> Callable[[Callable[[TaskLister, UserContext], list]], TaskView]:
     """A decorator to register a task view."""
 
-    def register(callable: Callable[[DataStore, UserContext], list[Task]]) -> TaskView:
+    def register(callable: Callable[[TaskLister, UserContext], list]) -> TaskView:
         view = TaskView(name=name, description=description)
         view._builder = callable
         task_views[view.name.lower().replace(" ", "-")] = view
@@ -37,20 +50,22 @@ def register_task_view(
 
 
 @register_task_view(name="Today", description="Tasks due before the end of the day")
-def build_today_task_view(store: DataStore, context: UserContext) -> list[Task]:
+def build_today_task_view(list_tasks: TaskLister[T], context: UserContext) -> list[T]:
     """Return tasks due before the end of the user's current day."""
     user_now = datetime.now(context.timezone)
     end_of_user_day = datetime(
         user_now.year, user_now.month, user_now.day, 23, 59, 59, tzinfo=context.timezone
     )
     end_of_day_in_utc = end_of_user_day.astimezone(ZoneInfo("UTC"))
-    tasks = store.get_tasks(due_before=end_of_day_in_utc)
+    tasks = list_tasks(due_before=end_of_day_in_utc)
     return tasks
 
 
 @register_task_view(name="No project", description="Tasks without a project")
-def build_no_project_task_view(store: DataStore, _context: UserContext) -> list[Task]:
+def build_no_project_task_view(
+    list_tasks: TaskLister[T], _context: UserContext
+) -> list[T]:
     """Return tasks without a project."""
-    tasks = store.get_tasks()
+    tasks = list_tasks()
     tasks = [t for t in tasks if t.project is None]
     return tasks
@@ -3,7 +3,15 @@ from typing import Iterable
 import numpy as np
 
 class TextEmbedding:
+    def __init__(
+        self,
+        model_name: str = ...,
+        cache_dir: str | None = None,
+        threads: int | None = None,
+    ) -> None: ...
     def embed(
         self,
         documents: str | Iterable[str],
+        batch_size: int = 256,
+        parallel: int | None = None,
     ) -> Iterable[np.ndarray]: ...
@@ -5,8 +5,12 @@ from pathlib import Path
 import pytest
 
 from now_and_here.datastore import DataStore
-from now_and_here.datastore.sqlite_store import UnstructuredSQLiteStore
-from now_and_here.datastore.sqlite_store.create import create_db
+from now_and_here.datastore.sqlite_store import (
+    SQLiteStore,
+    StructuredSQLiteStore,
+    UnstructuredSQLiteStore,
+)
+from now_and_here.datastore.sqlite_store.create import create_db, create_structured_db
 
 
 @pytest.fixture(scope="function")
@@ -26,5 +30,36 @@ def temp_unstructured_sqlite_store(
 
 
 @pytest.fixture(scope="function")
-def temp_store(temp_unstructured_sqlite_store: UnstructuredSQLiteStore) -> DataStore:
-    return temp_unstructured_sqlite_store
+def temp_structured_sqlite_store(monkeypatch, tmp_path: Path) -> StructuredSQLiteStore:
+    rand_str = "".join(random.choices(string.ascii_lowercase, k=10))
+    store_path = Path(tmp_path, f"store_{rand_str}.sqlite")
+    create_structured_db(store_path)
+    store = StructuredSQLiteStore(store_path)
+
+    def get_temp_store() -> StructuredSQLiteStore:
+        return store
+
+    monkeypatch.setattr("now_and_here.datastore.get_store", get_temp_store)
+    return store
+
+
+@pytest.fixture(
+    scope="function",
+    params=["temp_unstructured_sqlite_store", "temp_structured_sqlite_store"],
+)
+def temp_store(request) -> DataStore:
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture(scope="function")
+def embedded_docs(monkeypatch, temp_store: SQLiteStore) -> list[str]:
+    """Every document the store sends to the embedding model, in order."""
+    docs: list[str] = []
+    embed = temp_store.embedding_service.embed
+
+    def recording_embed(documents: list[str]):
+        docs.extend(documents)
+        return embed(documents)
+
+    monkeypatch.setattr(temp_store.embedding_service, "embed", recording_embed)
+    return docs
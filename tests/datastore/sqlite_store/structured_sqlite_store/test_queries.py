@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from zoneinfo import ZoneInfo
+
+from now_and_here.datastore import StructuredSQLiteStore
+from now_and_here.models import Project, Task
+from now_and_here.models.repeat_interval import try_parse
+
+utc = ZoneInfo("UTC")
+
+
+def test_save_and_get_projects(temp_structured_sqlite_store: StructuredSQLiteStore):
+    work = Project(name="Work", description="Stuff at work", parent=None)
+    team = Project(name="Team", description="Stuff for my team at work", parent=work)
+    team_proj = Project(name="Team Project", parent=team)
+    nonwork = Project(name="Non-Work", description="Stuff not at work", parent=None)
+
+    projects = [work, team, team_proj, nonwork]
+    for project in projects:
+        temp_structured_sqlite_store.save_project(project)
+
+    retrieved_projects = temp_structured_sqlite_store.get_projects()
+    # Projects come back sorted by name.
+    assert [p.name for p in retrieved_projects] == [
+        "Non-Work",
+        "Team",
+        "Team Project",
+        "Work",
+    ]
+    projects = sorted(projects, key=lambda p: p.id)
+    retrieved_projects = sorted(retrieved_projects, key=lambda p: p.id)
+    for project, retrieved_project in zip(projects, retrieved_projects):
+        assert project == retrieved_project
+    assert temp_structured_sqlite_store.get_project(team_proj.id) == team_proj
+    assert temp_structured_sqlite_store.get_project_by_name("Team") == team
+
+
+def test_save_and_get_tasks(temp_structured_sqlite_store: StructuredSQLiteStore):
+    work = Project(name="Work", parent=None)
+    team = Project(name="Team", parent=work)
+    other = Project(name="Other", parent=None)
+    for project in [work, team, other]:
+        temp_structured_sqlite_store.save_project(project)
+
+    work_task = Task(
+        name="Work Task",
+        description="Task at work",
+        project=work,
+        priority=1,
+        due=datetime(2024, 1, 2, 9, 0, 0, 123456, tzinfo=ZoneInfo("America/Chicago")),
+        repeat=try_parse("every day at 9am"),
+    )
+    team_task = Task(
+        name="Team Task",
+        project=team,
+        priority=3,
+        due=datetime(2024, 1, 1, 9, 0, 0, tzinfo=utc),
+    )
+    done_task = Task(name="Done Task", project=team, done=True)
+    other_task = Task(name="Other Task", project=other)
+    no_project_task = Task(name="Loose Task")
+    tasks = [work_task, team_task, done_task, other_task, no_project_task]
+    for task in tasks:
+        temp_structured_sqlite_store.save_task(task)
+
+    # Everything round-trips.
+    retrieved = temp_structured_sqlite_store.get_tasks(include_done=True)
+    assert sorted(retrieved, key=lambda t: t.id) == sorted(tasks, key=lambda t: t.id)
+    assert temp_structured_sqlite_store.get_task(work_task.id) == work_task
+
+    # Filtering on done and due dates.
+    open_tasks = temp_structured_sqlite_store.get_tasks(sort_by="due")
+    assert [t.id for t in open_tasks][:2] == [team_task.id, work_task.id]
+    assert done_task.id not in {t.id for t in open_tasks}
+    due_tasks = temp_structured_sqlite_store.get_tasks(
+        due_before=datetime(2024, 1, 1, 12, 0, 0, tzinfo=utc)
+    )
+    assert [t.id for t in due_tasks] == [team_task.id]
+
+    # Filtering on projects.
+    work_tasks = temp_structured_sqlite_store.get_tasks(project_id=work.id)
+    assert [t.id for t in work_tasks] == [work_task.id]
+    work_tree_tasks = temp_structured_sqlite_store.get_tasks(
+        project_id=work.id, include_child_projects=True, sort_by="priority", desc=True
+    )
+    assert [t.id for t in work_tree_tasks] == [team_task.id, work_task.id]
+    named_tasks = temp_structured_sqlite_store.get_tasks(project_name="team")
+    assert [t.id for t in named_tasks] == [team_task.id]
+
+    # Updating and deleting.
+    team_task.done = True
+    temp_structured_sqlite_store.update_task(team_task.id, team_task)
+    assert temp_structured_sqlite_store.get_task(team_task.id).done
+    assert temp_structured_sqlite_store.delete_task(other_task.id)
+    assert not temp_structured_sqlite_store.delete_task(other_task.id)
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from now_and_here.datastore.errors import RecordNotFoundError
+from now_and_here.datastore.sqlite_store import SQLiteStore
+from now_and_here.models import Task
+from now_and_here.models.repeat_interval import try_parse
+
+
+def count_commits(store: SQLiteStore) -> list[str]:
+    """Record the transactions the store commits from now on."""
+    commits: list[str] = []
+
+    def trace(statement: str) -> None:
+        if statement == "COMMIT":
+            commits.append(statement)
+
+    store.conn.set_trace_callback(trace)
+    return commits
+
+
+def test_save_and_update_tasks(temp_store: SQLiteStore, embedded_docs: list[str]):
+    tasks = [Task(name=f"Task {i}") for i in range(100)]
+    assert temp_store.save_tasks(tasks) == [task.id for task in tasks]
+    # All of them were embedded in one call.
+    assert len(embedded_docs) == 100
+    assert temp_store.get_tasks_by_ids([tasks[42].id])[0].name == "Task 42"
+
+    for task in tasks[:3]:
+        task.name += " (renamed)"
+    temp_store.update_tasks(tasks[:3])
+    assert [t.name for t in temp_store.get_tasks_by_ids([tasks[0].id])] == [
+        "Task 0 (renamed)"
+    ]
+    (result,) = temp_store.search_tasks("renamed", limit=1, mode="lexical")
+    assert result.id in {task.id for task in tasks[:3]}
+
+
+def test_update_tasks_is_all_or_nothing(temp_store: SQLiteStore):
+    task = Task(name="Exists")
+    temp_store.save_task(task)
+    task.name = "Renamed"
+    with pytest.raises(RecordNotFoundError):
+        temp_store.update_tasks([task, Task(name="Never saved")])
+    assert temp_store.get_task(task.id).name == "Exists"
+
+
+def test_delete_tasks(temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task {i}") for i in range(5)]
+    temp_store.save_tasks(tasks)
+    deleted = temp_store.delete_tasks([tasks[0].id, "missing", tasks[3].id])
+    assert deleted == [tasks[0].id, tasks[3].id]
+    remaining = temp_store.get_tasks_by_ids([task.id for task in tasks])
+    assert [task.id for task in remaining] == [tasks[i].id for i in (1, 2, 4)]
+    assert temp_store.search_tasks("Task 3", limit=5, mode="lexical")[0].id != (
+        tasks[3].id
+    )
+
+
+def test_checkoff_tasks(temp_store: SQLiteStore, embedded_docs: list[str]):
+    # Off the hour, so that no timezone puts it right on the repeat's 9:00 boundary.
+    due = datetime(2024, 1, 1, 8, 17, tzinfo=timezone.utc)
+    plain = Task(name="Plain task")
+    done = Task(name="Already done", done=True)
+    repeating = Task(name="Repeating", due=due, repeat=try_parse("every day"))
+    temp_store.save_tasks([plain, done, repeating])
+    embedded = len(embedded_docs)
+
+    results = temp_store.checkoff_tasks([plain.id, done.id, repeating.id, "missing"])
+    assert results[plain.id] == (True, None)
+    assert results[done.id] == (False, None)
+    was_updated, next_due = results[repeating.id]
+    assert was_updated and next_due is not None and next_due > due
+    assert "missing" not in results
+    # Checking off doesn't change any task's text, and the next occurrence reuses
+    # its predecessor's embedding.
+    assert len(embedded_docs) == embedded
+
+    open_tasks = temp_store.get_tasks()
+    assert [(t.name, t.due) for t in open_tasks] == [("Repeating", next_due)]
+    assert temp_store.get_task(repeating.id).repeat is None
+    with pytest.raises(RecordNotFoundError):
+        temp_store.checkoff_task("missing")
+
+
+def test_merge_tasks(monkeypatch, temp_store: SQLiteStore):
+    task = Task(name="Renew passport")
+    duplicate = Task(name="Renew passport", description="Before the trip", priority=2)
+    temp_store.save_tasks([task, duplicate])
+
+    delete_task_rows = temp_store._delete_task_rows
+
+    def failing_delete_task_rows(conn, vectors, ids):
+        delete_task_rows(conn, vectors, ids)
+        raise RuntimeError("Disk on fire")
+
+    monkeypatch.setattr(temp_store, "_delete_task_rows", failing_delete_task_rows)
+    with pytest.raises(RuntimeError):
+        temp_store.merge_tasks(task, [duplicate])
+    # Neither half of the merge happened.
+    assert temp_store.get_task(task.id).description is None
+    assert len(temp_store.get_tasks_by_ids([duplicate.id])) == 1
+
+    monkeypatch.undo()
+    merged = temp_store.merge_tasks(task, [duplicate])
+    assert temp_store.get_task(task.id) == merged
+    assert (merged.description, merged.priority) == ("Before the trip", 2)
+    assert temp_store.get_tasks_by_ids([duplicate.id]) == []
+    with pytest.raises(RecordNotFoundError):
+        temp_store.merge_tasks(duplicate, [task])
+    assert len(temp_store.get_tasks_by_ids([task.id])) == 1
+
+
+def test_batches_commit_once(temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task {i}") for i in range(50)]
+    temp_store.save_tasks(tasks)
+    commits = count_commits(temp_store)
+    temp_store.checkoff_tasks([task.id for task in tasks])
+    temp_store.delete_tasks([task.id for task in tasks])
+    assert len(commits) == 2
@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from now_and_here.datastore.sqlite_store import SQLiteStore
+from now_and_here.datastore.sqlite_store.connection_pool import StorageProfile
+from now_and_here.models import Task
+
+
+def hold_write_lock(store: SQLiteStore, seconds: float) -> None:
+    """Lock the store from another connection; returns once the lock is held."""
+    locked = threading.Event()
+
+    def run():
+        conn = sqlite3.connect(store.path)
+        conn.execute("BEGIN IMMEDIATE")
+        locked.set()
+        time.sleep(seconds)
+        conn.rollback()
+        conn.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    locked.wait()
+
+
+def reopen(store: SQLiteStore, **profile) -> SQLiteStore:
+    store.close()
+    return type(store)(store.path, storage=StorageProfile(busy_timeout=0.01, **profile))
+
+
+def test_write_retries_while_locked(temp_store: SQLiteStore):
+    store = reopen(temp_store, busy_retries=20, retry_delay=0.02)
+    hold_write_lock(store, 0.2)
+    task = Task(name="Written eventually")
+    store.save_task(task)
+    assert store.get_task(task.id).name == "Written eventually"
+    store.close()
+
+
+def test_write_gives_up_after_retries(temp_store: SQLiteStore):
+    store = reopen(temp_store, busy_retries=1, retry_delay=0.01)
+    hold_write_lock(store, 0.5)
+    task = Task(name="Never written")
+    with pytest.raises(sqlite3.OperationalError):
+        store.save_task(task)
+    time.sleep(0.5)
+    # Nothing was left half-written, so the same write works once the lock is gone.
+    store.save_task(task)
+    assert store.get_task(task.id).name == "Never written"
+    store.close()
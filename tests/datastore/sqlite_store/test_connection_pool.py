@@ -0,0 +1,60 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from now_and_here.datastore.sqlite_store.connection_pool import (
+    ConnectionPool,
+    StorageProfile,
+)
+
+
+def test_one_connection_per_thread(tmp_path: Path):
+    connects: list[sqlite3.Connection] = []
+    pool = ConnectionPool(Path(tmp_path, "pool.sqlite"), on_connect=connects.append)
+
+    # The same thread always gets the same connection.
+    main_conn = pool.connection()
+    assert pool.connection() is main_conn
+
+    # Other threads get their own.
+    other_conns = []
+    thread = threading.Thread(target=lambda: other_conns.append(pool.connection()))
+    thread.start()
+    thread.join()
+    assert other_conns[0] is not main_conn
+    # Setup ran once per connection, not once per call.
+    assert connects == [main_conn, other_conns[0]]
+
+
+def test_close(tmp_path: Path):
+    pool = ConnectionPool(Path(tmp_path, "pool.sqlite"))
+    conn = pool.connection()
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    # The pool can still be used afterwards; it just opens a new connection.
+    new_conn = pool.connection()
+    assert new_conn is not conn
+    assert new_conn.execute("SELECT 1").fetchone() == (1,)
+
+
+def test_storage_profile(tmp_path: Path):
+    profile = StorageProfile(synchronous="full", mmap_size_mb=16, busy_timeout=2)
+    pool = ConnectionPool(Path(tmp_path, "pool.sqlite"), storage=profile)
+    conn = pool.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    # 2 is FULL.
+    assert conn.execute("PRAGMA synchronous").fetchone() == (2,)
+    assert conn.execute("PRAGMA mmap_size").fetchone() == (16 * 1024 * 1024,)
+    assert conn.execute("PRAGMA cache_size").fetchone() == (-64 * 1024,)
+    assert conn.execute("PRAGMA busy_timeout").fetchone() == (2000,)
+    pool.close()
+
+    # The journal mode sticks to the file; switching back is just another profile.
+    pool = ConnectionPool(
+        Path(tmp_path, "pool.sqlite"), storage=StorageProfile(journal_mode="delete")
+    )
+    assert pool.connection().execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    pool.close()
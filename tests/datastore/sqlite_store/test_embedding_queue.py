@@ -0,0 +1,96 @@
+from now_and_here.datastore.sqlite_store import SQLiteStore
+from now_and_here.models import Task
+
+
+def test_background_writes_queue_embeddings(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    temp_store.background_embeddings = True
+    task = Task(name="Call the plumber")
+    temp_store.save_task(task)
+    # The write returned without touching the model...
+    assert embedded_docs == []
+    assert temp_store.pending_embeddings() == 1
+    # ...but the task can still be found while it waits.
+    assert [t.id for t in temp_store.search_tasks("plumber")] == [task.id]
+
+    assert temp_store.process_embedding_queue() == 1
+    assert embedded_docs[-1] == "Call the plumber"
+    assert temp_store.pending_embeddings() == 0
+
+
+def test_semantic_search_finds_queued_tasks(temp_store: SQLiteStore):
+    temp_store.background_embeddings = True
+    plumber = Task(name="Call the plumber", description="About the leaky sink")
+    done = Task(name="Call the plumber back", done=True)
+    others = [Task(name=f"Call the plumber {i}") for i in range(5)]
+    temp_store.save_tasks([plumber, done, *others, Task(name="Plumber, call")])
+
+    results = temp_store.search_tasks("leaky sink", mode="semantic")
+    assert [t.id for t in results] == [plumber.id]
+    # Words have to appear in order, but searches are narrowed down and limited as
+    # usual.
+    results = temp_store.search_tasks(
+        "call the plumber", limit=3, include_done=False, mode="semantic"
+    )
+    assert len(results) == 3
+    assert done.id not in {t.id for t in results}
+    assert temp_store.search_tasks("plumber call", mode="semantic") != []
+    assert temp_store.search_tasks("sink leaky", mode="semantic") == []
+
+
+def test_queued_tasks_dont_outrank_semantic_matches(temp_store: SQLiteStore):
+    embedded = Task(name="Water the plants")
+    temp_store.save_task(embedded)
+    temp_store.background_embeddings = True
+    queued = [
+        Task(name=f"Find out when to water the plants in room {i}") for i in range(3)
+    ]
+    temp_store.save_tasks(queued)
+
+    results = temp_store.search_tasks("water the plants", limit=3, mode="semantic")
+    assert results[0].id == embedded.id
+    assert len(results) == 3
+    assert {t.id for t in results[1:]} <= {t.id for t in queued}
+
+
+def test_repeated_writes_are_queued_once(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    temp_store.background_embeddings = True
+    task = Task(name="Draft")
+    temp_store.save_task(task)
+    for name in ("Second draft", "Final draft"):
+        task.name = name
+        temp_store.update_task(task.id, task)
+    assert temp_store.pending_embeddings() == 1
+
+    temp_store.process_embedding_queue()
+    assert embedded_docs == ["Final draft"]
+
+
+def test_queue_survives_reopening_the_store(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    temp_store.background_embeddings = True
+    temp_store.save_task(Task(name="Renew passport"))
+    temp_store.close()
+
+    reopened = type(temp_store)(temp_store.path)
+    assert reopened.pending_embeddings() == 1
+    reopened.process_embedding_queue()
+    assert reopened.pending_embeddings() == 0
+    reopened.close()
+
+
+def test_embedding_worker_drains_queue(temp_store: SQLiteStore):
+    temp_store.background_embeddings = True
+    temp_store._embedding_worker.batch_delay = 0
+    temp_store.start_embedding_worker()
+    temp_store.save_task(Task(name="Book flights"))
+    for _ in range(100):
+        if temp_store.pending_embeddings() == 0:
+            break
+        temp_store._embedding_worker._stop.wait(0.05)
+    assert temp_store.pending_embeddings() == 0
+    temp_store.close()
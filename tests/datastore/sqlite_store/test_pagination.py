@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from now_and_here.datastore.errors import InvalidPageTokenError, InvalidSortError
+from now_and_here.datastore.sqlite_store import SQLiteStore, sqlite_store
+from now_and_here.models import Project, Task
+
+
+@pytest.fixture
+def project_tasks(temp_store: SQLiteStore) -> tuple[Project, list[Task]]:
+    project = Project(name="Paged")
+    temp_store.save_project(project)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tasks = [
+        Task(
+            name=f"Task {i}",
+            project=project,
+            priority=i % 3,
+            # Every fourth task has no due date; the rest share dates in pairs.
+            due=None if i % 4 == 0 else start + timedelta(days=i // 2),
+        )
+        for i in range(23)
+    ]
+    temp_store.save_tasks(tasks)
+    temp_store.save_task(Task(name="Elsewhere"))
+    return project, tasks
+
+
+def all_pages(store: SQLiteStore, limit: int, **kwargs) -> list[list[Task]]:
+    pages = []
+    page_token = None
+    while True:
+        page = store.get_tasks_page(limit=limit, page_token=page_token, **kwargs)
+        pages.append(page.tasks)
+        if page.next_page_token is None:
+            return pages
+        page_token = page.next_page_token
+
+
+@pytest.mark.parametrize("sort_by", ["due", "priority", None])
+@pytest.mark.parametrize("desc", [False, True])
+def test_pages_cover_every_task_in_order(
+    temp_store: SQLiteStore,
+    project_tasks: tuple[Project, list[Task]],
+    sort_by: str | None,
+    desc: bool,
+):
+    project, tasks = project_tasks
+    pages = all_pages(
+        temp_store, limit=5, project_id=project.id, sort_by=sort_by, desc=desc
+    )
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    paged = [task for page in pages for task in page]
+    assert sorted(task.id for task in paged) == sorted(task.id for task in tasks)
+    if sort_by is None:
+        assert [task.id for task in paged] == sorted(task.id for task in tasks)
+        return
+
+    # Sorted as get_tasks sorts them, with ties broken by ID.
+    listed = temp_store.get_tasks(project_id=project.id, sort_by=sort_by, desc=desc)
+    values = [getattr(task, sort_by) for task in paged]
+    assert values == [getattr(task, sort_by) for task in listed]
+    for before, after in zip(paged, paged[1:]):
+        if getattr(before, sort_by) == getattr(after, sort_by):
+            assert before.id < after.id
+    if sort_by == "due":
+        assert values[-6:] == [None] * 6
+
+
+def test_pages_continue_past_changes(
+    temp_store: SQLiteStore, project_tasks: tuple[Project, list[Task]]
+):
+    project, tasks = project_tasks
+    first = temp_store.get_tasks_page(project_id=project.id, sort_by="due", limit=10)
+    # Deleting a task already seen doesn't make the next page skip one.
+    temp_store.delete_task(first.tasks[0].id)
+    rest = all_pages(
+        temp_store,
+        limit=100,
+        project_id=project.id,
+        sort_by="due",
+    )
+    second = temp_store.get_tasks_page(
+        project_id=project.id,
+        sort_by="due",
+        limit=100,
+        page_token=first.next_page_token,
+    )
+    assert [task.id for task in second.tasks] == [task.id for task in rest[0][9:]]
+    assert second.next_page_token is None
+
+
+def test_bad_page_tokens(
+    temp_store: SQLiteStore, project_tasks: tuple[Project, list[Task]]
+):
+    project, _ = project_tasks
+    page = temp_store.get_tasks_page(project_id=project.id, sort_by="due", limit=5)
+    assert page.next_page_token is not None
+    with pytest.raises(InvalidPageTokenError):
+        temp_store.get_tasks_page(
+            project_id=project.id, sort_by="priority", page_token=page.next_page_token
+        )
+    with pytest.raises(InvalidPageTokenError):
+        temp_store.get_tasks_page(project_id=project.id, page_token="not a token!")
+    with pytest.raises(InvalidSortError):
+        temp_store.get_tasks_page(project_id=project.id, sort_by="name")
+
+
+def test_iter_tasks_reads_in_batches(
+    monkeypatch,
+    temp_store: SQLiteStore,
+    project_tasks: tuple[Project, list[Task]],
+):
+    project, _ = project_tasks
+    monkeypatch.setattr(sqlite_store, "ITER_BATCH_SIZE", 4)
+    batches: list[int] = []
+    tasks_from_rows = temp_store._tasks_from_rows
+
+    def recording_tasks_from_rows(rows, projects=None):
+        batches.append(len(rows))
+        return tasks_from_rows(rows, projects)
+
+    monkeypatch.setattr(temp_store, "_tasks_from_rows", recording_tasks_from_rows)
+
+    # Bad arguments raise straight away, not on the first next().
+    with pytest.raises(InvalidSortError):
+        temp_store.iter_tasks(sort_by="name")
+
+    tasks = temp_store.iter_tasks(project_id=project.id, sort_by="due")
+    assert batches == []
+    first = next(tasks)
+    assert batches == [4]
+    listed = temp_store.get_tasks(project_id=project.id, sort_by="due")
+    batches.clear()
+    assert [first, *tasks] == listed
+    # The first batch was read already; 23 tasks in all.
+    assert batches == [4] * 4 + [3]
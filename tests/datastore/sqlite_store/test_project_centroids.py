@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from now_and_here.datastore.sqlite_store import SQLiteStore
+from now_and_here.models import Project, Task
+from now_and_here.models.repeat_interval import try_parse
+
+
+def centroids(store: SQLiteStore) -> dict[str, tuple[np.ndarray, int]]:
+    with store.conn as conn:
+        cursor = conn.execute(
+            "SELECT project_id, vector_sum, task_count FROM project_centroids"
+        )
+        return {
+            id: (np.frombuffer(total, dtype=np.float32), count)
+            for id, total, count in cursor.fetchall()
+        }
+
+
+def test_suggest_project(temp_store: SQLiteStore):
+    work = Project(name="Work")
+    home = Project(name="Home")
+    for project in [work, home]:
+        temp_store.save_project(project)
+    for name in ["Write the quarterly report", "Review the quarterly budget"]:
+        temp_store.save_task(Task(name=name, project=work))
+    for name in ["Water the plants", "Mow the lawn"]:
+        temp_store.save_task(Task(name=name, project=home))
+    temp_store.save_task(Task(name="Send the quarterly report"))
+
+    temp_store.project_suggestion_threshold = 0.5
+    suggestion = temp_store.suggest_project(Task(name="Quarterly report draft"))
+    assert suggestion == work
+    suggestion = temp_store.suggest_project(Task(name="Water the lawn"))
+    assert suggestion == home
+    # Tasks like no project's aren't given one.
+    temp_store.project_suggestion_threshold = 0.99
+    assert temp_store.suggest_project(Task(name="Water the lawn")) is None
+
+
+def test_suggest_project_without_centroids(temp_store: SQLiteStore):
+    temp_store.save_project(Project(name="Work"))
+    temp_store.save_task(Task(name="No project"))
+    assert temp_store.suggest_project(Task(name="Anything")) is None
+
+
+def test_centroids_match_rebuild(temp_store: SQLiteStore):
+    work = Project(name="Work")
+    home = Project(name="Home")
+    for project in [work, home]:
+        temp_store.save_project(project)
+    tasks = [Task(name=f"Task {i}", project=work) for i in range(4)]
+    repeating = Task(
+        name="Take out the trash",
+        project=home,
+        due=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        repeat=try_parse("every week"),
+    )
+    for task in [*tasks, repeating]:
+        temp_store.save_task(task)
+
+    # Move a task, rename a task, rename and move a task, delete a task, and check off a
+    # repeating task (which copies its embedding to the next occurrence).
+    tasks[0].project = home
+    temp_store.update_task(tasks[0].id, tasks[0])
+    tasks[1].name = "Renamed"
+    temp_store.update_task(tasks[1].id, tasks[1])
+    tasks[2].name = "Renamed and moved"
+    tasks[2].project = None
+    temp_store.update_task(tasks[2].id, tasks[2])
+    temp_store.delete_task(tasks[3].id)
+    temp_store.checkoff_task(repeating.id)
+
+    incremental = centroids(temp_store)
+    assert {id: count for id, (_, count) in incremental.items()} == {
+        work.id: 1,
+        home.id: 3,
+    }
+    with temp_store.conn as conn:
+        conn.execute("DROP TABLE project_centroids")
+    temp_store.close()
+    reopened = type(temp_store)(temp_store.path)
+    rebuilt = centroids(reopened)
+    reopened.close()
+    assert incremental.keys() == rebuilt.keys()
+    for id, (total, count) in rebuilt.items():
+        assert incremental[id][1] == count
+        np.testing.assert_allclose(incremental[id][0], total, atol=1e-5)
@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from now_and_here.datastore import UnstructuredSQLiteStore
+from now_and_here.datastore.sqlite_store import SQLiteStore, sqlite_store
+from now_and_here.models import Project, Task
+
+
+def closure_rows(store: SQLiteStore) -> set[tuple[str, str, int]]:
+    cursor = store.conn.execute(
+        "SELECT ancestor_id, descendant_id, depth FROM project_closure"
+    )
+    return set(cursor.fetchall())
+
+
+def test_move_project_subtree(temp_store: SQLiteStore):
+    work = Project(name="Work")
+    home = Project(name="Home")
+    team = Project(name="Team", parent=work)
+    team_proj = Project(name="Team Project", parent=team)
+    for project in [work, home, team, team_proj]:
+        temp_store.save_project(project)
+    task = Task(name="Task", project=team_proj)
+    temp_store.save_task(task)
+
+    assert (work.id, team_proj.id, 2) in closure_rows(temp_store)
+    work_tasks = temp_store.get_tasks(project_id=work.id, include_child_projects=True)
+    assert [t.id for t in work_tasks] == [task.id]
+
+    # Moving "Team" under "Home" takes "Team Project" (and its task) with it.
+    team.parent = home
+    temp_store.update_project(team.id, team)
+    assert closure_rows(temp_store) == {
+        (work.id, work.id, 0),
+        (home.id, home.id, 0),
+        (team.id, team.id, 0),
+        (team_proj.id, team_proj.id, 0),
+        (home.id, team.id, 1),
+        (team.id, team_proj.id, 1),
+        (home.id, team_proj.id, 2),
+    }
+    assert temp_store.get_tasks(project_id=work.id, include_child_projects=True) == []
+    home_tasks = temp_store.get_tasks(project_id=home.id, include_child_projects=True)
+    assert [t.id for t in home_tasks] == [task.id]
+    # Parents are hydrated all the way up.
+    task_project = temp_store.get_task(task.id).project
+    assert task_project is not None and task_project.parent is not None
+    assert task_project.parent.parent == home
+
+    # A project can't be moved beneath itself.
+    home.parent = team_proj
+    with pytest.raises(ValueError):
+        temp_store.update_project(home.id, home)
+    assert temp_store.get_project(home.id).parent is None
+
+
+def test_closure_rebuilt_for_old_stores(
+    temp_unstructured_sqlite_store: UnstructuredSQLiteStore,
+):
+    work = Project(name="Work")
+    team = Project(name="Team", parent=work)
+    for project in [work, team]:
+        temp_unstructured_sqlite_store.save_project(project)
+    expected = closure_rows(temp_unstructured_sqlite_store)
+
+    # Simulate a store from before the closure table existed.
+    path = temp_unstructured_sqlite_store.path
+    temp_unstructured_sqlite_store.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("DROP TABLE project_closure")
+    store = UnstructuredSQLiteStore(path)
+    assert closure_rows(store) == expected
+    assert store.get_project(team.id) == team
+
+
+def test_projects_fetched_in_chunks(monkeypatch, temp_store: SQLiteStore):
+    monkeypatch.setattr(sqlite_store, "MAX_BIND_VARS", 2)
+    root = Project(name="Root")
+    temp_store.save_project(root)
+    children = [Project(name=f"Child {i}", parent=root) for i in range(5)]
+    for child in children:
+        temp_store.save_project(child)
+    temp_store.save_tasks([Task(name=child.name, project=child) for child in children])
+
+    lookup_sizes: list[int] = []
+
+    class RecordingQuery(str):
+        def format(self, *args, **kwargs) -> str:
+            lookup_sizes.append(kwargs["bind_vars"].count("?"))
+            return super().format(*args, **kwargs)
+
+    query = RecordingQuery(sqlite_store.PROJECT_ANCESTORS_QUERY)
+    monkeypatch.setattr(sqlite_store, "PROJECT_ANCESTORS_QUERY", query)
+    tasks = temp_store.get_tasks(project_id=root.id, include_child_projects=True)
+    assert sum(lookup_sizes) >= 5 and max(lookup_sizes) <= 2
+    assert sorted(t.project.name for t in tasks if t.project) == [
+        child.name for child in children
+    ]
+    # Every chunk fetched the root, but it's still built just once.
+    parents = {id(t.project.parent) for t in tasks if t.project}
+    assert len(parents) == 1
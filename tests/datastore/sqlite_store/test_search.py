@@ -0,0 +1,216 @@
+import pytest
+
+from now_and_here.datastore.errors import RecordNotFoundError
+from now_and_here.datastore.sqlite_store import SQLiteStore, sqlite_store
+from now_and_here.models import Project, Task
+
+
+def test_get_tasks_by_ids_keeps_order(temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task {i}") for i in range(3)]
+    for task in tasks:
+        temp_store.save_task(task)
+    ids = [tasks[2].id, "missing", tasks[0].id]
+    assert [t.id for t in temp_store.get_tasks_by_ids(ids)] == [
+        tasks[2].id,
+        tasks[0].id,
+    ]
+
+
+def test_search_ranks_nearest_first(temp_store: SQLiteStore):
+    names = ["Buy groceries", "Call the plumber", "Plan the plumbing repair"]
+    for name in names:
+        temp_store.save_task(Task(name=name))
+    results = temp_store.search_tasks("call plumber", limit=2)
+    assert [t.name for t in results] == ["Call the plumber", "Plan the plumbing repair"]
+
+
+def test_search_finds_ids_with_leading_a(temp_store: SQLiteStore):
+    task = Task(id="aabcde", name="Call the plumber")
+    temp_store.save_task(task)
+    (result,) = temp_store.search_tasks("plumber", limit=1)
+    assert result.id == "aabcde"
+
+
+def test_search_empty_store(temp_store: SQLiteStore):
+    assert temp_store.search_tasks("anything") == []
+
+
+def test_vectors_from_older_stores_are_still_found(temp_store: SQLiteStore):
+    task = Task(id="aabcde", name="Call the plumber")
+    temp_store.save_task(task)
+    # Stores from before task_embeddings existed only have the vectors themselves.
+    with temp_store.conn as conn:
+        conn.execute("DROP TABLE task_embeddings")
+    temp_store.close()
+
+    reopened = type(temp_store)(temp_store.path)
+    (result,) = reopened.search_tasks("plumber", limit=1)
+    assert result.id == "aabcde"
+    reopened.close()
+
+
+@pytest.mark.parametrize("prefilter_max", [2000, 0])
+def test_filtered_search(monkeypatch, temp_store: SQLiteStore, prefilter_max: int):
+    # Covers both comparing against each matching task and over-fetching from the
+    # whole index.
+    monkeypatch.setattr(sqlite_store, "PREFILTER_MAX_CANDIDATES", prefilter_max)
+    work = Project(name="Work")
+    team = Project(name="Team", parent=work)
+    for project in [work, team]:
+        temp_store.save_project(project)
+    home_tasks = [Task(name=f"Fix the plumbing {i}") for i in range(20)]
+    work_task = Task(name="Fix the build", project=work)
+    team_task = Task(name="Fix the flaky test", project=team)
+    done_task = Task(name="Fix the deploy", project=work, done=True)
+    for task in [*home_tasks, work_task, team_task, done_task]:
+        temp_store.save_task(task)
+
+    results = temp_store.search_tasks("fix", limit=5, project_id=work.id)
+    assert {t.id for t in results} == {work_task.id, done_task.id}
+    results = temp_store.search_tasks(
+        "fix", limit=5, project_id=work.id, include_child_projects=True
+    )
+    assert {t.id for t in results} == {work_task.id, team_task.id, done_task.id}
+    results = temp_store.search_tasks(
+        "fix",
+        limit=5,
+        project_id=work.id,
+        include_child_projects=True,
+        include_done=False,
+    )
+    assert {t.id for t in results} == {work_task.id, team_task.id}
+    # Unfiltered searches still fill the limit.
+    assert len(temp_store.search_tasks("fix", limit=5)) == 5
+
+
+def test_search_with_numpy_index(temp_store: SQLiteStore):
+    temp_store.save_task(Task(name="Call the plumber"))
+    temp_store.close()
+
+    # Switching the index re-queues every task to be embedded into the new one.
+    store = type(temp_store)(temp_store.path, vector_index="numpy")
+    assert store.pending_embeddings() == 1
+    store.process_embedding_queue()
+    task = Task(name="Buy groceries")
+    store.save_task(task)
+    (result,) = store.search_tasks("groceries", limit=1)
+    assert result.id == task.id
+    store.close()
+
+
+def test_search_with_quantized_vectors(temp_store: SQLiteStore):
+    temp_store.save_task(Task(name="Call the plumber"))
+    temp_store.close()
+    with pytest.raises(ValueError):
+        type(temp_store)(temp_store.path, quantize_vectors=True)
+
+    store = type(temp_store)(
+        temp_store.path, vector_index="numpy", quantize_vectors=True
+    )
+    assert store.pending_embeddings() == 1
+    store.process_embedding_queue()
+    task = Task(name="Buy groceries")
+    store.save_task(task)
+    (result,) = store.search_tasks("groceries", limit=1)
+    assert result.id == task.id
+    store.close()
+
+
+def test_related_tasks_use_stored_vectors(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    work = Project(name="Work")
+    temp_store.save_project(work)
+    task = Task(name="Fix the kitchen sink")
+    similar = Task(name="Fix the bathroom sink")
+    at_work = Task(name="Fix the sink at the office", project=work)
+    other = Task(name="Buy birthday present")
+    for t in [task, similar, at_work, other]:
+        temp_store.save_task(t)
+    embedded_docs.clear()
+
+    related = temp_store.related_tasks(task.id, limit=2)
+    assert {t.id for t in related} == {similar.id, at_work.id}
+    related = temp_store.related_tasks(task.id, project_id=work.id)
+    assert [t.id for t in related] == [at_work.id]
+    assert embedded_docs == []
+
+    with pytest.raises(RecordNotFoundError):
+        temp_store.related_tasks("zzzzzz")
+
+
+def test_lexical_search_needs_no_model(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    ticket = Task(name="Follow up on OPS-1234", description="Escalate if no reply")
+    temp_store.save_task(ticket)
+    temp_store.save_task(Task(name="Follow up on OPS-1235"))
+    temp_store.save_task(Task(name="Reply to the landlord"))
+    embedded_docs.clear()
+
+    results = temp_store.search_tasks("ops-1234", mode="lexical")
+    assert [t.id for t in results] == [ticket.id]
+    results = temp_store.search_tasks("reply", mode="lexical")
+    assert len(results) == 2
+    assert temp_store.search_tasks("!!!", mode="lexical") == []
+    assert embedded_docs == []
+
+
+def test_lexical_index_follows_writes(temp_store: SQLiteStore):
+    task = Task(name="Renew passport")
+    temp_store.save_task(task)
+    task.name = "Renew driving licence"
+    temp_store.update_task(task.id, task)
+    assert temp_store.search_tasks("passport", mode="lexical") == []
+    assert [t.id for t in temp_store.search_tasks("licence", mode="lexical")] == [
+        task.id
+    ]
+    temp_store.delete_task(task.id)
+    assert temp_store.search_tasks("licence", mode="lexical") == []
+
+
+def test_hybrid_search_finds_identifiers(temp_store: SQLiteStore):
+    ticket = Task(name="Deploy fix for INC-4821")
+    temp_store.save_task(ticket)
+    for i in range(10):
+        temp_store.save_task(Task(name=f"Deploy fix for the release {i}"))
+    results = temp_store.search_tasks("INC-4821", limit=3)
+    assert results[0].id == ticket.id
+    with pytest.raises(ValueError):
+        temp_store.search_tasks("INC-4821", mode="fuzzy")  # type: ignore [arg-type]
+
+
+def test_lexical_index_built_for_older_stores(temp_store: SQLiteStore):
+    task = Task(name="Call the plumber")
+    temp_store.save_task(task)
+    with temp_store.conn as conn:
+        conn.execute("DROP TABLE task_search")
+    temp_store.close()
+
+    reopened = type(temp_store)(temp_store.path)
+    (result,) = reopened.search_tasks("plumber", mode="lexical")
+    assert result.id == task.id
+    reopened.close()
+
+
+def test_typeahead(temp_store: SQLiteStore, embedded_docs: list[str]):
+    report = Task(name="Write the quarterly report")
+    bug = Task(name="Report bug OPS-12")
+    plants = Task(name="Water plants")
+    done = Task(name="Report expenses", done=True)
+    for task in [report, bug, plants, done]:
+        temp_store.save_task(task)
+    embedded_docs.clear()
+
+    # Names starting with the text come first.
+    results = temp_store.typeahead_tasks("repo")
+    assert [t.id for t in results] == [bug.id, report.id]
+    results = temp_store.typeahead_tasks("e qua")
+    assert [t.id for t in results] == [report.id]
+    # Short text matches the starts of words.
+    assert [t.id for t in temp_store.typeahead_tasks("wa")] == [plants.id]
+    assert temp_store.typeahead_tasks("at") == []
+    assert temp_store.typeahead_tasks('"') == []
+    results = temp_store.typeahead_tasks("repo", include_done=True, limit=5)
+    assert {t.id for t in results} == {report.id, bug.id, done.id}
+    assert embedded_docs == []
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+
+from rich.console import Console
+
+from now_and_here.datastore.sqlite_store import SQLiteStore, sqlite_store
+from now_and_here.models import Label, Project, Task
+from now_and_here.models.repeat_interval import try_parse
+
+
+def test_tasks_read_back_as_saved(temp_store: SQLiteStore):
+    parent_project = Project(name="Parent")
+    project = Project(name="Child", parent=parent_project)
+    temp_store.save_project(parent_project)
+    temp_store.save_project(project)
+    parent = Task(name="Parent task", project=project)
+    temp_store.save_task(parent)
+    task = Task(
+        name="Full task",
+        description="Every field set",
+        project=project,
+        parent=parent,
+        labels=[Label(name="errand"), Label(name="outside")],
+        priority=2,
+        due=datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc),
+        repeat=try_parse("every week"),
+    )
+    temp_store.save_task(task)
+
+    (read,) = temp_store.get_tasks_by_ids([task.id])
+    assert read.model_dump() == task.model_dump()
+    assert read.project is not None and read.project.parent is not None
+    assert read.project.parent.name == "Parent"
+    assert read.parent is not None and read.parent.name == "Parent task"
+    assert read.due == task.due
+
+
+def test_tasks_share_projects(monkeypatch, temp_store: SQLiteStore):
+    monkeypatch.setattr(sqlite_store, "ITER_BATCH_SIZE", 3)
+    projects = [Project(name="One"), Project(name="Two")]
+    for project in projects:
+        temp_store.save_project(project)
+    temp_store.save_tasks(
+        [Task(name=f"Task {i}", project=projects[i % 2]) for i in range(10)]
+    )
+
+    # Across batches, too.
+    tasks = list(temp_store.iter_tasks())
+    assert len(tasks) == 10
+    assert len({id(task.project) for task in tasks}) == 2
+
+
+def test_task_rows_match_tasks(temp_store: SQLiteStore):
+    project = Project(name="Rows")
+    temp_store.save_project(project)
+    parent = Task(name="Also in the project", project=project, priority=1)
+    temp_store.save_tasks(
+        [
+            parent,
+            Task(
+                name="Weekly",
+                description="Details",
+                project=project,
+                parent=parent,
+                labels=[Label(name="errand")],
+                priority=3,
+                due=datetime(2024, 5, 1, 9, 30, tzinfo=timezone.utc),
+                repeat=try_parse("every week"),
+            ),
+            Task(name="Bare"),
+        ]
+    )
+
+    tasks = temp_store.get_tasks(sort_by="priority", desc=True)
+    rows = temp_store.get_task_rows(sort_by="priority", desc=True)
+    assert [row.id for row in rows] == [task.id for task in tasks]
+    for row, task in zip(rows, tasks):
+        for field in (
+            "name",
+            "description",
+            "done",
+            "priority",
+            "due",
+            "repeat",
+        ):
+            assert getattr(row, field) == getattr(task, field)
+        assert list(row.labels) == task.labels
+        assert row.parent_id == (task.parent.id if task.parent else None)
+        if task.project is None:
+            assert row.project is None
+        else:
+            assert row.project == (task.project.id, task.project.name)
+    assert rows[0].project is rows[1].project
+
+    assert rows[0].as_dict() == {
+        "id": tasks[0].id,
+        "name": "Weekly",
+        "description": "Details",
+        "done": False,
+        "priority": 3,
+        "due": "2024-05-01T09:30:00+00:00",
+        "repeat": tasks[0].model_dump(mode="json")["repeat"],
+        "project": {"id": project.id, "name": "Rows"},
+        "labels": tasks[0].model_dump(mode="json")["labels"],
+        "parent": {"id": parent.id},
+    }
+    # Rows render just like the tasks they summarize.
+    console = Console(width=200, record=True)
+    console.print(Task.as_rich_table(tasks))
+    console.print(Task.as_rich_table(rows))
+    tasks_table, rows_table = console.export_text().split("Tasks")[1:]
+    assert rows_table.strip() == tasks_table.strip()
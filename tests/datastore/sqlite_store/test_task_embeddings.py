@@ -0,0 +1,242 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from zoneinfo import ZoneInfo
+
+from now_and_here.datastore.sqlite_store import SQLiteStore
+from now_and_here.models import Task
+from now_and_here.models.repeat_interval import try_parse
+
+
+def test_unchanged_text_is_not_reembedded(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    task = Task(name="Write report", description="quarterly")
+    temp_store.save_task(task)
+    assert embedded_docs == ["Write report: quarterly"]
+
+    # Changes that don't touch the text don't need the model.
+    task.priority = 3
+    temp_store.update_task(task.id, task)
+    temp_store.checkoff_task(task.id)
+    temp_store.uncheckoff_task(task.id)
+    assert embedded_docs == ["Write report: quarterly"]
+
+    # But changes to the name or description do.
+    task.description = "annual"
+    temp_store.update_task(task.id, task)
+    assert embedded_docs == ["Write report: quarterly", "Write report: annual"]
+
+    # Regenerating embeddings always re-embeds everything.
+    temp_store.regen_embeddings()
+    assert embedded_docs[-1] == "Write report: annual"
+    assert len(embedded_docs) == 3
+
+
+def stored_vector(store: SQLiteStore, task_id: str) -> bytes:
+    cursor = store.conn.execute(
+        "SELECT v.a FROM task_embeddings e "
+        "JOIN vss_tasks v ON v.rowid = e.vector_rowid WHERE e.task_id = (?)",
+        (task_id,),
+    )
+    (vector,) = cursor.fetchone()
+    return vector
+
+
+def test_repeating_checkoff_reuses_embedding(
+    temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    task = Task(
+        name="Water plants",
+        due=datetime(2024, 1, 1, 9, 0, tzinfo=ZoneInfo("UTC")),
+        repeat=try_parse("every day at 9am"),
+    )
+    temp_store.save_task(task)
+    assert embedded_docs == ["Water plants"]
+    original_vector = stored_vector(temp_store, task.id)
+
+    _, next_due = temp_store.checkoff_task(task.id)
+    # The checkoff didn't need the model at all...
+    assert embedded_docs == ["Water plants"]
+    # ...but the new occurrence is still searchable, with the same vector.
+    (next_task,) = temp_store.get_tasks()
+    assert next_task.id != task.id and next_task.due == next_due
+    assert stored_vector(temp_store, next_task.id) == original_vector
+    assert stored_vector(temp_store, task.id) == original_vector
+
+
+def test_regen_embeddings_resumes_after_interruption(
+    monkeypatch, temp_store: SQLiteStore, embedded_docs: list[str]
+):
+    tasks = [Task(name=f"Task {i}") for i in range(5)]
+    for task in tasks:
+        temp_store.save_task(task)
+    # Done tasks are rebuilt too.
+    temp_store.checkoff_task(tasks[0].id)
+    embedded_docs.clear()
+
+    embed = temp_store.embedding_service.embed
+    calls = 0
+
+    def failing_embed(documents: list[str]):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("interrupted")
+        return embed(documents)
+
+    monkeypatch.setattr(temp_store.embedding_service, "embed", failing_embed)
+    seen: list[tuple[int, int]] = []
+    with pytest.raises(RuntimeError):
+        temp_store.regen_embeddings(
+            progress=lambda done, total: seen.append((done, total)), batch_size=2
+        )
+    assert seen == [(0, 5), (2, 5)]
+    assert len(embedded_docs) == 2
+
+    monkeypatch.setattr(temp_store.embedding_service, "embed", embed)
+    seen.clear()
+    temp_store.regen_embeddings(
+        progress=lambda done, total: seen.append((done, total)), batch_size=2
+    )
+    assert seen == [(2, 5), (4, 5), (5, 5)]
+    first_ids = sorted(task.id for task in tasks)[:2]
+    assert sorted(embedded_docs[2:]) == sorted(
+        task.name for task in tasks if task.id not in first_ids
+    )
+
+    # Once finished, the next rebuild starts from the beginning.
+    seen.clear()
+    temp_store.regen_embeddings(progress=lambda done, total: seen.append((done, total)))
+    assert seen == [(0, 5), (5, 5)]
+
+
+def test_delete_removes_embedding(temp_store: SQLiteStore):
+    task = Task(name="Write report")
+    temp_store.save_task(task)
+    row_id = temp_store.conn.execute(
+        "SELECT vector_rowid FROM task_embeddings WHERE task_id = (?)", (task.id,)
+    ).fetchone()[0]
+    temp_store.delete_task(task.id)
+    assert temp_store.vector_index.get([row_id]) == {}
+    assert temp_store.conn.execute("SELECT * FROM task_embeddings").fetchall() == []
+
+
+def test_compact_removes_orphaned_vectors(temp_store: SQLiteStore):
+    kept = Task(name="Keep me")
+    orphaned = Task(name="Deleted without cleanup")
+    for task in [kept, orphaned]:
+        temp_store.save_task(task)
+    # Older versions deleted the task and nothing else.
+    with temp_store.conn as conn:
+        conn.execute("DELETE FROM tasks WHERE id = (?)", (orphaned.id,))
+
+    assert temp_store.compact_vector_index() == 1
+    assert temp_store.compact_vector_index() == 0
+    assert len(temp_store.vector_index.row_ids()) == 1
+    (result,) = temp_store.search_tasks("keep", limit=5, mode="semantic")
+    assert result.id == kept.id
+
+
+@pytest.mark.parametrize("vector_index", ["vss", "numpy"])
+def test_rolled_back_delete_keeps_vectors(
+    monkeypatch, temp_store: SQLiteStore, vector_index: str
+):
+    temp_store.close()
+    store = type(temp_store)(temp_store.path, vector_index=vector_index)
+    task = Task(name="Write report")
+    store.save_task(task)
+    (row_id,) = store.vector_index.row_ids()
+
+    tasks_deleted = store._tasks_deleted
+
+    def failing_tasks_deleted(conn, vectors, ids):
+        tasks_deleted(conn, vectors, ids)
+        raise RuntimeError("Disk on fire")
+
+    monkeypatch.setattr(store, "_tasks_deleted", failing_tasks_deleted)
+    with pytest.raises(RuntimeError):
+        store.delete_task(task.id)
+    monkeypatch.undo()
+
+    # The delete rolled back, vectors and all.
+    assert set(store.vector_index.get([row_id])) == {row_id}
+    (result,) = store.search_tasks("report", limit=1, mode="semantic")
+    assert result.id == task.id
+    store.delete_task(task.id)
+    assert store.vector_index.get([row_id]) == {}
+    store.close()
+
+
+@pytest.mark.parametrize("vector_index", ["vss", "numpy"])
+def test_failed_vector_write_is_retried(
+    monkeypatch, temp_store: SQLiteStore, vector_index: str
+):
+    temp_store.close()
+    store = type(temp_store)(
+        temp_store.path, vector_index=vector_index, background_embeddings=True
+    )
+    task = Task(name="Write report")
+    store.save_task(task)
+
+    # The numpy index is written to in two steps, the first of which is `append`.
+    method = "add" if vector_index == "vss" else "append"
+    add = getattr(store.vector_index, method)
+
+    def failing_add(row_ids, vectors):
+        monkeypatch.setattr(store.vector_index, method, add)
+        raise RuntimeError("Disk on fire")
+
+    monkeypatch.setattr(store.vector_index, method, failing_add)
+    with pytest.raises(RuntimeError):
+        store.process_embedding_queue()
+
+    # Nothing says the task was embedded, so it's embedded again.
+    assert store.pending_embeddings() == 1
+    assert store.process_embedding_queue() == 1
+    assert len(store.vector_index.row_ids()) == 1
+    (result,) = store.search_tasks("report", limit=1, mode="semantic")
+    assert result.id == task.id
+    store.close()
+
+
+@pytest.mark.parametrize("vector_index", ["vss", "numpy"])
+def test_rolled_back_embedding_keeps_old_vector(
+    monkeypatch, temp_store: SQLiteStore, vector_index: str
+):
+    temp_store.close()
+    store = type(temp_store)(temp_store.path, vector_index=vector_index)
+    task = Task(name="Write report")
+    store.save_task(task)
+    (row_id,) = store.vector_index.row_ids()
+    old_vector = store.vector_index.get([row_id])[row_id]
+
+    shift_centroids = store._shift_centroids
+    added: list[int] = []
+
+    def failing_shift_centroids(conn, changes):
+        # New embeddings are added to centroids once their vectors are stored.
+        if any(sign == 1 for *_, sign in changes):
+            added.extend(store.vector_index.get([row_id]))
+            raise RuntimeError("Disk on fire")
+        shift_centroids(conn, changes)
+
+    monkeypatch.setattr(store, "_shift_centroids", failing_shift_centroids)
+    task.name = "Water plants"
+    with pytest.raises(RuntimeError):
+        store.update_task(task.id, task)
+    monkeypatch.undo()
+    assert added == [row_id]
+
+    # The old vector is still the task's only one.
+    assert store.vector_index.row_ids() == [row_id]
+    assert np.allclose(store.vector_index.get([row_id])[row_id], old_vector)
+    (result,) = store.search_tasks("report", limit=1, mode="semantic")
+    assert result.id == task.id
+
+    # Once embedded for real, the new vector replaces it.
+    store.process_embedding_queue()
+    assert store.vector_index.row_ids() == [row_id]
+    assert not np.allclose(store.vector_index.get([row_id])[row_id], old_vector)
+    store.close()
@@ -0,0 +1,165 @@
+from contextlib import contextmanager
+
+import pytest
+
+from now_and_here.datastore.sqlite_store import SQLiteStore, vss_index
+from now_and_here.datastore.sqlite_store.vss_index import VSSVectorIndex
+from now_and_here.models import Task
+
+
+def test_train_ivf_index(temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task number {i}") for i in range(40)]
+    for task in tasks:
+        temp_store.save_task(task)
+    temp_store.close()
+
+    store = type(temp_store)(temp_store.path, vector_index_factory="IVF4,Flat")
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    assert store.vector_index.current_factory() is None
+    # The default index reads its vectors back, so it doesn't need copies.
+    assert not store.vector_index.has_copies()
+    store.train_vector_index()
+    assert store.vector_index.current_factory() == "IVF4,Flat"
+    assert store.vector_index.has_copies()
+    assert len(store.vector_index.row_ids()) == 40
+
+    # The trained index takes new vectors, deletes and searches as usual. (Searches
+    # only look in the nearest cluster, so search for the exact text.)
+    new_task = Task(name="Buy groceries")
+    store.save_task(new_task)
+    store.delete_task(tasks[0].id)
+    (result,) = store.search_tasks("Buy groceries", limit=1, mode="semantic")
+    assert result.id == new_task.id
+    assert len(store.vector_index.row_ids()) == 40
+
+    # The vectors can still be read back, even though the index can't reconstruct them.
+    related = store.related_tasks(tasks[1].id, limit=3)
+    assert len(related) == 3
+    assert tasks[1].id not in {task.id for task in related}
+    # Retraining reads them back too.
+    store.train_vector_index()
+    assert len(store.vector_index.row_ids()) == 40
+    store.close()
+
+
+def test_training_keeps_concurrent_writes(monkeypatch, temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task number {i}") for i in range(40)]
+    for task in tasks:
+        temp_store.save_task(task)
+    temp_store.close()
+
+    store = type(temp_store)(temp_store.path, vector_index_factory="IVF4,Flat")
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    other = type(temp_store)(temp_store.path)
+    early, late = Task(name="Buy groceries"), Task(name="Water the plants")
+    transactions = []
+    immediate_transaction = vss_index.immediate_transaction
+
+    @contextmanager
+    def writing_between(conn):
+        transactions.append(conn)
+        if len(transactions) == 1:
+            # After the vectors were read for training.
+            other.save_task(early)
+            other.delete_task(tasks[0].id)
+        else:
+            # After the training committed, while the index is still empty. It
+            # mustn't look like it was never built, or everything gets re-embedded.
+            reopened = type(temp_store)(temp_store.path)
+            assert reopened.conn.execute(
+                "SELECT count(*) FROM task_embeddings"
+            ).fetchone() == (40,)
+            reopened.close()
+            other.save_task(late)
+        with immediate_transaction(conn):
+            yield conn
+
+    monkeypatch.setattr(vss_index, "immediate_transaction", writing_between)
+    store.train_vector_index()
+    assert len(transactions) == 2
+    assert store.vector_index.current_factory() == "IVF4,Flat"
+    assert len(store.vector_index.row_ids()) == 41
+    for task in (early, late):
+        (result,) = store.search_tasks(task.name, limit=1, mode="semantic")
+        assert result.id == task.id
+        (result,) = other.search_tasks(task.name, limit=1, mode="semantic")
+        assert result.id == task.id
+    other.close()
+    store.close()
+
+
+def test_failed_training_keeps_old_index(temp_store: SQLiteStore):
+    task = Task(name="Buy groceries")
+    temp_store.save_task(task)
+    temp_store.close()
+
+    # Far more clusters than there are vectors to train them.
+    store = type(temp_store)(temp_store.path, vector_index_factory="IVF64,Flat")
+    with pytest.raises(ValueError):
+        store.train_vector_index()
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    assert store.vector_index.current_factory() is None
+    (result,) = store.search_tasks("groceries", limit=1, mode="semantic")
+    assert result.id == task.id
+    store.close()
+
+
+def test_factory_needs_vss_index(temp_store: SQLiteStore):
+    temp_store.close()
+    with pytest.raises(ValueError):
+        type(temp_store)(
+            temp_store.path, vector_index="numpy", vector_index_factory="IVF4,Flat"
+        )
+
+
+def test_train_reduced_vectors(temp_store: SQLiteStore):
+    tasks = [Task(name=f"Task number {i}") for i in range(40)]
+    for task in tasks:
+        temp_store.save_task(task)
+    temp_store.close()
+
+    store = type(temp_store)(temp_store.path, vector_dimensions=16)
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    store.train_vector_index()
+    assert store.vector_index.current_dimensions() == 16
+    (sql,) = store.conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'vss_tasks'"
+    ).fetchone()
+    assert "a(16)" in sql
+
+    # New vectors are projected on the way in, and read back whole.
+    new_task = Task(name="Buy groceries")
+    store.save_task(new_task)
+    (result,) = store.search_tasks("Buy groceries", limit=1, mode="semantic")
+    assert result.id == new_task.id
+    (vector,) = store.vector_index.get(store.vector_index.row_ids()[-1:]).values()
+    assert len(vector) == 384
+    assert len(store.related_tasks(tasks[1].id, limit=3)) == 3
+    store.close()
+
+    # Other stores opened on the file use the projection, whatever they're configured
+    # with, until the index is retrained.
+    store = type(temp_store)(temp_store.path)
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    assert store.vector_index.current_dimensions() == 16
+    (result,) = store.search_tasks("Task number 7", limit=1, mode="semantic")
+    assert result.id == tasks[7].id
+    store.train_vector_index()
+    assert store.vector_index.current_dimensions() is None
+    assert not store.vector_index.has_copies()
+    (result,) = store.search_tasks("Task number 7", limit=1, mode="semantic")
+    assert result.id == tasks[7].id
+    assert len(store.related_tasks(tasks[1].id, limit=3)) == 3
+    store.close()
+
+
+def test_reduction_needs_enough_vectors(temp_store: SQLiteStore):
+    temp_store.save_task(Task(name="Buy groceries"))
+    temp_store.close()
+
+    store = type(temp_store)(temp_store.path, vector_dimensions=16)
+    with pytest.raises(ValueError):
+        store.train_vector_index()
+    assert isinstance(store.vector_index, VSSVectorIndex)
+    assert store.vector_index.current_dimensions() is None
+    store.close()
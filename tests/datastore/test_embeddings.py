@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+import pytest
+
+from now_and_here.datastore import embeddings
+from now_and_here.datastore.embeddings import EmbeddingService
+
+
+class CountingModel:
+    """Stands in for TextEmbedding so we can count how often it's loaded."""
+
+    loads = 0
+
+    def __init__(self, model_name: str, threads: int | None = None):
+        CountingModel.loads += 1
+        self.model_name = model_name
+        self.threads = threads
+
+    def embed(self, documents):
+        for doc in documents:
+            yield np.full(4, len(doc), dtype=np.float64)
+
+
+@pytest.fixture
+def counting_model(monkeypatch) -> type[CountingModel]:
+    CountingModel.loads = 0
+    monkeypatch.setattr(embeddings, "TextEmbedding", CountingModel)
+    return CountingModel
+
+
+def test_model_is_reused(counting_model: type[CountingModel]):
+    service = EmbeddingService(threads=2)
+    assert not service.is_loaded
+    first = service.embed(["a", "bb"])
+    second = service.embed(["ccc"])
+    assert counting_model.loads == 1
+    assert [v.dtype for v in first + second] == [np.float32] * 3
+    assert [v[0] for v in first + second] == [1, 2, 3]
+
+    # Changing the thread count requires a new model; changing the timeout doesn't.
+    service.configure(threads=2, idle_timeout=100)
+    service.embed(["a"])
+    assert counting_model.loads == 1
+    service.configure(threads=4, idle_timeout=100)
+    service.embed(["a"])
+    assert counting_model.loads == 2
+    service.unload()
+
+
+def test_idle_model_is_unloaded(counting_model: type[CountingModel]):
+    service = EmbeddingService(idle_timeout=0.05)
+    service.warm_up()
+    assert service.is_loaded
+    time.sleep(0.2)
+    assert not service.is_loaded
+    service.embed(["a"])
+    assert counting_model.loads == 2
+
+
+def test_query_embeddings_are_cached(counting_model: type[CountingModel]):
+    service = EmbeddingService(query_cache_size=2)
+    first = service.embed_query("buy milk")
+    # Whitespace doesn't change the query.
+    assert service.embed_query("  buy   milk ") is first
+    service.embed_query("call mom")
+    service.embed_query("water plants")
+    # "buy milk" was the least recently used, so it's been evicted.
+    service.embed_query("buy milk")
+    assert service.query_cache_info() == (1, 4, 2, 2)
+
+    # A different model produces different vectors, so the cache starts over.
+    service.configure(threads=None, idle_timeout=0, model_name="other-model")
+    service.embed_query("buy milk")
+    assert service.query_cache_info() == (1, 5, 1, 2)
+    assert counting_model.loads == 2
@@ -0,0 +1,33 @@
+from now_and_here.datastore.search import (
+    fts_query,
+    name_prefix_query,
+    phrase_query,
+    reciprocal_rank_fusion,
+    substring_query,
+)
+
+
+def test_fts_query():
+    assert fts_query("fix OPS-1234") == '"fix" OR "OPS 1234"'
+    # FTS5 syntax in the query is treated as plain words.
+    assert fts_query('name:"foo" AND bar*') == '"name foo" OR "AND" OR "bar"'
+    assert fts_query("  --  ") is None
+    assert phrase_query("fix OPS-1234") == '"fix OPS 1234"'
+    assert phrase_query("  --  ") is None
+
+
+def test_reciprocal_rank_fusion():
+    # "b" is second in both rankings, which beats being first in just one.
+    assert reciprocal_rank_fusion(["a", "b", "c"], ["d", "b", "c"]) == [
+        "b",
+        "c",
+        "a",
+        "d",
+    ]
+    assert reciprocal_rank_fusion([], []) == []
+
+
+def test_typeahead_queries():
+    assert substring_query('say "hi"') == '"say ""hi"""'
+    assert name_prefix_query("wa") == 'name : "wa" *'
+    assert name_prefix_query("-") is None
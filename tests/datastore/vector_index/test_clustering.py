@@ -0,0 +1,28 @@
+import numpy as np
+
+from now_and_here.datastore.vector_index.clustering import (
+    leader_groups,
+    similarity_clusters,
+)
+
+
+def test_clusters_span_blocks():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(10, 16))
+    # 2 and 7 are in different blocks; 7 and 9 are in the same one.
+    vectors[7] = vectors[2] + 0.01 * rng.normal(size=16)
+    vectors[9] = vectors[7] + 0.01 * rng.normal(size=16)
+    vectors[4] = vectors[3] * 5
+    clusters = similarity_clusters(vectors, threshold=0.99, block_size=4)
+    assert sorted(clusters) == [[2, 7, 9], [3, 4]]
+
+
+def test_leader_groups_dont_chain():
+    # 1 is similar to both 0 and 2, but 0 and 2 aren't similar to each other.
+    angles = np.radians([0, 30, 60, 120, 130])
+    vectors = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    threshold = np.cos(np.radians(35))
+    assert sorted(similarity_clusters(vectors, threshold)) == [[0, 1, 2], [3, 4]]
+    assert leader_groups(vectors, threshold) == [[0, 1], [3, 4]]
+    # Which vector leads depends on the order.
+    assert leader_groups(vectors[[1, 0, 2]], threshold) == [[0, 1, 2]]
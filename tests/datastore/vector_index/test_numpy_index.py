@@ -0,0 +1,118 @@
+from pathlib import Path
+
+import numpy as np
+
+from now_and_here.datastore.vector_index import NumpyVectorIndex
+from now_and_here.datastore.vector_index.numpy_index import normalize, quantize
+
+
+def random_vectors(n: int, dimensions: int = 8, seed: int = 0) -> np.ndarray:
+    return normalize(np.random.default_rng(seed).normal(size=(n, dimensions)))
+
+
+def test_search_matches_brute_force(tmp_path: Path):
+    index = NumpyVectorIndex(tmp_path / "store.sqlite", dimensions=8)
+    vectors = random_vectors(3000)
+    # More than the initial capacity, so the files have to grow along the way.
+    for start in range(0, 3000, 500):
+        index.add(list(range(start, start + 500)), vectors[start : start + 500])
+
+    query = random_vectors(1, seed=1)[0]
+    hits = index.search(query, 10)
+    expected = np.argsort(((vectors - query) ** 2).sum(axis=1))[:10]
+    assert [row_id for row_id, _ in hits] == expected.tolist()
+    assert np.isclose(hits[0][1], ((vectors[expected[0]] - query) ** 2).sum())
+
+    restricted = index.search(query, 3, row_ids=[5, 6, 7, 8])
+    assert {row_id for row_id, _ in restricted} <= {5, 6, 7, 8}
+    assert len(restricted) == 3
+
+
+def test_replace_remove_and_compact(tmp_path: Path):
+    path = tmp_path / "store.sqlite"
+    index = NumpyVectorIndex(path, dimensions=8)
+    vectors = random_vectors(4)
+    index.add([1, 2, 3], vectors[:3])
+    # Replacing a vector tombstones the old one.
+    index.add([2], vectors[3:])
+    index.remove([3])
+    assert set(index.get([1, 2, 3])) == {1, 2}
+    assert np.allclose(index.get([2])[2], vectors[3])
+    assert {row_id for row_id, _ in index.search(vectors[0], 10)} == {1, 2}
+
+    index.compact()
+    assert {row_id for row_id, _ in index.search(vectors[0], 10)} == {1, 2}
+    # Another process opening the same files sees the same vectors.
+    reopened = NumpyVectorIndex(path, dimensions=8)
+    assert set(reopened.get([1, 2, 3])) == {1, 2}
+    index.remove([1, 2])
+    assert reopened.is_empty()
+
+
+def test_readers_pick_up_replaced_file(tmp_path: Path):
+    path = tmp_path / "store.sqlite"
+    writer = NumpyVectorIndex(path, dimensions=8)
+    reader = NumpyVectorIndex(path, dimensions=8)
+    vectors = random_vectors(1500)
+    writer.add(list(range(1000)), vectors[:1000])
+    assert len(reader.search(vectors[0], 5)) == 5
+
+    writer.remove(list(range(500)))
+    # Running out of room compacts into a new, bigger file, with every slot moved.
+    writer.add(list(range(1000, 1500)), vectors[1000:])
+    assert sorted(reader.row_ids()) == list(range(500, 1500))
+    assert np.allclose(reader.get([1200])[1200], vectors[1200])
+    assert reader.search(vectors[700], 1)[0][0] == 700
+    # Rowids and vectors are swapped in together, in one file.
+    assert [p.name for p in tmp_path.iterdir()] == ["store.vectors"]
+
+
+def test_two_step_replace(tmp_path: Path):
+    path = tmp_path / "store.sqlite"
+    index = NumpyVectorIndex(path, dimensions=8)
+    vectors = random_vectors(5)
+    index.add([1, 2], vectors[:2])
+
+    # Until it's superseded or dropped, the old vector stays alongside the new one.
+    index.append([1, 2], vectors[2:4])
+    assert np.allclose(index.get([1])[1], vectors[2])
+    hits = index.search(vectors[0], 2)
+    assert [row_id for row_id, _ in hits] == [1, 2]
+    assert np.isclose(hits[0][1], 0, atol=1e-6)
+
+    index.supersede([1])
+    index.drop_latest([2])
+    assert sorted(index.row_ids()) == [1, 2]
+    assert np.allclose(index.get([1])[1], vectors[2])
+    assert np.allclose(index.get([2])[2], vectors[1])
+
+    # A replacement that's never superseded is resolved by compaction.
+    index.append([2], vectors[4:])
+    index.compact()
+    assert sorted(index.row_ids()) == [1, 2]
+    assert np.allclose(index.get([2])[2], vectors[4])
+
+
+def test_quantized_search(tmp_path: Path):
+    vectors = random_vectors(3000)
+    codes, scales = quantize(vectors)
+    assert np.abs(codes * scales[:, None] - vectors).max() <= scales.max() / 2 + 1e-6
+
+    index = NumpyVectorIndex(tmp_path / "store.sqlite", dimensions=8, quantized=True)
+    # Growing the file moves the codes along with the vectors.
+    for start in range(0, 3000, 500):
+        index.add(list(range(start, start + 500)), vectors[start : start + 500])
+    index.remove(list(range(10)))
+    index.add([10], vectors[:1])
+
+    query = random_vectors(1, seed=1)[0]
+    index_vectors = vectors.copy()
+    index_vectors[10] = vectors[0]
+    distances = ((index_vectors - query) ** 2).sum(axis=1)
+    distances[:10] = np.inf
+    expected = np.argsort(distances)[:10]
+    # The codes only pick the candidates; the distances come from the float vectors.
+    hits = index.search(query, 10)
+    assert [row_id for row_id, _ in hits] == expected.tolist()
+    assert np.allclose([d for _, d in hits], distances[expected], atol=1e-5)
+    assert [p.name for p in tmp_path.iterdir()] == ["store.qvectors"]
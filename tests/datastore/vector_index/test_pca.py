@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from now_and_here.datastore.vector_index.pca import PCAProjection
+
+
+def test_projection_keeps_the_main_directions():
+    rng = np.random.default_rng(0)
+    # Vectors that vary almost entirely within a 4-dimensional subspace.
+    basis = np.linalg.qr(rng.normal(size=(32, 4)))[0].T
+    vectors = rng.normal(size=(200, 4)) @ basis + 0.01 * rng.normal(size=(200, 32))
+    projection = PCAProjection.fit(vectors, 4)
+    assert projection.dimensions == 4
+    assert projection.project(vectors).shape == (200, 4)
+    assert projection.project(vectors[0]).shape == (4,)
+    assert projection.explained_variance(vectors) > 0.99
+
+    # Distances between projected vectors are close to the original distances.
+    projected = projection.project(vectors)
+    original = np.linalg.norm(vectors[1:] - vectors[0], axis=1)
+    reduced = np.linalg.norm(projected[1:] - projected[0], axis=1)
+    assert np.all(reduced <= original + 1e-5)
+    np.testing.assert_allclose(reduced, original, atol=0.1)
+
+
+def test_fit_needs_enough_vectors():
+    vectors = np.random.default_rng(0).normal(size=(3, 8))
+    with pytest.raises(ValueError):
+        PCAProjection.fit(vectors, 4)
+    with pytest.raises(ValueError):
+        PCAProjection.fit(vectors, 16)
@@ -0,0 +1,45 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from now_and_here.datastore import DataStore
+from now_and_here.fastapi_app.api import api_router
+from now_and_here.fastapi_app.dependencies import get_store
+from now_and_here.models import Label, Project, Task
+
+
+@pytest.fixture
+def client(temp_store: DataStore) -> TestClient:
+    app = FastAPI()
+    app.include_router(api_router)
+    app.dependency_overrides[get_store] = lambda: temp_store
+    return TestClient(app)
+
+
+def test_build_task_view_lists_rows(client: TestClient, temp_store: DataStore):
+    project = Project(name="Home")
+    temp_store.save_project(project)
+    parent = Task(name="Move house")
+    child = Task(name="Pack books", parent=parent, labels=[Label(name="errand")])
+    temp_store.save_tasks([parent, child, Task(name="Elsewhere", project=project)])
+
+    response = client.post(
+        "/api/task_views/build",
+        json={"view_name": "no-project", "context": {"timezone": "Europe/Berlin"}},
+    )
+    assert response.status_code == 200
+    rows = {row["name"]: row for row in response.json()}
+    assert set(rows) == {"Move house", "Pack books"}
+    # Enough for the web UI to edit a task from the list without losing anything.
+    assert rows["Pack books"]["parent"] == {"id": parent.id}
+    assert rows["Pack books"]["labels"] == [
+        label.model_dump(mode="json") for label in child.labels
+    ]
+    assert rows["Move house"]["parent"] is None
+
+
+def test_build_task_view_schema_describes_rows(client: TestClient):
+    schema = client.get("/openapi.json").json()
+    post = schema["paths"]["/api/task_views/build"]["post"]
+    items = post["responses"]["200"]["content"]["application/json"]["schema"]["items"]
+    assert items["$ref"].endswith("/FETaskRowOut")
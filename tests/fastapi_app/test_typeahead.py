@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+
+from now_and_here.fastapi_app import api
+from now_and_here.models import Task
+
+
+class RecordingStore:
+    """Just enough of a store for the typeahead endpoint, recording its searches."""
+
+    def __init__(self, lexical: list[Task], semantic: list[Task]):
+        self.lexical = lexical
+        self.semantic = semantic
+        self.searches: list[str] = []
+
+    def typeahead_tasks(self, query: str, **kwargs) -> list[Task]:
+        return self.lexical
+
+    def search_tasks(self, query: str, **kwargs) -> list[Task]:
+        self.searches.append(query)
+        return self.semantic
+
+
+async def typeahead(store: RecordingStore, query: str):
+    response = await api.typeahead_tasks(
+        store,  # type: ignore [arg-type]
+        query=query,
+        limit=10,
+        project_id=None,
+        include_child_projects=False,
+        include_done=False,
+    )
+    return response.body_iterator
+
+
+def test_typeahead_streams_lexical_then_semantic(monkeypatch):
+    monkeypatch.setattr(api, "TYPEAHEAD_SETTLE_SECONDS", 0)
+    by_name = Task(name="Write report")
+    by_meaning = Task(name="Draft summary")
+    store = RecordingStore(lexical=[by_name], semantic=[by_name, by_meaning])
+
+    async def read_all() -> list[dict]:
+        return [json.loads(line) async for line in await typeahead(store, "repo")]
+
+    lines = asyncio.run(read_all())
+    assert [line["source"] for line in lines] == ["lexical", "semantic"]
+    assert [t["id"] for t in lines[0]["tasks"]] == [by_name.id]
+    # Tasks already sent as lexical matches aren't repeated.
+    assert [t["id"] for t in lines[1]["tasks"]] == [by_meaning.id]
+    assert store.searches == ["repo"]
+
+
+def test_typeahead_dropped_while_settling(monkeypatch):
+    monkeypatch.setattr(api, "TYPEAHEAD_SETTLE_SECONDS", 60)
+    store = RecordingStore(lexical=[], semantic=[Task(name="Never sent")])
+
+    async def drop_after_lexical():
+        lines = await typeahead(store, "rep")
+        assert json.loads(await anext(lines))["source"] == "lexical"
+        # The client goes away while the server waits for the query to settle.
+        semantic = asyncio.create_task(anext(lines))
+        await asyncio.sleep(0.05)
+        semantic.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await semantic
+
+    asyncio.run(drop_after_lexical())
+    assert store.searches == []
@@ -0,0 +1,6 @@
+from now_and_here.models.common import decode_id_from_int, id_as_int
+
+
+def test_id_int_round_trip():
+    for id in ("abcdef", "aaaaab", "aaaaaa", "zzzzzz", "azazaz"):
+        assert decode_id_from_int(id_as_int(id)) == id
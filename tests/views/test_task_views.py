@@ -4,7 +4,7 @@ from freezegun import freeze_time
 from zoneinfo import ZoneInfo
 
 from now_and_here.datastore import DataStore
-from now_and_here.models import Task, UserContext
+from now_and_here.models import Project, Task, TaskRow, UserContext
 from now_and_here.views.task_views import task_views
 
 utc = ZoneInfo("UTC")
@@ -45,3 +45,30 @@ def test_today_simple(temp_store: DataStore):
     # - Only the first two tasks should be returned (the last one is due at 23:59 UTC).
     tasks = today.build(temp_store, UserContext(timezone=ZoneInfo("Europe/Berlin")))
     assert len(tasks) == 2
+
+
+def test_views_build_rows(temp_store: DataStore):
+    project = Project(name="Somewhere")
+    temp_store.save_project(project)
+    in_project = Task(name="In a project", project=project)
+    no_project = Task(name="Nowhere")
+    temp_store.save_tasks([in_project, no_project])
+
+    context = UserContext(timezone=utc)
+    no_project_view = task_views["no-project"]
+    assert [t.id for t in no_project_view.build(temp_store, context)] == [no_project.id]
+    rows = no_project_view.build_rows(temp_store, context)
+    assert rows == [
+        TaskRow(
+            id=no_project.id,
+            name="Nowhere",
+            description=None,
+            done=False,
+            priority=0,
+            due=None,
+            repeat=None,
+            project=None,
+            labels=(),
+            parent_id=None,
+        )
+    ]
@@ -1,7 +1,7 @@
 import re
 
 from now_and_here.datastore import DataStore
-from now_and_here.models import Task
+from now_and_here.models import Project, Task
 
 from .nhrunner import NHRunner
 
@@ -52,3 +52,49 @@ def test_add_task(temp_store: DataStore, nh: NHRunner):
     output = nh.remove_ansi_codes(result.stdout)
     ids = [id.replace("-", "") for id in output.strip().split("\n")]
     assert ids == [id]
+
+
+def test_add_task_suggests_project(monkeypatch, temp_store: DataStore, nh: NHRunner):
+    """Saying the task is in a project offers the suggested one by default."""
+    monkeypatch.setattr(temp_store, "project_suggestion_threshold", 0.5)
+    work = Project(name="Work")
+    home = Project(name="Home")
+    for project in [work, home]:
+        temp_store.save_project(project)
+    temp_store.save_task(Task(name="Write the quarterly report", project=work))
+    temp_store.save_task(Task(name="Water the plants", project=home))
+
+    args = ["task", "add", "-i"]
+    input = (
+        "\n".join(
+            [
+                "Quarterly report draft",  # name
+                "",  # description
+                "0",  # priority
+                "",  # due date (none)
+                "",  # repeat (none)
+                "y",  # is this task part of a project?
+                "",  # project (the suggestion)
+            ]
+        )
+        + "\n"
+    )
+    result = nh.invoke(args=args, input=input)
+    assert result.exit_code == 0
+
+    output = nh.remove_ansi_codes(result.stdout)
+    assert "Suggested project: Work" in output
+    match = re.search(r"ID:\s+(?P<id>[a-zA-Z0-9\-]+)", output)
+    assert match is not None
+    task = temp_store.get_task(match.group("id").replace("-", ""))
+    assert task.project == work
+
+    # Accepting the defaults still leaves a task out of any project.
+    input = "\n".join(["Quarterly report review", "", "0", "", "", ""]) + "\n"
+    result = nh.invoke(args=args, input=input)
+    assert result.exit_code == 0
+    output = nh.remove_ansi_codes(result.stdout)
+    assert "Suggested project: Work" in output
+    match = re.search(r"ID:\s+(?P<id>[a-zA-Z0-9\-]+)", output)
+    assert match is not None
+    assert temp_store.get_task(match.group("id").replace("-", "")).project is None
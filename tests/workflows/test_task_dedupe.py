@@ -0,0 +1,53 @@
+from now_and_here.datastore import DataStore
+from now_and_here.models import Task
+
+from .nhrunner import NHRunner
+
+
+def test_task_dedupe(temp_store: DataStore, nh: NHRunner):
+    original = Task(name="Renew passport", priority=2)
+    duplicate = Task(name="Renew passport", description="before the trip")
+    other = Task(name="Water the plants")
+    for task in [original, duplicate, other]:
+        temp_store.save_task(task)
+
+    (group,) = temp_store.find_duplicate_tasks(threshold=0.5)
+    # The task to keep comes first.
+    assert [t.id for t in group] == [original.id, duplicate.id]
+
+    # Merging asks first.
+    args = ["task", "dedupe", "--threshold", "0.5", "--merge"]
+    result = nh.invoke(args, input="n\n")
+    assert result.exit_code == 0
+    assert len(temp_store.get_tasks()) == 3
+    result = nh.invoke(args, input="y\n")
+    assert result.exit_code == 0
+    remaining = temp_store.get_tasks()
+    assert {t.id for t in remaining} == {original.id, other.id}
+    merged = temp_store.get_task(original.id)
+    assert merged.priority == 2
+    assert merged.description == "before the trip"
+
+
+def test_task_dedupe_embeds_queued_tasks(
+    monkeypatch, temp_store: DataStore, nh: NHRunner
+):
+    # In the background mode, nothing embeds tasks saved from the CLI until it's asked.
+    monkeypatch.setattr(temp_store, "background_embeddings", True)
+    original = Task(name="Renew passport")
+    duplicate = Task(name="Renew passport")
+    temp_store.save_tasks([original, duplicate])
+    assert temp_store.pending_embeddings() == 2
+
+    result = nh.invoke(["task", "dedupe", "--threshold", "0.5"])
+    assert result.exit_code == 0
+    assert "No duplicates found" not in result.stdout
+    assert temp_store.pending_embeddings() == 0
+
+
+def test_task_dedupe_merges_without_asking(temp_store: DataStore, nh: NHRunner):
+    temp_store.save_tasks([Task(name="Renew passport") for _ in range(3)])
+    result = nh.invoke(["task", "dedupe", "--threshold", "0.5", "--merge", "--yes"])
+    assert result.exit_code == 0
+    assert "Merged 2 tasks" in result.stdout
+    assert len(temp_store.get_tasks()) == 1